@@ -1,12 +1,15 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for, send_file, session, current_app
-import pandas as pd
 from datetime import datetime
 import uuid
 import io
 import csv
 from flask_babel import Babel, get_locale, gettext as _
 from models import *
-from database import init_db, DatabaseError, close_db
+from database import (
+    check_schema_version, DatabaseError, PoolTimeoutError, QueryTimeoutError,
+    DeadlineExceededError, close_db, commit_request, report_query_stats,
+    start_request_deadline
+)
 import psycopg2
 import traceback
 import os
@@ -14,6 +17,20 @@ from routes import auth, main, calendar
 from dotenv import load_dotenv
 from scheduler import start_scheduler
 
+def create_cli_app(test_config=None):
+    """A bare app for manage.py: configuration and the pooled unit of work only.
+
+    No blueprints, no schema version check and no scheduler, so commands such
+    as `migrate` touch nothing but what they run. Work done in an app context
+    is committed by close_db when the context ends.
+    """
+    load_dotenv()
+    app = Flask(__name__)
+    if test_config:
+        app.config.update(test_config)
+    app.teardown_appcontext(close_db)
+    return app
+
 def create_app(test_config=None):
     # Load environment variables from .env file
     load_dotenv()
@@ -76,16 +93,18 @@ def create_app(test_config=None):
     app.register_blueprint(calendar.bp)
 
 
-    # Initialize database
+    # Commit each request's unit of work once, then return its connection
+    app.before_request(start_request_deadline)
+    app.after_request(commit_request)
+    app.after_request(report_query_stats)
+    app.teardown_appcontext(close_db)
+
+    # Check the schema version (migrations are applied by `manage.py migrate`)
     with app.app_context():
         try:
-            init_db()
-            app.logger.info("Database initialized successfully")
+            check_schema_version()
         except DatabaseError as e:
-            app.logger.error(f"Failed to initialize database: {str(e)}")
-        
-        # Register database close function
-        app.teardown_appcontext(close_db)
+            app.logger.error(f"Failed to check database schema version: {str(e)}")
         
         # Start the background scheduler for automated tasks
         try:
@@ -102,6 +121,27 @@ def create_app(test_config=None):
                             error_code=404,
                             error_traceback=None), 404
 
+    @app.errorhandler(PoolTimeoutError)
+    def handle_pool_timeout(e):
+        # Pool exhaustion is back-pressure, not a server fault
+        current_app.logger.warning(f'Database pool exhausted: {str(e)}')
+        if request.path.startswith('/api/') or request.is_json:
+            return jsonify({'error': 'Service temporarily unavailable, please retry'}), 503
+        return render_template('error.html',
+                            error_code=503,
+                            error_traceback=None), 503
+
+    @app.errorhandler(QueryTimeoutError)
+    def handle_query_timeout(e):
+        # A cancelled statement or spent request budget: fail fast instead of piling up
+        status = 504 if isinstance(e, DeadlineExceededError) else 503
+        current_app.logger.warning(f'Database time limit hit on {request.endpoint}: {str(e)}')
+        if request.path.startswith('/api/') or request.is_json:
+            return jsonify({'error': 'The request took too long, please retry'}), status
+        return render_template('error.html',
+                            error_code=status,
+                            error_traceback=None), status
+
     @app.errorhandler(Exception)
     def handle_exception(e):
         # Get the full traceback
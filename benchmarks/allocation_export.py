@@ -0,0 +1,150 @@
+"""
+Measure the allocation export (/export/allocations) on a large organization.
+
+Runs against the test database (prptest), which is reset first: seeds one
+organization with --people people, --projects projects and --assignments
+current assignments, then streams the export through the Flask test client
+and prints time to first chunk, total time, size and the peak Python memory
+traced while it ran. For comparison, the old export (pandas DataFrames, a
+per-person filter over every current assignment, the whole CSV built in
+memory) is timed the same way; that needs pandas, which the app no longer
+depends on (pip install pandas, or pass --skip-old).
+
+    python benchmarks/allocation_export.py --people 10000 --assignments 50000
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Add the project root directory to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from app import create_app
+from database import get_db_cursor, init_db
+from models.core import CurrentAssignment, Person, get_all_people, get_current_assignments
+
+def seed_organization(app, people, projects, assignments):
+    """One organization with `assignments` current assignments; returns its id"""
+    start = datetime.now().date() - timedelta(days=7)
+    end = start + timedelta(days=90)
+    per_person = -(-assignments // people)
+    with app.app_context():
+        with get_db_cursor() as cur:
+            cur.execute("INSERT INTO organizations (name) VALUES ('Export Bench') RETURNING id")
+            org_id = cur.fetchone()[0]
+            cur.execute("""
+                INSERT INTO projects (name, project_type, status, start_date, end_date, organization_id)
+                SELECT 'Bench Project ' || g, 'External', 'Active', %s, %s, %s
+                FROM generate_series(1, %s) g
+            """, (start, end, org_id, projects))
+            cur.execute("""
+                INSERT INTO people (name, role, availability, organization_id)
+                SELECT 'Bench Person ' || g, 'Project Associate', 'Full-Time', %s
+                FROM generate_series(1, %s) g
+            """, (org_id, people))
+            # Person i takes projects i * per_person + k, k < per_person: distinct per person
+            cur.execute("""
+                WITH pe AS (
+                    SELECT id, row_number() OVER (ORDER BY id) - 1 AS n
+                    FROM people WHERE organization_id = %(org)s
+                ), pr AS (
+                    SELECT id, row_number() OVER (ORDER BY id) - 1 AS n
+                    FROM projects WHERE organization_id = %(org)s
+                )
+                INSERT INTO assignments (project_id, person_id, allocation, start_date, end_date)
+                SELECT pr.id, pe.id, 5 + k %% 15, %(start)s, %(end)s
+                FROM pe
+                CROSS JOIN generate_series(0, %(per_person)s - 1) k
+                JOIN pr ON pr.n = (pe.n * %(per_person)s + k) %% %(projects)s
+                WHERE pe.n * %(per_person)s + k < %(assignments)s
+            """, {'org': org_id, 'start': start, 'end': end, 'per_person': per_person,
+                  'projects': projects, 'assignments': assignments})
+    return org_id
+
+def old_export():
+    """The export as it was before it streamed, returning the CSV bytes"""
+    import pandas as pd
+
+    current_assignments = pd.DataFrame(get_current_assignments(), columns=CurrentAssignment._fields)
+    people_df = pd.DataFrame(get_all_people(), columns=Person._fields)
+    report_data = []
+    for _, person in people_df.iterrows():
+        person_assignments = current_assignments[current_assignments['person_id'] == person['id']]
+        projects = [f"{a['project_name']} ({a['allocation']}%)" for _, a in person_assignments.iterrows()]
+        report_data.append({
+            'Name': person['name'],
+            'Role': person['role'],
+            'Total Allocation': f"{person_assignments['allocation'].sum()}%",
+            'Projects': ', '.join(projects)
+        })
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=['Name', 'Role', 'Total Allocation', 'Projects'])
+    writer.writeheader()
+    writer.writerows(report_data)
+    return output.getvalue().encode('utf-8')
+
+def measure(fn):
+    """(result, seconds, peak traced MB) of one call"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = fn()
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--people', type=int, default=10000)
+    parser.add_argument('--projects', type=int, default=2000)
+    parser.add_argument('--assignments', type=int, default=50000)
+    parser.add_argument('--skip-old', action='store_true',
+                        help="don't time the old DataFrame export")
+    args = parser.parse_args()
+
+    app = create_app({'TESTING': True, 'SERVER_NAME': 'test.local'})
+    with app.app_context():
+        init_db()
+    org_id = seed_organization(app, args.people, args.projects, args.assignments)
+    print(f"{args.people} people, {args.projects} projects, {args.assignments} current assignments")
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+        sess['organization_id'] = org_id
+
+    def streamed():
+        response = client.get('/export/allocations', buffered=False)
+        first_chunk = None
+        size = chunks = 0
+        for chunk in response.response:
+            if first_chunk is None:
+                first_chunk = time.perf_counter()
+            size += len(chunk)
+            chunks += 1
+        response.close()
+        return first_chunk, size, chunks
+
+    started = time.perf_counter()
+    (first_chunk, size, chunks), elapsed, peak = measure(streamed)
+    print(f"  streamed export    {elapsed * 1000:10.1f} ms total, "
+          f"{(first_chunk - started) * 1000:.1f} ms to first chunk, "
+          f"{size / 1024:.0f} KiB in {chunks} chunks, peak {peak:.1f} MiB")
+
+    if not args.skip_old:
+        with app.test_request_context('/'):
+            body, elapsed, peak = measure(old_export)
+        print(f"  old DataFrame export {elapsed * 1000:8.1f} ms total, "
+              f"{len(body) / 1024:.0f} KiB, peak {peak:.1f} MiB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Compare the sync and async (ASYNC_DB) paths of the JSON edit endpoints under
+concurrent load.
+
+Runs against the test database (prptest), which is reset first: seeds
+projects, then has --concurrency threads each send --requests PUT
+/projects/<id> edits through the Flask test client, once per mode, and
+prints throughput, latency percentiles and pool usage. Every client thread
+blocks on its own edit in both modes, so this shows what the async pool
+costs and how many connections it holds, not added concurrency.
+
+    python benchmarks/async_endpoints.py --concurrency 50 --requests 40
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Add the project root directory to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from app import create_app
+from database import get_async_pool_stats, get_db_cursor, get_pool_stats, init_db
+
+def seed_projects(app, count):
+    """Insert `count` projects and return their ids"""
+    start = datetime.now().date()
+    with app.app_context():
+        with get_db_cursor() as cur:
+            cur.execute("""
+                INSERT INTO projects (name, project_type, status, start_date, end_date)
+                SELECT 'Bench Project ' || g, 'Internal', 'Active', %s, %s
+                FROM generate_series(1, %s) g
+                RETURNING id
+            """, (start, start + timedelta(days=30), count))
+            return [row[0] for row in cur.fetchall()]
+
+def run_mode(app, project_ids, concurrency, requests_per_thread):
+    """Fire the edits from `concurrency` threads; returns (elapsed seconds, latencies, errors)"""
+    start = datetime.now().date()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(n):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = 1
+        barrier.wait()
+        for i in range(requests_per_thread):
+            project_id = project_ids[(n * requests_per_thread + i) % len(project_ids)]
+            started = time.perf_counter()
+            response = client.put(f'/projects/{project_id}', json={
+                'name': f'Bench Project {project_id} edit {i}',
+                'project_type': 'Internal',
+                'status': 'Active',
+                'start_date': start.strftime('%Y-%m-%d'),
+                'end_date': (start + timedelta(days=30)).strftime('%Y-%m-%d')
+            })
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies, errors
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=40, help='requests per thread')
+    parser.add_argument('--projects', type=int, default=500)
+    parser.add_argument('--pool-max', type=int, default=10)
+    args = parser.parse_args()
+
+    app = create_app({
+        'TESTING': True,
+        'SERVER_NAME': 'test.local',
+        'DB_POOL_MAX': args.pool_max,
+        'DB_POOL_TIMEOUT': 60,
+    })
+    with app.app_context():
+        init_db()
+    project_ids = seed_projects(app, args.projects)
+
+    for label, async_db in (('sync', False), ('async', True)):
+        app.config['ASYNC_DB'] = async_db
+        elapsed, latencies, errors = run_mode(app, project_ids, args.concurrency, args.requests)
+        with app.app_context():
+            pool = get_async_pool_stats() if async_db else get_pool_stats()
+        print('=' * 80)
+        print(f"{label}: {len(latencies)} requests in {elapsed:.2f}s "
+              f"({len(latencies) / elapsed:.0f} req/s), {len(errors)} errors")
+        print(f"  latency ms: p50 {percentile(latencies, 50) * 1000:.1f}, "
+              f"p95 {percentile(latencies, 95) * 1000:.1f}, "
+              f"max {max(latencies) * 1000:.1f}, mean {statistics.mean(latencies) * 1000:.1f}")
+        print(f"  pool: size {pool['size']}/{pool['max_size']}, {pool['checkouts']} checkouts, "
+              f"max wait {pool['wait_time_max'] * 1000:.1f} ms, {pool['timeouts']} timeouts")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Measure how long dashboard.html takes to render as the organization grows.
+
+No database needed: synthetic data in the shape get_dashboard() returns
+(projects carrying their grouped team, people carrying their projects) is
+rendered through the real template. For comparison, the team section is
+also rendered the old way, scanning every person's projects for each project
+and matching on name.
+
+    python benchmarks/dashboard_render.py --projects 1000 --people 5000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+# Add the project root directory to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from flask import g, render_template, session
+
+from app import create_app
+
+PROJECT_TYPES = ['External', 'Internal', 'Initiative']
+
+# The team lookup dashboard.html did before get_dashboard() grouped teams
+OLD_TEAM_SECTION = """
+{% for project in projects %}{% if project.status == 'Active' %}
+    {% for person in people %}
+        {% for project_assignment in person.projects %}
+            {% if project_assignment.name == project.name %}
+            <span>{{ person.role }}</span><span>{{ person.name }}</span>
+            <span>({{ project_assignment.allocation }}%)</span>
+            {% endif %}
+        {% endfor %}
+    {% endfor %}
+{% endif %}{% endfor %}
+"""
+
+def make_data(project_count, people_count, assignments_per_person):
+    """Projects and people in the shape get_dashboard() returns"""
+    start = date.today()
+    projects = [
+        {
+            'id': i,
+            'name': f'Project {i}',
+            'project_type': PROJECT_TYPES[i % len(PROJECT_TYPES)],
+            'status': 'Active',
+            'start_date': (start - timedelta(days=i % 30)).isoformat(),
+            'end_date': (start + timedelta(days=30 + i % 90)).isoformat(),
+            'automated_status': 'Active',
+            'team_count': 0,
+            'team': []
+        }
+        for i in range(project_count)
+    ]
+    people = []
+    for i in range(people_count):
+        person = {
+            'id': i,
+            'name': f'Person {i}',
+            'role': 'Project Associate',
+            'availability': 'Full-Time',
+            'current_allocation': 0,
+            'projects': []
+        }
+        for k in range(assignments_per_person):
+            project = projects[(i * assignments_per_person + k) % project_count]
+            allocation = 10 + (i + k) % 30
+            project['team'].append({'person_id': i, 'name': person['name'],
+                                    'role': person['role'], 'allocation': allocation})
+            project['team_count'] += 1
+            person['current_allocation'] += allocation
+            person['projects'].append({
+                'project_id': project['id'], 'name': project['name'], 'allocation': allocation,
+                'status': project['status'], 'start_date': project['start_date'],
+                'assignment_end_date': project['end_date']
+            })
+        people.append(person)
+    return projects, people
+
+def timed(fn, repeat):
+    """Best wall time of `repeat` runs, in milliseconds"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--projects', type=int, default=1000)
+    parser.add_argument('--people', type=int, default=5000)
+    parser.add_argument('--assignments', type=int, default=2, help='assignments per person')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-old', action='store_true',
+                        help="don't time the old nested-loop team lookup")
+    args = parser.parse_args()
+
+    app = create_app({'TESTING': True, 'SERVER_NAME': 'test.local'})
+    projects, people = make_data(args.projects, args.people, args.assignments)
+    print(f"{args.projects} projects, {args.people} people, "
+          f"{args.assignments} assignments per person, best of {args.repeat}")
+
+    with app.test_request_context('/'):
+        session['user_email'] = 'bench@example.com'
+        g.user_email = 'bench@example.com'
+        g.user_role = 'Superuser'
+
+        def render_page():
+            render_template('dashboard.html',
+                            projects=projects,
+                            people=people,
+                            organization_name='Benchmark',
+                            now=date.today(),
+                            active_projects=len(projects),
+                            total_people=len(people),
+                            available_count=sum(1 for p in people if p['current_allocation'] < 50))
+
+        print(f"  dashboard.html (grouped teams)  {timed(render_page, args.repeat):10.1f} ms")
+
+        if not args.skip_old:
+            old_section = app.jinja_env.from_string(OLD_TEAM_SECTION)
+            ms = timed(lambda: old_section.render(projects=projects, people=people), 1)
+            print(f"  team section, old nested loops  {ms:10.1f} ms")
+
+if __name__ == '__main__':
+    main()
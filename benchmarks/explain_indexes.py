@@ -0,0 +1,231 @@
+"""
+Print EXPLAIN ANALYZE plans for the hot queries before and after the index
+migration, on a seeded dataset.
+
+Everything runs inside one transaction on temporary tables that shadow the
+real ones (temp tables come first in the search path), so the script is safe
+to point at any database and leaves nothing behind.
+
+    python benchmarks/explain_indexes.py --people 5000 --assignments 20000
+"""
+import argparse
+import os
+import sys
+
+import psycopg2
+
+# Add the project root directory to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from database import get_db_config
+
+MIGRATION_FILE = os.path.join(project_root, 'migrations', '05_add_query_indexes.sql')
+
+# Temp copies of the tables, keyed like the baseline schema (PKs and the
+# assignments UNIQUE constraint only)
+SHADOW_TABLES = """
+    CREATE TEMP TABLE organizations (LIKE public.organizations) ON COMMIT DROP;
+    CREATE TEMP TABLE users (LIKE public.users) ON COMMIT DROP;
+    CREATE TEMP TABLE organization_users (LIKE public.organization_users) ON COMMIT DROP;
+    CREATE TEMP TABLE otps (LIKE public.otps) ON COMMIT DROP;
+    CREATE TEMP TABLE people (LIKE public.people) ON COMMIT DROP;
+    CREATE TEMP TABLE projects (LIKE public.projects) ON COMMIT DROP;
+    CREATE TEMP TABLE assignments (LIKE public.assignments) ON COMMIT DROP;
+
+    ALTER TABLE organizations ADD PRIMARY KEY (id);
+    ALTER TABLE users ADD PRIMARY KEY (id);
+    ALTER TABLE users ADD UNIQUE (email);
+    ALTER TABLE organization_users ADD PRIMARY KEY (organization_id, user_id);
+    ALTER TABLE otps ADD PRIMARY KEY (id);
+    ALTER TABLE people ADD PRIMARY KEY (id);
+    ALTER TABLE projects ADD PRIMARY KEY (id);
+    ALTER TABLE assignments ADD PRIMARY KEY (id);
+    ALTER TABLE assignments ADD UNIQUE (project_id, person_id);
+"""
+
+# People and projects are spread round-robin over organizations
+# (org = 1 + id % orgs); assignments pair a project with a person of the same org.
+SEED = """
+    INSERT INTO organizations (id, name)
+    SELECT g, 'Org ' || g FROM generate_series(1, %(orgs)s) g;
+
+    INSERT INTO users (id, email, name, role, is_active, is_platform_admin)
+    SELECT g, 'user' || g || '@example.com', 'User ' || g, 'Normal', true, false
+    FROM generate_series(1, %(users)s) g;
+
+    INSERT INTO organization_users (organization_id, user_id, role)
+    SELECT 1 + g %% %(orgs)s, g, 'member' FROM generate_series(1, %(users)s) g;
+
+    INSERT INTO otps (id, email, otp, created_at, expires_at, is_valid)
+    SELECT g, 'user' || (1 + g %% %(users)s) || '@example.com', '123456',
+           now() - (g %% 1000) * interval '1 minute', now() + interval '10 minutes',
+           g %% 20 = 0
+    FROM generate_series(1, %(otps)s) g;
+
+    INSERT INTO people (id, name, role, availability, organization_id)
+    SELECT g, 'Person ' || g,
+           (ARRAY['Project Associate', 'Project Manager', 'Specialist Role'])[1 + g %% 3],
+           (ARRAY['Full-Time', 'Part-Time'])[1 + g %% 2],
+           1 + g %% %(orgs)s
+    FROM generate_series(1, %(people)s) g;
+
+    INSERT INTO projects (id, name, project_type, status, start_date, end_date, organization_id)
+    SELECT g, 'Project ' || g,
+           (ARRAY['External', 'Internal', 'Initiative'])[1 + g %% 3],
+           (ARRAY['Active', 'Completed', 'Not Started', 'On Hold', 'Active'])[1 + g %% 5],
+           CURRENT_DATE - (g %% 720), CURRENT_DATE - (g %% 720) + 30 + g %% 180,
+           1 + g %% %(orgs)s
+    FROM generate_series(1, %(projects)s) g;
+
+    INSERT INTO assignments (id, project_id, person_id, allocation, start_date, end_date)
+    SELECT g, pr.id,
+           pr.id %% %(orgs)s + %(orgs)s * (1 + (g * 31) %% (%(people)s / %(orgs)s - 1)),
+           10 + g %% 50, pr.start_date, pr.end_date
+    FROM generate_series(1, %(assignments)s) g
+    JOIN projects pr ON pr.id = 1 + g %% %(projects)s
+    ON CONFLICT DO NOTHING;
+
+    ANALYZE organizations, users, organization_users, otps, people, projects, assignments;
+"""
+
+# (label, query) for the statements the pages and models issue
+HOT_QUERIES = [
+    ("get_all_people(org)", """
+        SELECT id, name, role, availability
+        FROM people
+        WHERE organization_id = %(org_id)s
+        ORDER BY name
+    """),
+    ("get_all_projects(org)", """
+        SELECT id, name, project_type, status, start_date, end_date
+        FROM projects
+        WHERE organization_id = %(org_id)s
+        ORDER BY start_date DESC
+    """),
+    ("dashboard/projects: projects with team count", """
+        SELECT p.id, p.name, p.project_type, p.status,
+               p.start_date, p.end_date,
+               COUNT(DISTINCT a.person_id) as team_count
+        FROM projects p
+        LEFT JOIN assignments a ON p.id = a.project_id
+        WHERE p.organization_id = %(org_id)s
+        GROUP BY p.id, p.name, p.project_type, p.status, p.start_date, p.end_date
+        ORDER BY p.start_date ASC
+    """),
+    ("people page: current allocation per person", """
+        SELECT p.id, p.name, p.role, p.availability,
+               COALESCE(SUM(
+                   CASE
+                       WHEN CURRENT_DATE BETWEEN a.start_date AND a.end_date
+                       AND pr.status NOT IN ('Not Started', 'Completed', 'Cancelled')
+                       THEN a.allocation
+                       ELSE 0
+                   END
+               ), 0) as current_allocation
+        FROM people p
+        LEFT JOIN assignments a ON p.id = a.person_id
+        LEFT JOIN projects pr ON a.project_id = pr.id
+        WHERE p.organization_id = %(org_id)s
+        GROUP BY p.id, p.name, p.role, p.availability
+        ORDER BY p.name ASC
+    """),
+    ("projects page: org assignments", """
+        SELECT a.project_id, p.name, p.role, a.allocation
+        FROM assignments a
+        JOIN people p ON a.person_id = p.id
+        WHERE a.project_id IN (SELECT id FROM projects WHERE organization_id = %(org_id)s)
+        ORDER BY p.name ASC
+    """),
+    ("calculate_total_allocation(person)", """
+        SELECT COALESCE(SUM(
+            CASE
+                WHEN CURRENT_DATE BETWEEN a.start_date AND a.end_date
+                AND p.status NOT IN ('Not Started', 'Completed', 'Cancelled')
+                THEN a.allocation
+                ELSE 0
+            END
+        ), 0) as total_allocation
+        FROM assignments a
+        JOIN projects p ON a.project_id = p.id
+        WHERE a.person_id = %(person_id)s
+    """),
+    ("get_current_assignments(date)", """
+        SELECT a.id, a.project_id, p.name as project_name,
+               a.person_id, pe.name as person_name,
+               a.allocation, a.start_date, a.end_date,
+               p.status as project_status
+        FROM assignments a
+        JOIN projects p ON a.project_id = p.id
+        JOIN people pe ON a.person_id = pe.id
+        WHERE CURRENT_DATE BETWEEN a.start_date AND a.end_date
+        AND p.status NOT IN ('Not Started', 'Completed', 'Cancelled')
+    """),
+    ("generate_otp: valid OTPs for email", """
+        SELECT id
+        FROM otps
+        WHERE email = %(email)s AND is_valid = TRUE
+    """),
+    ("get_user_organizations(user)", """
+        SELECT o.id, o.name, o.superuser_id = %(user_id)s as is_superuser
+        FROM organizations o
+        JOIN organization_users ou ON o.id = ou.organization_id
+        WHERE ou.user_id = %(user_id)s
+    """),
+]
+
+def explain_all(cur, params):
+    """Run EXPLAIN ANALYZE for every hot query, returning {label: plan lines}"""
+    plans = {}
+    for label, query in HOT_QUERIES:
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+        plans[label] = [row[0] for row in cur.fetchall()]
+    return plans
+
+def execution_time(plan):
+    for line in reversed(plan):
+        if line.startswith('Execution Time'):
+            return line.split(':', 1)[1].strip()
+    return '?'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orgs', type=int, default=20)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--otps', type=int, default=50000)
+    parser.add_argument('--people', type=int, default=5000)
+    parser.add_argument('--projects', type=int, default=1000)
+    parser.add_argument('--assignments', type=int, default=20000)
+    args = parser.parse_args()
+
+    with open(MIGRATION_FILE) as f:
+        migration_sql = f.read()
+
+    conn = psycopg2.connect(**get_db_config())
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SHADOW_TABLES)
+            cur.execute(SEED, vars(args))
+
+            params = {'org_id': 1, 'person_id': args.orgs + 1, 'user_id': 1,
+                      'email': 'user1@example.com'}
+            before = explain_all(cur, params)
+
+            cur.execute(migration_sql)
+            cur.execute("ANALYZE people, projects, assignments, otps, organization_users")
+            after = explain_all(cur, params)
+
+        for label, _ in HOT_QUERIES:
+            print('=' * 100)
+            print(f"{label}: {execution_time(before[label])} -> {execution_time(after[label])}")
+            print('-' * 40 + ' before ' + '-' * 52)
+            print('\n'.join(before[label]))
+            print('-' * 40 + ' after ' + '-' * 53)
+            print('\n'.join(after[label]))
+    finally:
+        conn.rollback()
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Measure what the pandas DataFrames cost the request path compared with the
+namedtuple records models/core.py returns now.
+
+No database needed: rows shaped like get_all_people / get_project_assignments
+results are built in memory and turned into what the routes consume, the old
+way (DataFrame -> to_dict('records') -> int casts) and the new way (records ->
+_asdict()). Import times are measured in fresh interpreters. The app no longer
+depends on pandas; install it (pip install pandas) to run this comparison.
+
+    python benchmarks/row_records.py --rows 200 --repeat 2000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import timeit
+from datetime import date, timedelta
+
+# Add the project root directory to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from collections import namedtuple
+
+# Same shape as models.core.ProjectAssignment, without importing the app
+ProjectAssignment = namedtuple('ProjectAssignment', [
+    'id', 'project_id', 'person_id', 'person_name',
+    'allocation', 'start_date', 'end_date', 'total_allocation'
+])
+
+def make_rows(count):
+    start = date.today()
+    return [
+        (i, 1, i, f'Person {i}', 10 + i % 50, start, start + timedelta(days=30 + i % 90), 40 + i % 70)
+        for i in range(count)
+    ]
+
+def with_pandas(rows):
+    import pandas as pd
+    df = pd.DataFrame(rows, columns=list(ProjectAssignment._fields))
+    records = df.to_dict('records')
+    for record in records:
+        record['id'] = int(record['id'])
+        record['person_id'] = int(record['person_id'])
+        record['project_id'] = int(record['project_id'])
+        record['total_allocation'] = int(record['total_allocation'])
+    return records
+
+def with_records(rows):
+    return [ProjectAssignment._make(row)._asdict() for row in rows]
+
+def import_time(module):
+    """Wall time of importing `module` in a fresh interpreter, in milliseconds"""
+    code = f"import time; t = time.perf_counter(); import {module}; print((time.perf_counter() - t) * 1000)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=project_root,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    with_pandas(rows)  # Import and warm up outside the timing
+
+    print(f"{args.rows} rows per call, {args.repeat} calls")
+    for label, fn in (('pandas DataFrame', with_pandas), ('namedtuple records', with_records)):
+        seconds = timeit.timeit(lambda: fn(rows), number=args.repeat)
+        print(f"  {label:20s} {seconds / args.repeat * 1e6:10.1f} us/call")
+
+    print("Import time (fresh interpreter)")
+    for module in ('pandas', 'numpy', 'models.core'):
+        ms = import_time(module)
+        print(f"  {module:20s} " + (f"{ms:10.1f} ms" if ms is not None else "  not importable here"))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""Per-organization read cache for the org-level lists (people, projects, teams).
+
+Entries are keyed by the organization, its current version and the call's
+arguments, held in a size-bounded LRU with a TTL. A write bumps the
+organization's version once its transaction commits, so later reads miss
+and re-query; entries a reader was still computing under the old version
+can never be served again.
+
+Other worker processes hear about writes through Postgres: triggers on
+people, projects and assignments (migration 10) NOTIFY 'organization_changed'
+with the organization id on commit, and a listener thread per process bumps
+the local version. If the listener loses its connection the whole cache is
+dropped, since notifications sent meanwhile are lost; the TTL bounds how stale
+an entry can get should the listener be down.
+
+Entries are only ever computed on the primary: a lagging replica could return
+rows from before a write that is already committed, and caching them under
+the new version would serve them until the TTL runs out.
+"""
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+import logging
+import os
+import select
+import threading
+import time
+
+import psycopg2
+from flask import current_app, g, has_app_context
+
+from database import get_db_config, on_commit, primary_queries
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'organization_changed'
+
+def get_cache_config():
+    """Cache settings from app config or environment; off by default in tests"""
+    config = current_app.config
+
+    def setting(name, default, cast):
+        return cast(config.get(name, os.getenv(name, default)))
+
+    enabled = config.get('ORG_CACHE', os.getenv('ORG_CACHE', not config.get('TESTING', False)))
+    if isinstance(enabled, str):
+        enabled = enabled.lower() == 'true'
+    return {
+        'enabled': bool(enabled),
+        'max_entries': setting('ORG_CACHE_MAX_ENTRIES', 512, int),
+        'ttl': setting('ORG_CACHE_TTL', 60, float)
+    }
+
+class OrganizationCache:
+    """Thread-safe LRU of computed reads, with a TTL and per-organization versions"""
+
+    def __init__(self, max_entries=512, ttl=60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._versions = {}
+        self._generation = 0  # Bumped by clear(), retiring every version at once
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+            'clears': 0
+        }
+
+    def version(self, organization_id):
+        """Current version of an organization's data, to build keys from"""
+        with self._lock:
+            return (self._generation, self._versions.get(organization_id, 0))
+
+    def get(self, key):
+        """(True, value) for a live entry, else (False, None)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                self._stats['expirations'] += 1
+                entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return True, entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, organization_id):
+        """Bump the organization's version and drop its entries"""
+        with self._lock:
+            self._versions[organization_id] = self._versions.get(organization_id, 0) + 1
+            self._stats['invalidations'] += 1
+            for key in [key for key in self._entries if key[1] == organization_id]:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop every entry and retire every version"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._stats['clears'] += 1
+
+    def stats(self):
+        """Snapshot of cache usage for monitoring"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hit_ratio': self._stats['hits'] / lookups if lookups else None,
+                'listening': _listener is not None and _listener.is_alive(),
+                **self._stats
+            }
+
+_cache = None
+_cache_lock = threading.Lock()
+_listener = None
+_listener_pid = None
+
+def get_cache():
+    """The process's cache, created on first use; None while caching is off"""
+    global _cache
+
+    config = get_cache_config()
+    if not config['enabled']:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = OrganizationCache(config['max_entries'], config['ttl'])
+        _start_listener()
+        return _cache
+
+def get_cache_stats():
+    """Live statistics of the cache, or None while caching is off"""
+    cache = get_cache()
+    return cache.stats() if cache else None
+
+def organization_cached(f):
+    """Cache a read whose first argument is the organization id.
+
+    The cached value is shared by every caller, so callers must not mutate
+    it. Keys also carry today's date, since current allocations and project
+    statuses move with it. Calls without an organization, calls from a unit
+    of work that has already written and calls inside primary_queries() are
+    not cached. Misses are computed on the primary.
+    """
+    @wraps(f)
+    def decorated_function(organization_id=None, *args, **kwargs):
+        cache = get_cache() if organization_id is not None and not _bypass_cache() else None
+        if cache is None:
+            return f(organization_id, *args, **kwargs)
+
+        key = (f.__qualname__, organization_id, cache.version(organization_id), date.today(),
+               _freeze(args), _freeze(sorted(kwargs.items())))
+        found, value = cache.get(key)
+        if found:
+            return value
+        with primary_queries():
+            value = f(organization_id, *args, **kwargs)
+        cache.put(key, value)
+        return value
+    return decorated_function
+
+def _bypass_cache():
+    """Whether the current unit of work has uncommitted writes the cache can't see,
+    or needs reads as current as the primary"""
+    if not has_app_context():
+        return False
+    stats = g.get('db_query_stats')
+    return (stats is not None and bool(stats.writes)) or g.get('db_primary_only', False)
+
+def _freeze(value):
+    """Hashable form of call arguments (lists of ids become tuples)"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def invalidate_organization(organization_id):
+    """Invalidate the organization's cached reads once the current unit of work commits.
+
+    Other processes are told by the NOTIFY of the triggers from migration 10.
+    """
+    if organization_id is None or _cache is None:
+        return
+    if has_app_context():
+        on_commit(lambda: _cache.invalidate(organization_id))
+    else:
+        _cache.invalidate(organization_id)
+
+def _start_listener():
+    """Start this process's invalidation listener (again after a fork); needs _cache_lock"""
+    global _listener, _listener_pid
+
+    if _listener is not None and _listener.is_alive() and _listener_pid == os.getpid():
+        return
+    _listener = threading.Thread(target=_listen, args=(get_db_config(),),
+                                 name='org-cache-listener', daemon=True)
+    _listener_pid = os.getpid()
+    _listener.start()
+
+def _listen(db_config, retry_seconds=5):
+    """Apply NOTIFY 'organization_changed' from every process to the local cache"""
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(**db_config)
+            conn.set_session(autocommit=True)
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            # Anything sent before LISTEN took effect was missed
+            _cache.clear()
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        _cache.invalidate(int(notify.payload))
+                    except ValueError:
+                        _cache.clear()
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener disconnected: {str(e)}")
+            _cache.clear()
+            time.sleep(retry_seconds)
+        finally:
+            if conn is not None and not conn.closed:
+                conn.close()
@@ -1,13 +1,23 @@
+import asyncio
 import psycopg2
-from psycopg2.pool import SimpleConnectionPool
-from psycopg2 import pool
+import psycopg2.errors
+import psycopg2.extensions
 from contextlib import contextmanager
+from functools import wraps
 import os
-from flask import current_app, g
+import re
+import threading
+import time
+from flask import current_app, g, has_app_context, has_request_context, request, session
 from urllib.parse import urlparse
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
+try:
+    import asyncpg
+except ImportError:  # Only needed when ASYNC_DB is enabled
+    asyncpg = None
+
 # Load environment variables
 load_dotenv()
 
@@ -19,10 +29,22 @@ class ConnectionError(DatabaseError):
     """Error establishing database connection"""
     pass
 
+class PoolTimeoutError(ConnectionError):
+    """No pooled connection became available before the checkout timeout"""
+    pass
+
 class QueryError(DatabaseError):
     """Error executing database query"""
     pass
 
+class QueryTimeoutError(QueryError):
+    """A statement was cancelled for running past its statement_timeout"""
+    pass
+
+class DeadlineExceededError(QueryTimeoutError):
+    """The request used up its overall database time budget"""
+    pass
+
 def get_db_config():
     """Get database configuration from environment or app config"""
     if current_app and current_app.config.get('TESTING', False):
@@ -44,233 +66,1023 @@ def get_db_config():
             'port': int(os.getenv('DB_PORT', 5432))
         }
 
-# Initialize connection pools for both databases
+def get_replica_config():
+    """Get the read replica connection settings, or None when no replica is configured"""
+    dsn = current_app.config.get('DATABASE_REPLICA_URL', os.getenv('DATABASE_REPLICA_URL'))
+    if not dsn:
+        return None
+    return {'dsn': dsn}
+
+def get_pool_config():
+    """Get connection pool sizing from app config or environment"""
+    config = current_app.config if current_app else {}
+
+    def setting(name, default, cast):
+        return cast(config.get(name, os.getenv(name, default)))
+
+    return {
+        'minconn': setting('DB_POOL_MIN', 1, int),
+        'maxconn': setting('DB_POOL_MAX', 20, int),
+        'timeout': setting('DB_POOL_TIMEOUT', 10, float),
+        'ping_after': setting('DB_POOL_PING_AFTER', 30, float),
+        'statement_timeout': setting('STATEMENT_TIMEOUT_MS', 30000, int)
+    }
+
+def get_request_deadline_ms():
+    """Default overall DB time budget for one request, in milliseconds"""
+    return int(current_app.config.get('REQUEST_DEADLINE_MS', os.getenv('REQUEST_DEADLINE_MS', 60000)))
+
+# Per-endpoint counts of statement timeouts and exceeded request deadlines
+_timeout_stats = {}
+_timeout_stats_lock = threading.Lock()
+
+def record_timeout(kind):
+    """Count a 'statement_timeouts' or 'deadlines_exceeded' hit for the current route"""
+    endpoint = request.endpoint if has_request_context() else None
+    with _timeout_stats_lock:
+        counts = _timeout_stats.setdefault(endpoint or '<none>', {
+            'statement_timeouts': 0,
+            'deadlines_exceeded': 0
+        })
+        counts[kind] += 1
+
+def get_timeout_stats():
+    """Snapshot of timeout counts per route"""
+    with _timeout_stats_lock:
+        return {endpoint: dict(counts) for endpoint, counts in _timeout_stats.items()}
+
+def start_request_deadline():
+    """before_request hook: start the request's database time budget"""
+    g.db_request_started = time.monotonic()
+    g.db_deadline = g.db_request_started + get_request_deadline_ms() / 1000
+
+def query_timeout(statement_ms=None, deadline_ms=None):
+    """Decorator overriding the statement timeout and/or request deadline of a route"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if statement_ms:
+                g.db_statement_timeout_ms = statement_ms
+            if deadline_ms:
+                g.db_deadline = g.get('db_request_started', time.monotonic()) + deadline_ms / 1000
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+def statement_budget_ms(default=None):
+    """Timeout for the next statement: the route override (or `default`),
+    capped by what is left of the request deadline.
+
+    Raises DeadlineExceededError once the deadline has passed.
+    """
+    desired = g.get('db_statement_timeout_ms') or default
+    deadline = g.get('db_deadline')
+    if deadline is not None:
+        remaining_ms = int((deadline - time.monotonic()) * 1000)
+        if remaining_ms <= 0:
+            record_timeout('deadlines_exceeded')
+            raise DeadlineExceededError("Request exceeded its database time budget")
+        desired = min(desired, remaining_ms) if desired else remaining_ms
+    return desired
+
+def apply_query_timeout(conn):
+    """Set statement_timeout for the next statement on `conn`.
+
+    Connections open with the default STATEMENT_TIMEOUT_MS. A route override,
+    or a request deadline closer than that, is applied with SET LOCAL, so it
+    only lasts for the current transaction and costs nothing on the common path.
+    """
+    desired = statement_budget_ms(conn.default_statement_timeout)
+    if not desired:
+        return
+
+    if conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        conn.local_statement_timeout = None  # SET LOCAL ended with the last transaction
+    current = conn.local_statement_timeout or conn.default_statement_timeout or float('inf')
+    # A deadline shrinks with every statement; only re-set once it is noticeably tighter
+    if desired > current or current - desired > 250:
+        with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+            cur.execute("SET LOCAL statement_timeout = %s", (desired,))
+        conn.local_statement_timeout = desired
+
+class RepeatedQueryError(QueryError):
+    """The same statement ran more often in one request than allowed (likely N+1)"""
+    pass
+
+_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_SQL_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_SQL_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SQL_WHITESPACE = re.compile(r"\s+")
+_SQL_IDENTIFIER = re.compile(r'"(?:[^"]|"")*"')
+# Anywhere in the statement, so writes in CTEs (WITH ... INSERT) and row locks
+# (SELECT ... FOR UPDATE / FOR SHARE), which also need the primary, count too
+_SQL_WRITE = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|COPY|CREATE|ALTER|DROP|TRUNCATE|SHARE)\b", re.IGNORECASE)
+
+def normalize_sql(query):
+    """Collapse whitespace, comments and literals so repeats of one statement compare equal"""
+    query = _SQL_STRING.sub('?', query)
+    query = _SQL_COMMENT.sub(' ', query)
+    query = _SQL_NUMBER.sub('?', query)
+    return _SQL_WHITESPACE.sub(' ', query).strip()
+
+def is_write_sql(sql):
+    """Whether a normalized statement writes (or locks rows) by its keywords.
+
+    Writes hidden in function calls (SELECT some_function()) can't be seen
+    here; their callers mark the cursor with get_db_cursor(write=True).
+    """
+    return _SQL_WRITE.search(_SQL_IDENTIFIER.sub('?', sql)) is not None
+
+class QueryStats:
+    """Statements issued in one request: count, DB time, slowest and repeats"""
+
+    def __init__(self, repeat_threshold, raise_on_repeat=False):
+        self.repeat_threshold = repeat_threshold
+        self.raise_on_repeat = raise_on_repeat
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql = None
+        self.writes = 0
+        self.repeats = {}
+
+    def before(self, sql, write=False):
+        """Count a statement about to run and flag it once it repeats too often.
+
+        `write` marks a statement known to write whatever its keywords say.
+        """
+        sql = normalize_sql(sql)
+        if write or is_write_sql(sql):
+            self.writes += 1
+        runs = self.repeats.get(sql, 0) + 1
+        self.repeats[sql] = runs
+        if runs == self.repeat_threshold + 1:
+            message = (f"Statement ran more than {self.repeat_threshold} times in one request "
+                       f"(possible N+1): {sql[:200]}")
+            if self.raise_on_repeat:
+                raise RepeatedQueryError(message)
+            current_app.logger.warning(message)
+        return sql
+
+    def record(self, sql, duration):
+        self.count += 1
+        self.total_time += duration
+        if duration > self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_sql = sql
+
+def get_query_stats():
+    """QueryStats of the current app context, created on first use"""
+    if 'db_query_stats' not in g:
+        g.db_query_stats = QueryStats(
+            repeat_threshold=int(current_app.config.get(
+                'QUERY_REPEAT_THRESHOLD', os.getenv('QUERY_REPEAT_THRESHOLD', 10))),
+            raise_on_repeat=current_app.config.get('QUERY_REPEAT_RAISE', False)
+        )
+    return g.db_query_stats
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """Cursor that records every statement in the request's QueryStats"""
+
+    write = False  # Set by get_db_cursor(write=True): count every statement as a write
+
+    def _instrumented(self, run, query, *args):
+        if not has_app_context():
+            return run(query, *args)
+        if not isinstance(query, str):
+            query = query.as_string(self) if hasattr(query, 'as_string') else query.decode()
+        stats = get_query_stats()
+        sql = stats.before(query, self.write)
+        apply_query_timeout(self.connection)
+        started = time.perf_counter()
+        try:
+            return run(query, *args)
+        finally:
+            stats.record(sql, time.perf_counter() - started)
+
+    def execute(self, query, vars=None):
+        return self._instrumented(super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._instrumented(super().executemany, query, vars_list)
+
+class PooledConnection(psycopg2.extensions.connection):
+    """Connection that carries the bookkeeping the pool needs"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = InstrumentedCursor
+        self.last_used = time.monotonic()
+        self.default_statement_timeout = None
+        self.local_statement_timeout = None
+
+class ConnectionPool:
+    """Thread-safe connection pool with bounded checkout waits and live stats.
+
+    Checkouts block for up to `timeout` seconds once `maxconn` connections are
+    in use and then raise PoolTimeoutError, so exhaustion shows up as queueing
+    in the stats instead of an immediate PoolError. Connections idle for longer
+    than `ping_after` seconds are checked with a round trip before being handed
+    out, and returned connections are rolled back or recycled if broken.
+    """
+
+    def __init__(self, minconn, maxconn, timeout=10.0, ping_after=30.0, read_only=False,
+                 statement_timeout=None, **db_config):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.read_only = read_only
+        self.statement_timeout = statement_timeout
+        self._db_config = db_config
+        self._cond = threading.Condition()
+        self._idle = []
+        self._size = 0  # open connections, including ones being opened
+        self._waiting = 0
+        self._closed = False
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'recycles': 0,
+            'connections_opened': 0
+        }
+
+        for _ in range(minconn):
+            self._size += 1
+            self._idle.append(self._connect())
+
+    def _connect(self):
+        options = {}
+        if self.statement_timeout:
+            options['options'] = f"-c statement_timeout={self.statement_timeout}"
+        conn = psycopg2.connect(connection_factory=PooledConnection, **options, **self._db_config)
+        conn.set_session(readonly=self.read_only, autocommit=False)  # Ensure transaction control
+        conn.default_statement_timeout = self.statement_timeout
+        with self._cond:
+            self._stats['connections_opened'] += 1
+        return conn
+
+    def _reserve(self, deadline):
+        """Pop an idle connection, or reserve a slot for a new one (returns None)"""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise ConnectionError("Connection pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.maxconn:
+                    self._size += 1
+                    return None
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available after {self.timeout:.1f}s "
+                        f"({self.maxconn} checked out)"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _is_usable(self, conn):
+        """Check an idle connection before handing it out"""
+        if conn.closed:
+            return False
+        if time.monotonic() - conn.last_used < self.ping_after:
+            return True
+        try:
+            # A plain cursor: the ping is not one of the request's queries
+            with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        """Close a connection and free its slot"""
+        try:
+            if not conn.closed:
+                conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats['recycles'] += 1
+            self._cond.notify()
+
+    def getconn(self, timeout=None):
+        """Check out a connection, waiting up to `timeout` seconds for one to free up"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+
+        while True:
+            conn = self._reserve(started + timeout)
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except psycopg2.Error:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                break
+            if self._is_usable(conn):
+                break
+            self._discard(conn)
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self._stats['checkouts'] += 1
+            if waited > 0.001:
+                self._stats['waits'] += 1
+            self._stats['wait_time_total'] += waited
+            self._stats['wait_time_max'] = max(self._stats['wait_time_max'], waited)
+        return conn
+
+    def putconn(self, conn, close=False):
+        """Return a connection, rolling back open work and recycling broken ones"""
+        if not close and not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                    close = True
+                elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                close = True
+
+        if close or conn.closed or self._closed:
+            self._discard(conn)
+            return
+
+        conn.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def stats(self):
+        """Snapshot of pool usage for monitoring"""
+        with self._cond:
+            return {
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'size': self._size,
+                'idle': len(self._idle),
+                'checked_out': self._size - len(self._idle),
+                'waiting': self._waiting,
+                **self._stats
+            }
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+# Initialize connection pools for both databases, plus the optional read replica
 prod_pool = None
 test_pool = None
+replica_pool = None
+_pool_lock = threading.Lock()
 
-def get_db():
-    """Get a database connection from the appropriate pool."""
+def get_pool():
+    """Get (creating on first use) the pool for the current app mode"""
     global prod_pool, test_pool
-    
+
+    is_testing = current_app.config.get('TESTING', False) if current_app else False
+    with _pool_lock:
+        if is_testing:
+            if test_pool is None:
+                test_pool = ConnectionPool(**get_pool_config(), **get_db_config())
+            return test_pool
+        if prod_pool is None:
+            prod_pool = ConnectionPool(**get_pool_config(), **get_db_config())
+        return prod_pool
+
+def get_replica_pool():
+    """Get (creating on first use) the read replica pool, or None without a replica"""
+    global replica_pool
+
+    replica_config = get_replica_config()
+    if replica_config is None:
+        return None
+    with _pool_lock:
+        if replica_pool is None:
+            replica_pool = ConnectionPool(**get_pool_config(), read_only=True, **replica_config)
+        return replica_pool
+
+def get_pool_stats():
+    """Live statistics for the pool used by the current app"""
+    return get_pool().stats()
+
+def get_replica_pool_stats():
+    """Live statistics for the read replica pool, or None without a replica"""
+    pool_to_use = get_replica_pool()
+    return pool_to_use.stats() if pool_to_use else None
+
+def get_db():
+    """Get the connection backing the current unit of work.
+
+    The first call in an app context checks a connection out of the pool;
+    every later call in the same context reuses it, so all model calls in a
+    request share one connection and one transaction.
+    """
     if 'db' not in g:
         try:
-            # Determine which pool to use
-            is_testing = current_app.config.get('TESTING', False) if current_app else False
-            
-            # Get or create the appropriate pool
-            if is_testing:
-                if test_pool is None:
-                    db_config = get_db_config()
-                    test_pool = SimpleConnectionPool(1, 20, **db_config)
-                pool_to_use = test_pool
-            else:
-                if prod_pool is None:
-                    db_config = get_db_config()
-                    prod_pool = SimpleConnectionPool(1, 20, **db_config)
-                pool_to_use = prod_pool
-            
-            # Get connection from pool
-            conn = pool_to_use.getconn()
-            conn.autocommit = False  # Ensure transaction control
-            g.db = conn
+            pool_to_use = get_pool()
+            g.db = pool_to_use.getconn()
             g.db_pool = pool_to_use  # Store which pool we're using
-            
+            g.db_connections_opened = g.get('db_connections_opened', 0) + 1
+        except PoolTimeoutError as e:
+            current_app.logger.warning(f"Database pool exhausted: {str(e)}")
+            raise
         except psycopg2.Error as e:
             current_app.logger.error(f"Database connection failed: {str(e)}")
             raise DatabaseError(f"Failed to connect to database: {str(e)}")
     
     return g.db
 
-def close_db(e=None):
-    """Close the database connection."""
-    db = g.pop('db', None)
-    db_pool = g.pop('db_pool', None)
-    
-    if db is not None and db_pool is not None:
+def get_replica_db():
+    """Get the read replica connection of the current app context"""
+    if 'db_replica' not in g:
         try:
-            if db.closed == 0:  # Only return connection if it's not closed
-                db_pool.putconn(db)
+            pool_to_use = get_replica_pool()
+            g.db_replica = pool_to_use.getconn()
+            g.db_replica_pool = pool_to_use
+            g.db_connections_opened = g.get('db_connections_opened', 0) + 1
+        except PoolTimeoutError as e:
+            current_app.logger.warning(f"Replica pool exhausted: {str(e)}")
+            raise
         except psycopg2.Error as e:
-            current_app.logger.error(f"Error closing database connection: {str(e)}")
+            current_app.logger.error(f"Replica connection failed: {str(e)}")
+            raise DatabaseError(f"Failed to connect to read replica: {str(e)}")
+
+    return g.db_replica
+
+def use_replica():
+    """Whether read-only queries may go to the replica right now.
+
+    Not once this request has written, and not while the session is pinned to
+    the primary after a recent write, so the page reload that follows an edit
+    reads its own writes. Never inside primary_queries().
+    """
+    if get_replica_config() is None or g.get('db_primary_only', False):
+        return False
+    stats = g.get('db_query_stats')
+    if stats is not None and stats.writes:
+        return False
+    if has_request_context() and session.get('db_primary_until', 0) > time.time():
+        return False
+    return True
 
 @contextmanager
-def get_db_cursor():
-    """Get a database cursor with transaction management"""
-    db = get_db()
+def read_only_queries():
+    """Mark the cursors opened in this block as read-only (replica-eligible)"""
+    previous = g.get('db_read_only', False)
+    g.db_read_only = True
+    try:
+        yield
+    finally:
+        g.db_read_only = previous
+
+@contextmanager
+def primary_queries():
+    """Read current data in this block: from the primary, bypassing the org cache.
+
+    For reads whose result must be at least as new as something read from the
+    primary before, like a page sent with an ETag, or a result to be cached.
+    """
+    previous = g.get('db_primary_only', False)
+    g.db_primary_only = True
+    try:
+        yield
+    finally:
+        g.db_primary_only = previous
+
+def read_only(f):
+    """Decorator for model functions and GET-only views that never write"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with read_only_queries():
+            return f(*args, **kwargs)
+    return decorated_function
+
+def get_connections_opened():
+    """Number of pooled connections checked out in the current app context"""
+    return g.get('db_connections_opened', 0)
+
+def on_commit(callback):
+    """Run `callback` once the current unit of work has committed; dropped on rollback"""
+    g.setdefault('db_on_commit', []).append(callback)
+
+def commit_db():
+    """Commit the current unit of work, if a connection was used"""
+    db = g.get('db')
+    if db is not None and not db.closed:
+        db.commit()
+    for callback in g.pop('db_on_commit', []):
+        callback()
+
+def rollback_db():
+    """Roll back the current unit of work, if a connection was used"""
+    g.pop('db_on_commit', None)
+    db = g.get('db')
+    if db is not None and not db.closed:
+        db.rollback()
+
+def commit_request(response):
+    """after_request hook: commit once per request, or roll back on server errors.
+
+    Committing before the response is sent means a failed commit still turns
+    into a 500 instead of a success the client can't trust.
+    """
+    if response.status_code >= 500:
+        rollback_db()
+        return response
+
+    commit_db()
+    stats = g.get('db_query_stats')
+    if stats is not None and stats.writes and get_replica_config() is not None:
+        # Serve this client's next reads from the primary until the replica catches up
+        pin_seconds = float(current_app.config.get(
+            'REPLICA_PIN_SECONDS', os.getenv('REPLICA_PIN_SECONDS', 5)))
+        session['db_primary_until'] = time.time() + pin_seconds
+    return response
+
+def report_query_stats(response):
+    """after_request hook: log the request's DB usage, and send it as headers in debug mode"""
+    stats = g.get('db_query_stats')
+    if stats is None or not stats.count:
+        return response
+
+    total_ms = stats.total_time * 1000
+    slowest_ms = stats.slowest_time * 1000
+    current_app.logger.info(
+        f"{request.method} {request.path}: {stats.count} queries, {total_ms:.1f} ms in DB, "
+        f"{get_connections_opened()} connection(s), slowest {slowest_ms:.1f} ms: {stats.slowest_sql[:120]}"
+    )
+    if current_app.debug or current_app.config.get('DB_STATS_HEADERS', False):
+        response.headers['X-DB-Queries'] = str(stats.count)
+        response.headers['X-DB-Connections'] = str(get_connections_opened())
+        response.headers['Server-Timing'] = f'db;dur={total_ms:.1f}, db-slowest;dur={slowest_ms:.1f}'
+    return response
+
+def close_db(e=None):
+    """Finish the unit of work and return the connection to its pool."""
+    try:
+        if e is None:
+            commit_db()  # No-op for requests, already committed in commit_request
+    except psycopg2.Error as commit_error:
+        current_app.logger.error(f"Error committing database transaction: {str(commit_error)}")
+    finally:
+        db = g.pop('db', None)
+        db_pool = g.pop('db_pool', None)
+        replica = g.pop('db_replica', None)
+        replica_pool_used = g.pop('db_replica_pool', None)
+        g.pop('db_savepoints', None)
+        g.pop('db_on_commit', None)
+
+        if db is not None and db_pool is not None:
+            db_pool.putconn(db)  # Rolls back anything left uncommitted
+        if replica is not None and replica_pool_used is not None:
+            replica_pool_used.putconn(replica)
+
+@contextmanager
+def get_db_cursor(read_only=None, name=None, write=False):
+    """Get a cursor on the current unit of work.
+
+    Statements are not committed here; commit_request/close_db commit once at
+    the end of the request. On error the innermost savepoint is rolled back by
+    savepoint(), or the whole unit of work when none is open, and the error is
+    re-raised as DatabaseError.
+
+    Read-only cursors (read_only=True, or inside read_only_queries()) go to the
+    read replica when one is configured and use_replica() allows it.
+
+    A `name` opens a server-side cursor, which fetches its result in batches
+    of cursor.itersize rows as it is iterated instead of all at once.
+
+    `write=True` marks statements that write without saying so, such as a
+    SELECT of a function that modifies tables: they run on the primary and
+    count as writes (replica pin, cache bypass) like INSERT/UPDATE/DELETE.
+    """
+    if write:
+        read_only = False
+    elif read_only is None:
+        read_only = g.get('db_read_only', False)
+    db = get_replica_db() if read_only and use_replica() else get_db()
+    cursor = db.cursor(name=name) if name else db.cursor()
+    if write:
+        cursor.write = True
     try:
-        cursor = db.cursor()
         yield cursor
-        db.commit()  # Commit the transaction if no errors
-    except Exception as e:
-        db.rollback()  # Rollback on error
+    except DatabaseError:
+        _rollback_unless_in_savepoint(db)
         raise
+    except psycopg2.errors.QueryCanceled as e:
+        _rollback_unless_in_savepoint(db)
+        record_timeout('statement_timeouts')
+        raise QueryTimeoutError(f"Query cancelled after exceeding its time limit: {str(e)}") from e
+    except Exception as e:
+        _rollback_unless_in_savepoint(db)
+        raise DatabaseError(str(e)) from e
     finally:
         cursor.close()
 
-def init_db():
-    """Initialize the database with required tables"""
-    # Always reset tables in testing mode
-    reset_db = current_app.config.get('TESTING', False) or os.getenv('RESET_DB', 'false').lower() == 'true'
-    
+def _rollback_unless_in_savepoint(db):
+    if db is g.get('db') and g.get('db_savepoints'):
+        return  # savepoint() rolls back just the failed block
+    if not db.closed:
+        db.rollback()
+
+@contextmanager
+def savepoint():
+    """Run a block in a nested savepoint of the current unit of work.
+
+    If the block raises, only its own changes are rolled back and the rest of
+    the request's transaction stays usable.
+    """
+    db = get_db()
+    depth = g.get('db_savepoints', 0) + 1
+    name = f"uow_savepoint_{depth}"
+    with db.cursor() as cur:
+        cur.execute(f"SAVEPOINT {name}")
+    g.db_savepoints = depth
     try:
-        # Create a connection for DDL operations
-        db_config = get_db_config()
-        ddl_conn = psycopg2.connect(**db_config)
-        ddl_conn.autocommit = True  # Use autocommit for DDL
-        
+        yield
+    except Exception:
+        with db.cursor() as cur:
+            cur.execute(f"ROLLBACK TO SAVEPOINT {name}")
+        raise
+    else:
+        with db.cursor() as cur:
+            cur.execute(f"RELEASE SAVEPOINT {name}")
+    finally:
+        g.db_savepoints = depth - 1
+
+# Optional async mode (ASYNC_DB): the JSON edit endpoints run their statements
+# on an asyncpg pool driven by one background event loop, so a few connections
+# serve every in-flight edit of the process instead of one per worker thread.
+# The request threads still wait for their transactions (see async_variant),
+# so this bounds connections, not the number of edits a worker can serve.
+
+def async_db_enabled():
+    """Whether the JSON endpoints use the async database path"""
+    value = current_app.config.get('ASYNC_DB', os.getenv('ASYNC_DB', 'false'))
+    if isinstance(value, str):
+        return value.lower() == 'true'
+    return bool(value)
+
+class AsyncConnection:
+    """asyncpg connection handed to async model functions.
+
+    Records every statement with its duration, so the request thread can feed
+    them into its QueryStats once the transaction is done.
+    """
+
+    def __init__(self):
+        self.conn = None
+        self.statements = []
+
+    async def _timed(self, run, query, *args):
+        started = time.perf_counter()
         try:
-            with ddl_conn.cursor() as cur:
-                if reset_db:
-                    current_app.logger.info("Resetting database tables...")
-                    # Drop existing tables in correct order
-                    cur.execute("""
-                        DROP TABLE IF EXISTS assignments CASCADE;
-                        DROP TABLE IF EXISTS people CASCADE;
-                        DROP TABLE IF EXISTS projects CASCADE;
-                        DROP TABLE IF EXISTS otps CASCADE;
-                        DROP TABLE IF EXISTS organization_users CASCADE;
-                        DROP TABLE IF EXISTS users CASCADE;
-                        DROP TABLE IF EXISTS organizations CASCADE;
-                    """)
+            return await run(query, *args)
         finally:
-            ddl_conn.close()
-        
-        # Create a new connection for table creation and data
-        db = psycopg2.connect(**db_config)
-        db.autocommit = False
-        
-        with db.cursor() as cur:
-            # Create organizations table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS organizations (
-                    id SERIAL PRIMARY KEY,
-                    name VARCHAR(100) NOT NULL,
-                    superuser_id INTEGER,  -- Will be updated after user creation
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Create users table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id SERIAL PRIMARY KEY,
-                    email VARCHAR(255) UNIQUE NOT NULL,
-                    name VARCHAR(100) NOT NULL,
-                    role VARCHAR(50) NOT NULL CHECK (role IN ('Superuser', 'Privileged', 'Normal')),
-                    is_active BOOLEAN DEFAULT TRUE,
-                    is_platform_admin BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Add foreign key to organizations after users table exists
+            self.statements.append((query, time.perf_counter() - started))
+
+    async def execute(self, query, *args):
+        return await self._timed(self.conn.execute, query, *args)
+
+    async def fetch(self, query, *args):
+        return await self._timed(self.conn.fetch, query, *args)
+
+    async def fetchrow(self, query, *args):
+        return await self._timed(self.conn.fetchrow, query, *args)
+
+    async def fetchval(self, query, *args):
+        return await self._timed(self.conn.fetchval, query, *args)
+
+class AsyncConnectionPool:
+    """asyncpg pool owned by a dedicated event loop thread.
+
+    Flask runs each async view in an event loop of its own, which an asyncpg
+    pool cannot be shared across, so transactions are submitted to the pool's
+    loop and awaited from the caller's. Acquiring a connection waits up to
+    `timeout` seconds and then raises PoolTimeoutError, like ConnectionPool.
+    """
+
+    def __init__(self, minconn, maxconn, timeout=10.0, ping_after=None, read_only=False,
+                 statement_timeout=None, dbname=None, **db_config):
+        if asyncpg is None:
+            raise ConnectionError("ASYNC_DB is enabled but asyncpg is not installed")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.statement_timeout = statement_timeout
+        self._stats_lock = threading.Lock()
+        self._waiting = 0
+        self._stats = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0
+        }
+
+        server_settings = {}
+        if statement_timeout:
+            server_settings['statement_timeout'] = str(statement_timeout)
+        if read_only:
+            server_settings['default_transaction_read_only'] = 'on'
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='async-db-pool', daemon=True)
+        self._thread.start()
+        try:
+            self._pool = self.submit(asyncpg.create_pool(
+                min_size=minconn, max_size=maxconn, database=dbname,
+                server_settings=server_settings, **db_config
+            )).result()
+        except Exception as e:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            raise ConnectionError(f"Failed to create async connection pool: {str(e)}") from e
+
+    def submit(self, coro):
+        """Schedule `coro` on the pool's loop; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def transaction(self, session, fn, args, statement_ms=None):
+        """Run `fn(session, *args)` in one transaction (on the pool's loop)"""
+        started = time.monotonic()
+        self._waiting += 1
+        try:
+            conn = await asyncio.wait_for(self._pool.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            with self._stats_lock:
+                self._stats['timeouts'] += 1
+            raise PoolTimeoutError(
+                f"No async database connection available after {self.timeout:.1f}s "
+                f"({self.maxconn} checked out)"
+            )
+        finally:
+            self._waiting -= 1
+
+        waited = time.monotonic() - started
+        with self._stats_lock:
+            self._stats['checkouts'] += 1
+            self._stats['wait_time_total'] += waited
+            self._stats['wait_time_max'] = max(self._stats['wait_time_max'], waited)
+        try:
+            session.conn = conn
+            async with conn.transaction():
+                if statement_ms and statement_ms != self.statement_timeout:
+                    await conn.execute(f"SET LOCAL statement_timeout = {int(statement_ms)}")
+                return await fn(session, *args)
+        finally:
+            session.conn = None
+            await self._pool.release(conn)
+
+    def stats(self):
+        """Snapshot of pool usage for monitoring"""
+        size = self._pool.get_size()
+        idle = self._pool.get_idle_size()
+        with self._stats_lock:
+            return {
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'size': size,
+                'idle': idle,
+                'checked_out': size - idle,
+                'waiting': self._waiting,
+                **self._stats
+            }
+
+    def closeall(self):
+        """Close the pool's connections and stop its event loop"""
+        try:
+            self.submit(self._pool.close()).result(self.timeout)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+prod_async_pool = None
+test_async_pool = None
+
+def get_async_pool():
+    """Get (creating on first use) the async pool for the current app mode"""
+    global prod_async_pool, test_async_pool
+
+    is_testing = current_app.config.get('TESTING', False)
+    with _pool_lock:
+        if is_testing:
+            if test_async_pool is None:
+                test_async_pool = AsyncConnectionPool(**get_pool_config(), **get_db_config())
+            return test_async_pool
+        if prod_async_pool is None:
+            prod_async_pool = AsyncConnectionPool(**get_pool_config(), **get_db_config())
+        return prod_async_pool
+
+def get_async_pool_stats():
+    """Live statistics for the async pool, or None when ASYNC_DB is off"""
+    return get_async_pool().stats() if async_db_enabled() else None
+
+async def run_async_transaction(fn, *args):
+    """Await `fn(conn, *args)` in one transaction on the async pool.
+
+    The async counterpart of a request's unit of work: it commits when `fn`
+    returns and rolls back when it raises. The route's statement timeout and
+    the remaining request deadline apply as they do for get_db_cursor(), the
+    statements are added to the request's QueryStats, and driver errors are
+    re-raised as QueryTimeoutError or DatabaseError. Repeated statements are
+    only raised as RepeatedQueryError when the transaction itself succeeded.
+    """
+    pool_to_use = get_async_pool()
+    statement_ms = statement_budget_ms(pool_to_use.statement_timeout)
+    session = AsyncConnection()
+    try:
+        future = pool_to_use.submit(pool_to_use.transaction(session, fn, args, statement_ms))
+        result = await asyncio.wrap_future(future)
+    except asyncpg.exceptions.QueryCanceledError as e:
+        record_timeout('statement_timeouts')
+        raise QueryTimeoutError(f"Query cancelled after exceeding its time limit: {str(e)}") from e
+    except (asyncpg.PostgresError, asyncpg.InterfaceError, OSError) as e:
+        raise DatabaseError(str(e)) from e
+    finally:
+        repeated = _record_statements(session.statements)
+    if repeated is not None:
+        raise repeated
+    return result
+
+def _record_statements(statements):
+    """Add statements that already ran to the request's QueryStats.
+
+    Returns the RepeatedQueryError they triggered, if any, instead of raising
+    it, so that it cannot replace the error the statements ended with.
+    """
+    stats = get_query_stats()
+    repeated = None
+    for query, duration in statements:
+        try:
+            sql = stats.before(query)
+        except RepeatedQueryError as e:
+            sql = normalize_sql(query)
+            repeated = repeated or e
+        stats.record(sql, duration)
+    return repeated
+
+# Versioned migrations: migrations/NN_name.sql, applied in NN order and
+# recorded in schema_version. 02-04 predate the runner and are folded into
+# 00_reset_db.sql, the baseline schema a fresh database is created from;
+# 16 repairs databases created from the baseline before 02 was folded in.
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+BASELINE_MIGRATION = '00_reset_db.sql'
+BASELINE_VERSION = 4
+MIGRATION_LOCK_ID = 7_460_200_104  # pg_advisory_lock key shared by every worker
+
+def list_migrations():
+    """Return [(version, filename)] for the migration files, in version order"""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = re.match(r'^(\d+)_\w+\.sql$', filename)
+        if match:
+            migrations.append((int(match.group(1)), filename))
+    return sorted(migrations)
+
+def _read_migration(filename):
+    with open(os.path.join(MIGRATIONS_DIR, filename), 'r') as f:
+        return f.read()
+
+def run_migrations(conn):
+    """Apply pending migrations on `conn` and return the versions applied.
+
+    Holds a session advisory lock for the whole run, so workers or deploys
+    starting together queue up instead of racing on DDL. Each migration is
+    committed together with its schema_version row. A database without
+    schema_version is first stamped at BASELINE_VERSION, after creating the
+    baseline schema if it has no tables yet.
+    """
+    previous_autocommit = conn.autocommit
+    conn.autocommit = False
+    applied = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
             try:
                 cur.execute("""
-                    ALTER TABLE organizations 
-                    ADD CONSTRAINT fk_superuser 
-                    FOREIGN KEY (superuser_id) 
-                    REFERENCES users(id)
+                    SELECT to_regclass('schema_version') IS NOT NULL,
+                           to_regclass('people') IS NOT NULL
                 """)
-            except psycopg2.errors.DuplicateObject:
-                db.rollback()  # Rollback the failed constraint
-                
-            # Create organization_users table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS organization_users (
-                    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                    organization_id INTEGER REFERENCES organizations(id) ON DELETE CASCADE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (user_id, organization_id)
-                )
-            """)
-            
-            # Create otps table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS otps (
-                    id SERIAL PRIMARY KEY,
-                    email VARCHAR(255) REFERENCES users(email) ON DELETE CASCADE,
-                    otp VARCHAR(6) NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    expires_at TIMESTAMP NOT NULL,
-                    is_valid BOOLEAN DEFAULT TRUE
-                )
-            """)
-            
-            # Create people table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS people (
-                    id SERIAL PRIMARY KEY,
-                    name VARCHAR(100) NOT NULL,
-                    role VARCHAR(100) NOT NULL,
-                    availability VARCHAR(50) NOT NULL,
-                    organization_id INTEGER REFERENCES organizations(id) ON DELETE CASCADE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Create projects table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS projects (
-                    id SERIAL PRIMARY KEY,
-                    name VARCHAR(100) NOT NULL,
-                    project_type VARCHAR(50) NOT NULL,
-                    status VARCHAR(50) NOT NULL,
-                    start_date DATE,
-                    end_date DATE,
-                    organization_id INTEGER REFERENCES organizations(id) ON DELETE CASCADE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Create assignments table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS assignments (
-                    id SERIAL PRIMARY KEY,
-                    project_id INTEGER REFERENCES projects(id) ON DELETE CASCADE,
-                    person_id INTEGER REFERENCES people(id) ON DELETE CASCADE,
-                    allocation INTEGER NOT NULL,
-                    start_date DATE,
-                    end_date DATE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(project_id, person_id)
-                )
-            """)
-            
-            db.commit()
-            
-    except Exception as e:
-        current_app.logger.error(f"Error initializing database: {str(e)}")
-        if 'db' in locals():
-            db.rollback()
-        raise
+                has_versions, has_tables = cur.fetchone()
+                if not has_versions:
+                    if not has_tables:
+                        cur.execute(_read_migration(BASELINE_MIGRATION))
+                    cur.execute("""
+                        CREATE TABLE schema_version (
+                            version INTEGER PRIMARY KEY,
+                            name VARCHAR(255) NOT NULL,
+                            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        )
+                    """)
+                    for version, filename in list_migrations():
+                        if version <= BASELINE_VERSION:
+                            cur.execute("""
+                                INSERT INTO schema_version (version, name)
+                                VALUES (%s, %s)
+                            """, (version, filename))
+                    conn.commit()
+
+                cur.execute("SELECT version FROM schema_version")
+                done = {row[0] for row in cur.fetchall()}
+                for version, filename in list_migrations():
+                    if version in done or version <= BASELINE_VERSION:
+                        continue
+                    cur.execute(_read_migration(filename))
+                    cur.execute("""
+                        INSERT INTO schema_version (version, name)
+                        VALUES (%s, %s)
+                    """, (version, filename))
+                    conn.commit()
+                    applied.append(version)
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+                conn.commit()
     finally:
-        if 'db' in locals():
-            db.close()
+        conn.autocommit = previous_autocommit
+    return applied
 
-def get_db_connection():
-    """Get a database connection"""
+def apply_migrations():
+    """Apply pending migrations on a dedicated connection (used by `manage.py migrate`)"""
     try:
-        conn = psycopg2.connect(
-            dbname=os.getenv('DB_NAME', 'eagleeye'),
-            user=os.getenv('DB_USER', 'postgres'),
-            password=os.getenv('DB_PASSWORD', ''),
-            host=os.getenv('DB_HOST', 'localhost'),
-            port=os.getenv('DB_PORT', '5432')
-        )
-        return conn
+        conn = psycopg2.connect(**get_db_config())
     except psycopg2.Error as e:
-        raise DatabaseError(f"Could not connect to database: {str(e)}")
+        raise ConnectionError(f"Could not connect to database: {str(e)}")
+    try:
+        return run_migrations(conn)
+    except psycopg2.Error as e:
+        raise DatabaseError(f"Migration failed: {str(e)}")
+    finally:
+        conn.close()
 
-@contextmanager
-def get_db_cursor():
-    """Context manager for database cursor"""
-    conn = get_db_connection()
+def check_schema_version():
+    """Compare the schema version with the newest migration; returns (current, latest).
+
+    This is all app startup does with the schema: one query on a pooled
+    connection. A database behind the migration files is logged so that
+    `manage.py migrate` gets run; current is None for an unversioned database.
+    """
+    latest = list_migrations()[-1][0]
+    try:
+        with get_db_cursor() as cur:
+            cur.execute("SELECT MAX(version) FROM schema_version")
+            current = cur.fetchone()[0]
+    except DatabaseError as e:
+        if not isinstance(e.__cause__, psycopg2.errors.UndefinedTable):
+            raise
+        current = None
+
+    if current is None or current < latest:
+        current_app.logger.warning(
+            f"Database schema is at version {current}, migrations go up to {latest}. "
+            "Run `python manage.py migrate`."
+        )
+    return current, latest
+
+def init_db():
+    """Create or upgrade the schema by running the migrations.
+
+    In testing mode (or with RESET_DB=true) every table is dropped and the
+    baseline schema recreated first.
+    """
+    reset_db = current_app.config.get('TESTING', False) or os.getenv('RESET_DB', 'false').lower() == 'true'
+    
     try:
-        with conn.cursor() as cursor:
-            yield cursor
-            conn.commit()
+        conn = psycopg2.connect(**get_db_config())
+        try:
+            if reset_db:
+                current_app.logger.info("Resetting database tables...")
+                with conn.cursor() as cur:
+                    cur.execute(_read_migration(BASELINE_MIGRATION))
+                conn.commit()
+            
+            applied = run_migrations(conn)
+            if applied:
+                current_app.logger.info(f"Applied migrations: {applied}")
+        finally:
+            conn.close()
+            
     except Exception as e:
-        conn.rollback()
-        raise DatabaseError(str(e))
-    finally:
-        conn.close() 
\ No newline at end of file
+        current_app.logger.error(f"Error initializing database: {str(e)}")
+        raise
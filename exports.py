@@ -0,0 +1,172 @@
+"""Reports exported as CSV, either streamed from /export/<report_type> or built
+off-request as export jobs.
+
+A job is a row of export_jobs (migration 14). The request that queues it
+hands it to this process's worker pool once its transaction commits; a
+worker claims it, writes the report while recording progress, and stores
+the file for EXPORT_RETENTION_HOURS. Each progress update runs in its own
+app context, hence its own connection and transaction, so pollers see it
+while the report is still being read. Jobs whose process died stop
+heartbeating and are failed by the scheduler's retention sweep.
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import io
+import logging
+import os
+import threading
+
+from flask import current_app
+
+from database import commit_db, on_commit
+from models.core import (
+    count_allocation_report_rows, count_project_roster_rows, get_all_people,
+    iter_allocation_report, iter_project_roster,
+    claim_export_job, fail_export_job, finish_export_job, record_export_progress
+)
+from routes.calendar import EMPLOYEES_FILE, HOLIDAYS_FILE, load_json
+
+logger = logging.getLogger(__name__)
+
+# Rows written between two progress updates of a job
+EXPORT_PROGRESS_ROWS = 1000
+
+# A report: CSV header, row count (for progress) and rows of an organization
+# as of a date, and the download's file name prefix
+ExportReport = namedtuple('ExportReport', ['columns', 'count_rows', 'rows', 'filename'])
+
+def get_export_config():
+    """Export job settings from app config or environment"""
+    config = current_app.config
+
+    def setting(name, default, cast):
+        return cast(config.get(name, os.getenv(name, default)))
+
+    return {
+        'workers': setting('EXPORT_WORKERS', 2, int),
+        'retention_hours': setting('EXPORT_RETENTION_HOURS', 24, float),
+        'stale_minutes': setting('EXPORT_STALE_MINUTES', 15, float)
+    }
+
+def _allocation_rows(organization_id, report_date):
+    for row in iter_allocation_report(organization_id, report_date):
+        yield [row.name, row.role, f"{row.total_allocation}%", row.projects]
+
+def _project_roster_rows(organization_id, report_date):
+    for row in iter_project_roster(organization_id):
+        yield [row.project_name, row.project_type, row.status, row.start_date, row.end_date,
+               row.person_name or '', row.person_role or '',
+               f"{row.allocation}%" if row.allocation is not None else '',
+               row.assignment_start_date or '', row.assignment_end_date or '']
+
+def _approved_time_off(organization_id):
+    """Approved ZenHR time off (as synced for the calendar) of the organization's people.
+
+    ZenHR employees are matched to people by name, the only key both share.
+    """
+    employees = {str(emp['id']): emp['en'] for emp in load_json(EMPLOYEES_FILE) or []}
+    people = {person.name: person for person in get_all_people(organization_id)}
+    time_off = []
+    for entry in load_json(HOLIDAYS_FILE).get('data', []):
+        if entry.get('status') != 'approved':
+            continue
+        person = people.get(employees.get(str(entry.get('employee', {}).get('id'))))
+        if person is not None:
+            time_off.append((person, entry))
+    time_off.sort(key=lambda item: (item[1].get('from_date') or '', item[0].name))
+    return time_off
+
+def _time_off_rows(organization_id, report_date):
+    for person, entry in _approved_time_off(organization_id):
+        yield [person.name, person.role, (entry.get('from_date') or '')[:10],
+               (entry.get('to_date') or '')[:10], entry.get('amount'), entry.get('notes') or '']
+
+REPORTS = {
+    'allocations': ExportReport(
+        ['Name', 'Role', 'Total Allocation', 'Projects'],
+        count_allocation_report_rows,
+        _allocation_rows, 'resource_allocation'),
+    'project_roster': ExportReport(
+        ['Project', 'Type', 'Status', 'Start Date', 'End Date',
+         'Person', 'Role', 'Allocation', 'Assignment Start', 'Assignment End'],
+        count_project_roster_rows,
+        _project_roster_rows, 'project_roster'),
+    'time_off': ExportReport(
+        ['Name', 'Role', 'From', 'To', 'Days', 'Notes'],
+        lambda organization_id: len(_approved_time_off(organization_id)),
+        _time_off_rows, 'time_off'),
+}
+
+def export_filename(report_type, report_date):
+    return f"{REPORTS[report_type].filename}_{report_date.strftime('%Y-%m-%d')}.csv"
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    """This process's worker pool, created on first use (again after a fork)"""
+    global _executor, _executor_pid
+
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=max(1, get_export_config()['workers']),
+                                           thread_name_prefix='export-worker')
+            _executor_pid = os.getpid()
+        return _executor
+
+def submit_export_job(job_id):
+    """Build a queued job on the worker pool once the current unit of work commits"""
+    app = current_app._get_current_object()
+    executor = _get_executor()
+    on_commit(lambda: executor.submit(run_export_job, app, job_id))
+
+def _in_own_transaction(app, fn, *args):
+    """Run `fn` in a fresh app context and commit it.
+
+    The commit is explicit rather than left to close_db, which only logs a
+    failed commit: a job update that did not commit must fail the job.
+    """
+    with app.app_context():
+        result = fn(*args)
+        commit_db()
+        return result
+
+def run_export_job(app, job_id):
+    """Worker: claim a queued job, build its report and store the file"""
+    try:
+        job = _in_own_transaction(app, claim_export_job, job_id)
+        if job is None:
+            return  # Claimed by another worker, or removed
+        report = REPORTS[job.report_type]
+
+        with app.app_context():
+            config = get_export_config()
+            rows_total = report.count_rows(job.organization_id)
+            _in_own_transaction(app, record_export_progress, job_id, 0, rows_total)
+
+            output = io.BytesIO()
+            text = io.TextIOWrapper(output, encoding='utf-8', newline='')
+            writer = csv.writer(text)
+            writer.writerow(report.columns)
+            rows_done = 0
+            for values in report.rows(job.organization_id, job.report_date):
+                writer.writerow(values)
+                rows_done += 1
+                if rows_done % EXPORT_PROGRESS_ROWS == 0:
+                    _in_own_transaction(app, record_export_progress, job_id, rows_done)
+            text.flush()
+            content = output.getvalue()
+
+        _in_own_transaction(app, finish_export_job, job_id,
+                            export_filename(job.report_type, job.report_date), content,
+                            rows_done, config['retention_hours'])
+        logger.info(f"Export job {job_id} ({job.report_type}) done: {rows_done} rows, "
+                    f"{len(content)} bytes")
+    except Exception as e:
+        logger.error(f"Export job {job_id} failed: {str(e)}", exc_info=True)
+        try:
+            _in_own_transaction(app, fail_export_job, job_id, str(e))
+        except Exception as fail_error:
+            logger.error(f"Could not mark export job {job_id} failed: {str(fail_error)}")
@@ -1,6 +1,8 @@
 import click
-from database import get_db_cursor, DatabaseError
+from app import create_cli_app
+from database import get_db_cursor, DatabaseError, apply_migrations
 from models.auth import create_organization, create_platform_admin
+from models.core import get_organization_ids, roll_over_allocations, sweep_project_statuses
 import os
 from dotenv import load_dotenv
 
@@ -8,9 +10,46 @@ from dotenv import load_dotenv
 load_dotenv()
 
 @click.group()
-def cli():
+@click.pass_context
+def cli(ctx):
     """Management CLI for Beyond EagleEye"""
-    pass
+    # Commands share a pooled unit of work, committed when they finish
+    ctx.with_resource(create_cli_app().app_context())
+
+@cli.command()
+def migrate():
+    """Apply pending database migrations"""
+    try:
+        applied = apply_migrations()
+        if applied:
+            click.echo(f"✓ Applied migrations: {', '.join(str(v) for v in applied)}")
+        else:
+            click.echo("✓ Database schema is up to date")
+    except DatabaseError as e:
+        click.echo(f"✗ Error applying migrations: {str(e)}", err=True)
+
+@cli.command()
+def roll_over():
+    """Recompute current allocations left over from an earlier day (run daily)"""
+    try:
+        refreshed = roll_over_allocations()
+        click.echo(f"✓ Recomputed current allocations for {refreshed} people")
+    except DatabaseError as e:
+        click.echo(f"✗ Error rolling over allocations: {str(e)}", err=True)
+
+@cli.command()
+def sweep_statuses():
+    """Persist today's date-driven project status transitions (run daily)"""
+    try:
+        for organization_id in get_organization_ids():
+            result = sweep_project_statuses(organization_id)
+            if result is None:
+                click.echo(f"- Organization {organization_id}: already swept today")
+            else:
+                changed, duration_ms = result
+                click.echo(f"✓ Organization {organization_id}: {changed} projects updated in {duration_ms:.1f} ms")
+    except DatabaseError as e:
+        click.echo(f"✗ Error sweeping project statuses: {str(e)}", err=True)
 
 @cli.command()
 @click.option('--email', prompt='Platform admin email', help='Email address for the platform admin')
@@ -1,4 +1,9 @@
 -- Drop all existing tables and functions
+DROP VIEW IF EXISTS projects_with_status;
+DROP TABLE IF EXISTS export_jobs CASCADE;
+DROP TABLE IF EXISTS organization_versions CASCADE;
+DROP TABLE IF EXISTS status_sweeps CASCADE;
+DROP TABLE IF EXISTS person_allocations CASCADE;
 DROP TABLE IF EXISTS assignments CASCADE;
 DROP TABLE IF EXISTS projects CASCADE;
 DROP TABLE IF EXISTS people CASCADE;
@@ -6,7 +11,22 @@ DROP TABLE IF EXISTS organization_users CASCADE;
 DROP TABLE IF EXISTS organizations CASCADE;
 DROP TABLE IF EXISTS users CASCADE;
 DROP TABLE IF EXISTS otps CASCADE;
+DROP TABLE IF EXISTS schema_version CASCADE;
 DROP FUNCTION IF EXISTS update_updated_at_column() CASCADE;
+DROP FUNCTION IF EXISTS assignments_refresh_person_allocations() CASCADE;
+DROP FUNCTION IF EXISTS projects_refresh_person_allocations() CASCADE;
+DROP FUNCTION IF EXISTS people_init_person_allocations() CASCADE;
+DROP FUNCTION IF EXISTS roll_over_person_allocations() CASCADE;
+DROP FUNCTION IF EXISTS refresh_person_allocations(INTEGER[]) CASCADE;
+DROP FUNCTION IF EXISTS person_current_allocation(INTEGER) CASCADE;
+DROP FUNCTION IF EXISTS notify_organizations_changed(INTEGER[]) CASCADE;
+DROP FUNCTION IF EXISTS people_notify_organization_changed() CASCADE;
+DROP FUNCTION IF EXISTS projects_notify_organization_changed() CASCADE;
+DROP FUNCTION IF EXISTS assignments_notify_organization_changed() CASCADE;
+DROP FUNCTION IF EXISTS project_automated_status(TEXT, DATE, DATE, DATE) CASCADE;
+DROP FUNCTION IF EXISTS bump_organization_version(INTEGER) CASCADE;
+DROP FUNCTION IF EXISTS bump_organization_version_of_row() CASCADE;
+DROP FUNCTION IF EXISTS bump_organization_version_of_assignment() CASCADE;
 
 -- Create tables in correct order
 CREATE TABLE users (
@@ -42,7 +62,10 @@ CREATE TABLE projects (
     start_date DATE NOT NULL,
     end_date DATE NOT NULL,
     organization_id INTEGER REFERENCES organizations(id) ON DELETE CASCADE,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_by INTEGER REFERENCES users(id),
+    updated_by INTEGER REFERENCES users(id),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE TABLE people (
@@ -51,7 +74,10 @@ CREATE TABLE people (
     role VARCHAR(50) NOT NULL,
     availability VARCHAR(50) NOT NULL,
     organization_id INTEGER REFERENCES organizations(id) ON DELETE CASCADE,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_by INTEGER REFERENCES users(id),
+    updated_by INTEGER REFERENCES users(id),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE TABLE assignments (
@@ -72,4 +98,22 @@ CREATE TABLE otps (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     expires_at TIMESTAMP NOT NULL,
     is_valid BOOLEAN DEFAULT true
-); 
\ No newline at end of file
+); 
+-- Keep updated_at current on projects and people
+CREATE OR REPLACE FUNCTION update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER update_projects_updated_at
+    BEFORE UPDATE ON projects
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TRIGGER update_people_updated_at
+    BEFORE UPDATE ON people
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
@@ -0,0 +1,33 @@
+-- Indexes for the predicates used by routes/main.py, models/core.py and models/auth.py.
+-- Until now only primary keys and UNIQUE(project_id, person_id) existed, so every
+-- org-scoped page scanned people/projects and every allocation sum scanned assignments.
+
+-- get_all_people, dashboard/people pages: WHERE organization_id = ? ORDER BY name
+CREATE INDEX IF NOT EXISTS idx_people_org_name
+    ON people (organization_id, name);
+
+-- get_all_projects, dashboard/projects pages: WHERE organization_id = ? ORDER BY start_date
+CREATE INDEX IF NOT EXISTS idx_projects_org_start_date
+    ON projects (organization_id, start_date);
+
+-- Person-side allocation lookups (people JOIN assignments ON person_id,
+-- calculate_total_allocation). end_date leads the range so finished
+-- assignments are skipped for CURRENT_DATE BETWEEN start_date AND end_date.
+CREATE INDEX IF NOT EXISTS idx_assignments_person_end_date
+    ON assignments (person_id, end_date)
+    INCLUDE (start_date, allocation, project_id);
+
+-- get_current_assignments: ? BETWEEN start_date AND end_date across all assignments
+CREATE INDEX IF NOT EXISTS idx_assignments_dates
+    ON assignments (end_date, start_date);
+
+-- Project-side joins are served by the UNIQUE(project_id, person_id) index.
+
+-- generate_otp/store_otp/verify_otp: WHERE email = ? AND is_valid = TRUE
+CREATE INDEX IF NOT EXISTS idx_otps_email_valid
+    ON otps (email, is_valid);
+
+-- get_user_organizations/get_user_role: organization_users WHERE user_id = ?
+-- (the primary key leads with organization_id in the reset schema)
+CREATE INDEX IF NOT EXISTS idx_organization_users_user
+    ON organization_users (user_id);
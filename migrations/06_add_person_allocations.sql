@@ -0,0 +1,125 @@
+-- Per-person current allocation, maintained on write instead of summed over
+-- every assignment on each page view. Triggers on assignments and project
+-- status changes recompute the affected people; rows are dated, and a row
+-- from an earlier day is stale until roll_over_person_allocations() runs
+-- (daily job), so readers fall back to person_current_allocation() for it.
+
+CREATE TABLE IF NOT EXISTS person_allocations (
+    person_id INTEGER PRIMARY KEY REFERENCES people(id) ON DELETE CASCADE,
+    current_allocation INTEGER NOT NULL DEFAULT 0,
+    as_of DATE NOT NULL DEFAULT CURRENT_DATE
+);
+
+-- The one definition of "current allocation": active assignments on projects
+-- that are not Not Started, Completed or Cancelled
+CREATE OR REPLACE FUNCTION person_current_allocation(p_person_id INTEGER)
+RETURNS INTEGER AS $$
+    SELECT COALESCE(SUM(a.allocation), 0)::INTEGER
+    FROM assignments a
+    JOIN projects pr ON a.project_id = pr.id
+    WHERE a.person_id = p_person_id
+    AND CURRENT_DATE BETWEEN a.start_date AND a.end_date
+    AND pr.status NOT IN ('Not Started', 'Completed', 'Cancelled')
+$$ LANGUAGE sql STABLE;
+
+-- Recompute the given people. Their rows are locked first so concurrent
+-- writers for one person take turns, and each sum sees the other's commit.
+CREATE OR REPLACE FUNCTION refresh_person_allocations(person_ids INTEGER[])
+RETURNS INTEGER AS $$
+DECLARE
+    refreshed INTEGER;
+BEGIN
+    PERFORM 1 FROM people WHERE id = ANY(person_ids) ORDER BY id FOR NO KEY UPDATE;
+
+    INSERT INTO person_allocations (person_id, current_allocation, as_of)
+    SELECT p.id, person_current_allocation(p.id), CURRENT_DATE
+    FROM people p
+    WHERE p.id = ANY(person_ids)
+    ON CONFLICT (person_id) DO UPDATE
+    SET current_allocation = EXCLUDED.current_allocation,
+        as_of = EXCLUDED.as_of;
+    GET DIAGNOSTICS refreshed = ROW_COUNT;
+    RETURN refreshed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Daily roll-over: recompute every person whose row is missing or from an earlier day
+CREATE OR REPLACE FUNCTION roll_over_person_allocations()
+RETURNS INTEGER AS $$
+    SELECT refresh_person_allocations(ARRAY(
+        SELECT p.id
+        FROM people p
+        LEFT JOIN person_allocations pa ON pa.person_id = p.id
+        WHERE pa.as_of IS DISTINCT FROM CURRENT_DATE
+    ))
+$$ LANGUAGE sql;
+
+-- Statement-level, so a bulk insert recomputes each person once
+CREATE OR REPLACE FUNCTION assignments_refresh_person_allocations()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM refresh_person_allocations(ARRAY(SELECT DISTINCT person_id FROM new_rows));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM refresh_person_allocations(ARRAY(
+            SELECT person_id FROM old_rows UNION SELECT person_id FROM new_rows));
+    ELSE
+        PERFORM refresh_person_allocations(ARRAY(SELECT DISTINCT person_id FROM old_rows));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS assignments_allocations_insert ON assignments;
+CREATE TRIGGER assignments_allocations_insert
+    AFTER INSERT ON assignments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION assignments_refresh_person_allocations();
+
+DROP TRIGGER IF EXISTS assignments_allocations_update ON assignments;
+CREATE TRIGGER assignments_allocations_update
+    AFTER UPDATE ON assignments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION assignments_refresh_person_allocations();
+
+DROP TRIGGER IF EXISTS assignments_allocations_delete ON assignments;
+CREATE TRIGGER assignments_allocations_delete
+    AFTER DELETE ON assignments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION assignments_refresh_person_allocations();
+
+-- A project's status decides whether its assignments count
+CREATE OR REPLACE FUNCTION projects_refresh_person_allocations()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_person_allocations(ARRAY(
+        SELECT person_id FROM assignments WHERE project_id = NEW.id));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS projects_allocations_status ON projects;
+CREATE TRIGGER projects_allocations_status
+    AFTER UPDATE OF status ON projects
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE FUNCTION projects_refresh_person_allocations();
+
+-- New people start at 0%
+CREATE OR REPLACE FUNCTION people_init_person_allocations()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO person_allocations (person_id)
+    SELECT id FROM new_rows
+    ON CONFLICT (person_id) DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS people_allocations_insert ON people;
+CREATE TRIGGER people_allocations_insert
+    AFTER INSERT ON people
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION people_init_person_allocations();
+
+SELECT roll_over_person_allocations();
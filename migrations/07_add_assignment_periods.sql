@@ -0,0 +1,13 @@
+-- Assignment date ranges as a daterange with a GiST index, so the write-time
+-- overallocation check finds a person's overlapping assignments with one
+-- index probe (person_id = ? AND period && ?), however many past ones they have.
+-- btree_gist lets the integer person_id share the GiST index.
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+ALTER TABLE assignments
+    ADD COLUMN IF NOT EXISTS period daterange
+    GENERATED ALWAYS AS (daterange(start_date, end_date, '[]')) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_assignments_person_period
+    ON assignments USING gist (person_id, period);
@@ -0,0 +1,11 @@
+-- Trigram indexes for the assignment candidate search, which matches the
+-- query anywhere in a person's name or role (ILIKE '%q%') and tolerates
+-- typos in names (word similarity, q <% name).
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_people_name_trgm
+    ON people USING gin (name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_people_role_trgm
+    ON people USING gin (role gin_trgm_ops);
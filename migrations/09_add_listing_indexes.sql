@@ -0,0 +1,24 @@
+-- Indexes for the keyset-paginated listings (list_people, list_projects):
+-- each page seeks to (organization_id, sort column, id) > (?, last value, last id)
+-- and reads just the page, so its cost doesn't grow with the organization.
+
+-- People by name are served by idx_people_org_name (organization_id, name)
+CREATE INDEX IF NOT EXISTS idx_people_org_role
+    ON people (organization_id, role, id);
+
+CREATE INDEX IF NOT EXISTS idx_projects_org_name
+    ON projects (organization_id, name, id);
+
+CREATE INDEX IF NOT EXISTS idx_projects_org_end_date
+    ON projects (organization_id, end_date, id);
+
+-- Status and type filters, ordered by the default start_date sort
+CREATE INDEX IF NOT EXISTS idx_projects_org_status_start_date
+    ON projects (organization_id, status, start_date, id);
+
+CREATE INDEX IF NOT EXISTS idx_projects_org_type_start_date
+    ON projects (organization_id, project_type, start_date, id);
+
+-- Project name search (ILIKE '%q%')
+CREATE INDEX IF NOT EXISTS idx_projects_name_trgm
+    ON projects USING gin (name gin_trgm_ops);
@@ -0,0 +1,114 @@
+-- Tell every app process which organizations' people, projects or assignments
+-- changed, so they can drop their cached reads of them (cache.py). NOTIFY is
+-- delivered on commit and repeated payloads within a transaction collapse
+-- into one, so a bulk write sends one message per organization.
+
+CREATE OR REPLACE FUNCTION notify_organizations_changed(organization_ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    PERFORM pg_notify('organization_changed', org_id::text)
+    FROM (SELECT DISTINCT unnest(organization_ids) AS org_id) changed
+    WHERE org_id IS NOT NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION people_notify_organization_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM notify_organizations_changed(ARRAY(SELECT organization_id FROM new_rows));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM notify_organizations_changed(ARRAY(
+            SELECT organization_id FROM old_rows UNION SELECT organization_id FROM new_rows));
+    ELSE
+        PERFORM notify_organizations_changed(ARRAY(SELECT organization_id FROM old_rows));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS people_notify_insert ON people;
+CREATE TRIGGER people_notify_insert
+    AFTER INSERT ON people
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION people_notify_organization_changed();
+
+DROP TRIGGER IF EXISTS people_notify_update ON people;
+CREATE TRIGGER people_notify_update
+    AFTER UPDATE ON people
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION people_notify_organization_changed();
+
+DROP TRIGGER IF EXISTS people_notify_delete ON people;
+CREATE TRIGGER people_notify_delete
+    AFTER DELETE ON people
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION people_notify_organization_changed();
+
+CREATE OR REPLACE FUNCTION projects_notify_organization_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM notify_organizations_changed(ARRAY(SELECT organization_id FROM new_rows));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM notify_organizations_changed(ARRAY(
+            SELECT organization_id FROM old_rows UNION SELECT organization_id FROM new_rows));
+    ELSE
+        PERFORM notify_organizations_changed(ARRAY(SELECT organization_id FROM old_rows));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS projects_notify_insert ON projects;
+CREATE TRIGGER projects_notify_insert
+    AFTER INSERT ON projects
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION projects_notify_organization_changed();
+
+DROP TRIGGER IF EXISTS projects_notify_update ON projects;
+CREATE TRIGGER projects_notify_update
+    AFTER UPDATE ON projects
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION projects_notify_organization_changed();
+
+DROP TRIGGER IF EXISTS projects_notify_delete ON projects;
+CREATE TRIGGER projects_notify_delete
+    AFTER DELETE ON projects
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION projects_notify_organization_changed();
+
+-- Assignments carry their organization through the project; a project's
+-- delete notifies for the assignments it cascades to
+CREATE OR REPLACE FUNCTION assignments_notify_organization_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM notify_organizations_changed(ARRAY(SELECT p.organization_id FROM new_rows r JOIN projects p ON p.id = r.project_id));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM notify_organizations_changed(ARRAY(
+            SELECT p.organization_id FROM old_rows r JOIN projects p ON p.id = r.project_id UNION SELECT p.organization_id FROM new_rows r JOIN projects p ON p.id = r.project_id));
+    ELSE
+        PERFORM notify_organizations_changed(ARRAY(SELECT p.organization_id FROM old_rows r JOIN projects p ON p.id = r.project_id));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS assignments_notify_insert ON assignments;
+CREATE TRIGGER assignments_notify_insert
+    AFTER INSERT ON assignments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION assignments_notify_organization_changed();
+
+DROP TRIGGER IF EXISTS assignments_notify_update ON assignments;
+CREATE TRIGGER assignments_notify_update
+    AFTER UPDATE ON assignments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION assignments_notify_organization_changed();
+
+DROP TRIGGER IF EXISTS assignments_notify_delete ON assignments;
+CREATE TRIGGER assignments_notify_delete
+    AFTER DELETE ON assignments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION assignments_notify_organization_changed();
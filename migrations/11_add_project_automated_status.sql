@@ -0,0 +1,30 @@
+-- The one definition of a project's automated status: Completed and Cancelled
+-- are kept as set, otherwise the dates decide (Not Started, Overdue), then
+-- On Hold, else Active. `today` is an argument so the function stays
+-- immutable; queries read it through the projects_with_status view.
+CREATE OR REPLACE FUNCTION project_automated_status(status TEXT, start_date DATE, end_date DATE, today DATE)
+RETURNS TEXT AS $$
+    SELECT CASE
+        WHEN status IN ('Completed', 'Cancelled') THEN status
+        WHEN start_date > today THEN 'Not Started'
+        WHEN end_date < today THEN 'Overdue'
+        WHEN status = 'On Hold' THEN 'On Hold'
+        ELSE 'Active'
+    END
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE VIEW projects_with_status AS
+SELECT p.*,
+       project_automated_status(p.status, p.start_date, p.end_date, CURRENT_DATE) AS automated_status
+FROM projects p;
+
+-- The date-driven statuses only apply to projects not closed by hand, so
+-- filters like "overdue" (end_date < today) or "not started" (start_date >
+-- today) are range scans over these instead of a pass over every project
+CREATE INDEX IF NOT EXISTS idx_projects_org_open_end_date
+    ON projects (organization_id, end_date)
+    WHERE status NOT IN ('Completed', 'Cancelled');
+
+CREATE INDEX IF NOT EXISTS idx_projects_org_open_start_date
+    ON projects (organization_id, start_date)
+    WHERE status NOT IN ('Completed', 'Cancelled');
@@ -0,0 +1,12 @@
+-- One row per organization and day the project status sweep ran: claimed
+-- before the sweep's UPDATE so concurrent schedulers sweep each organization
+-- once a day, then filled in with how many projects changed and how long it took.
+CREATE TABLE IF NOT EXISTS status_sweeps (
+    id SERIAL PRIMARY KEY,
+    organization_id INTEGER NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+    swept_on DATE NOT NULL DEFAULT CURRENT_DATE,
+    changed INTEGER,
+    duration_ms DOUBLE PRECISION,
+    finished_at TIMESTAMP,
+    UNIQUE (organization_id, swept_on)
+);
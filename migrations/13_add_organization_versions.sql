@@ -0,0 +1,31 @@
+-- A persisted change counter per organization, bumped by the same triggers
+-- that NOTIFY organization_changed (migration 10), so every process derives
+-- the same ETag / Last-Modified for an organization's pages.
+CREATE TABLE IF NOT EXISTS organization_versions (
+    organization_id INTEGER PRIMARY KEY REFERENCES organizations(id) ON DELETE CASCADE,
+    version BIGINT NOT NULL DEFAULT 0,
+    modified_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO organization_versions (organization_id)
+SELECT id FROM organizations
+ON CONFLICT (organization_id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION notify_organizations_changed(organization_ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO organization_versions AS v (organization_id, version, modified_at)
+    SELECT DISTINCT org_id, 1, NOW()
+    FROM unnest(organization_ids) AS org_id
+    WHERE org_id IS NOT NULL
+    AND EXISTS (SELECT 1 FROM organizations WHERE id = org_id)
+    ORDER BY org_id
+    ON CONFLICT (organization_id) DO UPDATE
+    SET version = v.version + 1,
+        modified_at = NOW();
+
+    PERFORM pg_notify('organization_changed', org_id::text)
+    FROM (SELECT DISTINCT unnest(organization_ids) AS org_id) changed
+    WHERE org_id IS NOT NULL;
+END;
+$$ LANGUAGE plpgsql;
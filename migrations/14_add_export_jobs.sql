@@ -0,0 +1,31 @@
+-- Reports built off-request by the export worker pool (exports.py). A job is
+-- queued, then running (updated_at is its heartbeat, bumped with progress),
+-- then done with the CSV in content until expires_at, or failed. At most one
+-- job that hasn't failed exists per organization, report and day, so repeat
+-- requests reuse it instead of building the report again.
+CREATE TABLE IF NOT EXISTS export_jobs (
+    id SERIAL PRIMARY KEY,
+    organization_id INTEGER NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+    report_type VARCHAR(50) NOT NULL,
+    report_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'done', 'failed')),
+    rows_done INTEGER NOT NULL DEFAULT 0,
+    rows_total INTEGER,
+    filename VARCHAR(255),
+    content BYTEA,
+    error TEXT,
+    requested_by INTEGER REFERENCES users(id) ON DELETE SET NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP,
+    expires_at TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_export_jobs_reuse
+    ON export_jobs (organization_id, report_type, report_date)
+    WHERE status <> 'failed';
+
+-- Retention sweep: expired artifacts, and stale or failed jobs
+CREATE INDEX IF NOT EXISTS idx_export_jobs_status_updated
+    ON export_jobs (status, updated_at);
@@ -0,0 +1,83 @@
+-- Bump organization_versions once per transaction, at commit, instead of in
+-- every statement's trigger (migration 13). The upsert locks the
+-- organization's row until commit, so bumping it early serialized every
+-- concurrent write transaction of an organization behind each other; as a
+-- deferred constraint trigger it only holds the lock for the commit itself.
+-- The statement-level triggers of migration 10 go back to only NOTIFYing.
+
+CREATE OR REPLACE FUNCTION notify_organizations_changed(organization_ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    PERFORM pg_notify('organization_changed', org_id::text)
+    FROM (SELECT DISTINCT unnest(organization_ids) AS org_id) changed
+    WHERE org_id IS NOT NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Bump an organization's version, once per transaction: later calls in the
+-- same transaction see the transaction-local flag and return
+CREATE OR REPLACE FUNCTION bump_organization_version(org_id INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    IF org_id IS NULL
+       OR current_setting('prp.organization_version_bumped_' || org_id, true) = 'on' THEN
+        RETURN;
+    END IF;
+    PERFORM set_config('prp.organization_version_bumped_' || org_id, 'on', true);
+
+    INSERT INTO organization_versions AS v (organization_id, version, modified_at)
+    SELECT org_id, 1, clock_timestamp()
+    WHERE EXISTS (SELECT 1 FROM organizations WHERE id = org_id)
+    ON CONFLICT (organization_id) DO UPDATE
+    SET version = v.version + 1,
+        modified_at = clock_timestamp();
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bump_organization_version_of_row()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_organization_version(OLD.organization_id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_organization_version(NEW.organization_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Assignments carry their organization through the project; an assignment
+-- deleted along with its project is covered by the project's own bump
+CREATE OR REPLACE FUNCTION bump_organization_version_of_assignment()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_organization_version(
+            (SELECT organization_id FROM projects WHERE id = OLD.project_id));
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_organization_version(
+            (SELECT organization_id FROM projects WHERE id = NEW.project_id));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS people_bump_organization_version ON people;
+CREATE CONSTRAINT TRIGGER people_bump_organization_version
+    AFTER INSERT OR UPDATE OR DELETE ON people
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION bump_organization_version_of_row();
+
+DROP TRIGGER IF EXISTS projects_bump_organization_version ON projects;
+CREATE CONSTRAINT TRIGGER projects_bump_organization_version
+    AFTER INSERT OR UPDATE OR DELETE ON projects
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION bump_organization_version_of_row();
+
+DROP TRIGGER IF EXISTS assignments_bump_organization_version ON assignments;
+CREATE CONSTRAINT TRIGGER assignments_bump_organization_version
+    AFTER INSERT OR UPDATE OR DELETE ON assignments
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION bump_organization_version_of_assignment();
@@ -0,0 +1,32 @@
+-- Databases created from the baseline before it included 02_add_user_roles.sql
+-- lack the audit columns and updated_at triggers of projects and people.
+-- Everything here is a no-op on databases that ran 02 or the current baseline.
+ALTER TABLE projects
+    ADD COLUMN IF NOT EXISTS created_by INTEGER REFERENCES users(id),
+    ADD COLUMN IF NOT EXISTS updated_by INTEGER REFERENCES users(id),
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+
+ALTER TABLE people
+    ADD COLUMN IF NOT EXISTS created_by INTEGER REFERENCES users(id),
+    ADD COLUMN IF NOT EXISTS updated_by INTEGER REFERENCES users(id),
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+
+CREATE OR REPLACE FUNCTION update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_projects_updated_at ON projects;
+CREATE TRIGGER update_projects_updated_at
+    BEFORE UPDATE ON projects
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+DROP TRIGGER IF EXISTS update_people_updated_at ON people;
+CREATE TRIGGER update_people_updated_at
+    BEFORE UPDATE ON people
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
@@ -0,0 +1,131 @@
+"""Async counterparts of the model functions behind the JSON edit endpoints.
+
+Each function takes the AsyncConnection of a run_async_transaction() call as
+its first argument and otherwise mirrors its namesake in models/core.py or
+models/auth.py. Not re-exported from models, so the sync names stay the default.
+"""
+from models.auth import MANAGER_ROLES, effective_role, role_can_manage
+from models.core import OVERLAP_COLUMNS, _parse_date, check_overallocation
+
+async def update_person(conn, person_id, person_data):
+    """Update a person's details"""
+    updated = await conn.fetchval("""
+        UPDATE people
+        SET name = $1,
+            role = $2,
+            availability = $3
+        WHERE id = $4
+        RETURNING id
+    """, person_data['name'], person_data['role'], person_data['availability'], int(person_id))
+    return updated is not None
+
+async def delete_person(conn, person_id):
+    """Delete a person from the database"""
+    await conn.execute("DELETE FROM people WHERE id = $1", int(person_id))
+
+async def get_project(conn, project_id):
+    """Get one project with its automated status, or None"""
+    row = await conn.fetchrow("""
+        SELECT id, name, project_type, status, start_date, end_date, automated_status
+        FROM projects_with_status
+        WHERE id = $1
+    """, int(project_id))
+    return dict(row) if row else None
+
+async def update_project(conn, project_id, project_data):
+    """Update a project's details"""
+    updated = await conn.fetchval("""
+        UPDATE projects
+        SET name = $1,
+            project_type = $2,
+            status = $3,
+            start_date = $4,
+            end_date = $5
+        WHERE id = $6
+        RETURNING id
+    """, project_data['name'], project_data['project_type'], project_data['status'],
+        _parse_date(project_data['start_date']), _parse_date(project_data['end_date']),
+        int(project_id))
+    return updated is not None
+
+async def delete_project(conn, project_id):
+    """Delete a project from the database"""
+    await conn.execute("DELETE FROM projects WHERE id = $1", int(project_id))
+
+async def update_assignment(conn, assignment_id, data, allow_overallocation=False):
+    """Update an assignment in the database"""
+    start_date = _parse_date(data['start_date'])
+    end_date = _parse_date(data['end_date'])
+    allocation = int(data['allocation'])
+    if not allow_overallocation:
+        person_id = await conn.fetchval(
+            "SELECT person_id FROM assignments WHERE id = $1", int(assignment_id))
+        if person_id is None:
+            return None
+        await conn.execute("SELECT 1 FROM people WHERE id = $1 FOR NO KEY UPDATE", person_id)
+        overlapping = await conn.fetch("""
+            SELECT a.id, a.project_id, p.name, a.allocation, a.start_date, a.end_date
+            FROM assignments a
+            JOIN projects p ON a.project_id = p.id
+            WHERE a.person_id = $1
+            AND a.period && daterange($2, $3, '[]')
+            AND a.id <> $4
+            AND p.status NOT IN ('Completed', 'Cancelled')
+        """, person_id, start_date, end_date, int(assignment_id))
+        check_overallocation([dict(zip(OVERLAP_COLUMNS, row)) for row in overlapping],
+                             allocation, start_date, end_date)
+
+    row = await conn.fetchrow("""
+        UPDATE assignments
+        SET allocation = $1, start_date = $2, end_date = $3
+        WHERE id = $4
+        RETURNING id, project_id, person_id, allocation, start_date, end_date
+    """, allocation, start_date, end_date, int(assignment_id))
+    return dict(row) if row else None
+
+async def delete_assignment(conn, assignment_id):
+    """Delete an assignment from the database"""
+    await conn.execute("DELETE FROM assignments WHERE id = $1", int(assignment_id))
+
+async def _member_role(conn, user_id, organization_id):
+    """(role, is_platform_admin) of a member of the organization, or (None, False).
+
+    Holds a share lock on the member's rows, so a concurrent role change or
+    removal waits for the transaction.
+    """
+    row = await conn.fetchrow("""
+        SELECT u.role, o.superuser_id, u.is_platform_admin
+        FROM users u
+        JOIN organization_users ou ON u.id = ou.user_id
+        JOIN organizations o ON ou.organization_id = o.id
+        WHERE u.id = $1 AND o.id = $2
+        FOR SHARE OF u, ou
+    """, int(user_id), int(organization_id))
+    if row is None:
+        return None, False
+    role, superuser_id, is_platform_admin = row
+    return effective_role(int(user_id), role, superuser_id, is_platform_admin), bool(is_platform_admin)
+
+async def set_user_active(conn, manager_id, user_id, organization_id, is_active):
+    """update_user_status with its permission checks in the same transaction.
+
+    Returns False, writing nothing, when `manager_id` may not manage users of
+    the organization or this user.
+    """
+    manager_role, manager_is_platform_admin = await _member_role(conn, manager_id, organization_id)
+    if manager_role not in MANAGER_ROLES:
+        return False
+    target_role, _ = await _member_role(conn, user_id, organization_id)
+    if not role_can_manage(manager_role, target_role, manager_is_platform_admin):
+        return False
+    
+    await conn.execute("""
+        UPDATE users
+        SET is_active = $1
+        WHERE id = $2 AND id IN (
+            SELECT user_id
+            FROM organization_users
+            WHERE organization_id = $3
+        )
+    """, bool(is_active), int(user_id), int(organization_id))
+    return True
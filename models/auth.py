@@ -249,6 +249,37 @@ def send_otp_email(email, otp):
         else:
             raise
 
+# Roles that may manage an organization's users
+MANAGER_ROLES = ('Superuser', 'Privileged')
+
+def effective_role(user_id, role, superuser_id, is_platform_admin):
+    """A member's role given their users/organizations rows.
+
+    Platform admins, and the organization's superuser, are always Superusers.
+    """
+    if is_platform_admin or user_id == superuser_id:
+        return 'Superuser'
+    return role
+
+def role_can_manage(manager_role, target_role, manager_is_platform_admin=False):
+    """Whether a member with `manager_role` may manage one with `target_role`"""
+    if not manager_role or not target_role:
+        return False
+    
+    # Platform admin can manage everyone
+    if manager_is_platform_admin:
+        return True
+    
+    # Superusers can manage everyone except other superusers
+    if manager_role == 'Superuser':
+        return target_role != 'Superuser'
+    
+    # Privileged users can only manage normal users
+    if manager_role == 'Privileged':
+        return target_role == 'Normal'
+    
+    return False
+
 def get_user_role(user_id, organization_id):
     """Get user's role in an organization"""
     with get_db_cursor() as cur:
@@ -263,26 +294,17 @@ def get_user_role(user_id, organization_id):
         if not result:
             return None
         role, superuser_id, is_platform_admin = result
-        
-        # Platform admin has full access everywhere
-        if is_platform_admin:
-            return 'Superuser'
-        
-        # If user is the organization's superuser, always return Superuser role
-        if user_id == superuser_id:
-            return 'Superuser'
-            
-        return role
+        return effective_role(user_id, role, superuser_id, is_platform_admin)
 
 def can_manage_users(user_id, organization_id):
     """Check if user can manage users in an organization"""
     role = get_user_role(user_id, organization_id)
-    return role in ['Superuser', 'Privileged']
+    return role in MANAGER_ROLES
 
 def can_access_users_page(user_id, organization_id):
     """Check if user can access the users page"""
     role = get_user_role(user_id, organization_id)
-    return role in ['Superuser', 'Privileged']
+    return role in MANAGER_ROLES
 
 def can_manage_user(manager_id, user_id, organization_id):
     """Check if a user can manage another user"""
@@ -292,21 +314,7 @@ def can_manage_user(manager_id, user_id, organization_id):
     if not manager_role or not target_role:
         return False
     
-    # Platform admin can manage everyone
-    with get_db_cursor() as cur:
-        cur.execute("SELECT is_platform_admin FROM users WHERE id = %s", (manager_id,))
-        if cur.fetchone()[0]:
-            return True
-    
-    # Superusers can manage everyone except other superusers
-    if manager_role == 'Superuser':
-        return target_role != 'Superuser'
-    
-    # Privileged users can only manage normal users
-    if manager_role == 'Privileged':
-        return target_role == 'Normal'
-    
-    return False
+    return role_can_manage(manager_role, target_role, is_platform_admin(manager_id))
 
 def get_organization_users(organization_id, current_user_id):
     """Get all users in an organization with proper role filtering"""
@@ -1,7 +1,107 @@
-from database import get_db_cursor, DatabaseError
-import pandas as pd
-from datetime import datetime
+from database import get_db_cursor, DatabaseError, read_only
+from cache import invalidate_organization, organization_cached
+import psycopg2
+from psycopg2.extras import execute_values
+from collections import namedtuple
+from datetime import datetime, date, timedelta
+import time
 
+# Rows per multi-row INSERT statement in the bulk loaders
+BULK_PAGE_SIZE = 1000
+
+# Highest combined allocation (%) a person may be booked for on any day
+MAX_ALLOCATION = 100
+
+# Share of a full-time person an availability type supplies (others count as full-time)
+AVAILABILITY_WEIGHTS = {
+    'full-time': 1.0,
+    'part-time': 0.5
+}
+FORECAST_MAX_WEEKS = 104
+
+# Candidates per page in the assignment picker
+CANDIDATES_PAGE_SIZE = 25
+
+# Longest date range the allocation timeline covers in one call
+TIMELINE_MAX_DAYS = 731
+TIMELINE_GRANULARITIES = ('day', 'week')
+
+# Row records returned by the read functions: plain tuples with named fields,
+# cheap to build and usable directly in templates (convert with _asdict())
+Person = namedtuple('Person', ['id', 'name', 'role', 'availability'])
+Project = namedtuple('Project', [
+    'id', 'name', 'project_type', 'status', 'start_date', 'end_date', 'automated_status'
+])
+CurrentAssignment = namedtuple('CurrentAssignment', [
+    'id', 'project_id', 'project_name', 'person_id', 'person_name',
+    'allocation', 'start_date', 'end_date', 'project_status'
+])
+ProjectAssignment = namedtuple('ProjectAssignment', [
+    'id', 'project_id', 'person_id', 'person_name',
+    'allocation', 'start_date', 'end_date', 'total_allocation', 'person_role'
+])
+Assignment = namedtuple('Assignment', [
+    'id', 'project_id', 'person_id', 'allocation', 'start_date', 'end_date',
+    'project_name', 'person_name'
+])
+PersonListing = namedtuple('PersonListing', ['id', 'name', 'role', 'availability', 'current_allocation'])
+AllocationReportRow = namedtuple('AllocationReportRow', ['name', 'role', 'total_allocation', 'projects'])
+ProjectRosterRow = namedtuple('ProjectRosterRow', [
+    'project_name', 'project_type', 'status', 'start_date', 'end_date',
+    'person_name', 'person_role', 'allocation', 'assignment_start_date', 'assignment_end_date'
+])
+ExportJob = namedtuple('ExportJob', [
+    'id', 'organization_id', 'report_type', 'report_date', 'status', 'rows_done', 'rows_total',
+    'filename', 'error', 'created_at', 'updated_at', 'finished_at', 'expires_at'
+])
+
+# Rows fetched per round trip while streaming an export
+EXPORT_BATCH_SIZE = 2000
+
+# Columns of an ExportJob; the built file (content) is only read for downloads
+EXPORT_JOB_COLUMNS = """
+    id, organization_id, report_type, report_date, status, rows_done, rows_total,
+    filename, error, created_at, updated_at, finished_at, expires_at
+"""
+
+# Rows per page of the people / projects / assignments listings
+LISTING_PAGE_SIZE = 100
+LISTING_MAX_PAGE_SIZE = 500
+
+# Current allocation of people row `p` (person_allocations joined as `al`),
+# recomputed only when the maintained row is from before today
+CURRENT_ALLOCATION_SQL = (
+    "CASE WHEN al.as_of = CURRENT_DATE THEN al.current_allocation "
+    "ELSE person_current_allocation(p.id) END"
+)
+
+# Automated project statuses (the automated_status column of the
+# projects_with_status view) as conditions on the stored columns, so filtering
+# by one can use the (organization, date) indexes instead of scanning
+OPEN_PROJECT_SQL = "status NOT IN ('Completed', 'Cancelled')"
+AUTOMATED_STATUS_CONDITIONS = {
+    'Not Started': f"{OPEN_PROJECT_SQL} AND start_date > CURRENT_DATE",
+    'Active': ("status NOT IN ('Completed', 'Cancelled', 'On Hold') "
+               "AND start_date <= CURRENT_DATE AND end_date >= CURRENT_DATE"),
+    'On Hold': "status = 'On Hold' AND start_date <= CURRENT_DATE AND end_date >= CURRENT_DATE",
+    'Overdue': f"{OPEN_PROJECT_SQL} AND start_date <= CURRENT_DATE AND end_date < CURRENT_DATE",
+    'Completed': "status = 'Completed'",
+    'Cancelled': "status = 'Cancelled'"
+}
+
+# Stored statuses the daily sweep moves along as the dates pass; On Hold,
+# Completed and Cancelled are only ever set by hand
+SWEPT_STATUSES = ('Not Started', 'Active', 'Overdue')
+
+# Allocation bands, as the people and dashboard filters name them
+ALLOCATION_BANDS = {
+    'available': f"{CURRENT_ALLOCATION_SQL} < 50",
+    'partial': f"{CURRENT_ALLOCATION_SQL} BETWEEN 50 AND 80",
+    'full': f"{CURRENT_ALLOCATION_SQL} > 80"
+}
+
+@organization_cached
+@read_only
 def get_all_people(organization_id=None):
     """Get all people from the database"""
     with get_db_cursor() as cursor:
@@ -18,29 +118,52 @@ def get_all_people(organization_id=None):
                 FROM people
                 ORDER BY name
             """)
-        
-        columns = ['id', 'name', 'role', 'availability']
-        return pd.DataFrame(cursor.fetchall(), columns=columns)
+        return [Person._make(row) for row in cursor.fetchall()]
 
+@organization_cached
+@read_only
 def get_all_projects(organization_id=None):
     """Get all projects from the database"""
     with get_db_cursor() as cursor:
         if organization_id:
             cursor.execute("""
-                SELECT id, name, project_type, status, start_date, end_date
-                FROM projects
+                SELECT id, name, project_type, status, start_date, end_date, automated_status
+                FROM projects_with_status
                 WHERE organization_id = %s
                 ORDER BY start_date DESC
             """, (organization_id,))
         else:
             cursor.execute("""
-                SELECT id, name, project_type, status, start_date, end_date
-                FROM projects
+                SELECT id, name, project_type, status, start_date, end_date, automated_status
+                FROM projects_with_status
                 ORDER BY start_date DESC
             """)
-        
-        columns = ['id', 'name', 'project_type', 'status', 'start_date', 'end_date']
-        return pd.DataFrame(cursor.fetchall(), columns=columns)
+        return [Project._make(row) for row in cursor.fetchall()]
+
+@read_only
+def get_project(project_id):
+    """Get one project with its automated status, or None"""
+    with get_db_cursor() as cursor:
+        cursor.execute("""
+            SELECT id, name, project_type, status, start_date, end_date, automated_status
+            FROM projects_with_status
+            WHERE id = %s
+        """, (project_id,))
+        row = cursor.fetchone()
+        return Project._make(row) if row else None
+
+@organization_cached
+@read_only
+def count_projects_by_status(organization_id):
+    """Number of the organization's projects per automated status, e.g. {'Active': 3}"""
+    with get_db_cursor() as cursor:
+        cursor.execute("""
+            SELECT automated_status, COUNT(*)
+            FROM projects_with_status
+            WHERE organization_id = %s
+            GROUP BY automated_status
+        """, (organization_id,))
+        return dict(cursor.fetchall())
 
 def add_person(data, organization_id=None):
     """Add a new person to the database"""
@@ -57,6 +180,7 @@ def add_person(data, organization_id=None):
                 VALUES (%s, %s, %s)
                 RETURNING id
             """, (data['name'], data['role'], data['availability']))
+        invalidate_organization(organization_id)
         return cursor.fetchone()[0]
 
 def update_person(person_id, person_data):
@@ -68,19 +192,25 @@ def update_person(person_id, person_data):
                 role = %s,
                 availability = %s
             WHERE id = %s
-            RETURNING id
+            RETURNING organization_id
         """, (
             person_data['name'],
             person_data['role'],
             person_data['availability'],
             person_id
         ))
-        return cur.fetchone() is not None
+        row = cur.fetchone()
+        if row is None:
+            return False
+        invalidate_organization(row[0])
+        return True
 
 def delete_person(person_id):
     """Delete a person from the database"""
     with get_db_cursor() as cursor:
-        cursor.execute("DELETE FROM people WHERE id = %s", (person_id,))
+        cursor.execute("DELETE FROM people WHERE id = %s RETURNING organization_id", (person_id,))
+        for (organization_id,) in cursor.fetchall():
+            invalidate_organization(organization_id)
 
 def add_project(data, organization_id=None):
     """Add a new project to the database"""
@@ -99,6 +229,7 @@ def add_project(data, organization_id=None):
                 RETURNING id
             """, (data['name'], data['project_type'], data['status'], 
                 data['start_date'], data['end_date']))
+        invalidate_organization(organization_id)
         return cursor.fetchone()[0]
 
 def update_project(project_id, project_data):
@@ -112,7 +243,7 @@ def update_project(project_id, project_data):
                 start_date = %s,
                 end_date = %s
             WHERE id = %s
-            RETURNING id
+            RETURNING organization_id
         """, (
             project_data['name'],
             project_data['project_type'],
@@ -121,41 +252,331 @@ def update_project(project_id, project_data):
             project_data['end_date'],
             project_id
         ))
-        return cur.fetchone() is not None
+        row = cur.fetchone()
+        if row is None:
+            return False
+        invalidate_organization(row[0])
+        return True
 
 def delete_project(project_id):
     """Delete a project from the database"""
     with get_db_cursor() as cursor:
-        cursor.execute("DELETE FROM projects WHERE id = %s", (project_id,))
+        cursor.execute("DELETE FROM projects WHERE id = %s RETURNING organization_id", (project_id,))
+        for (organization_id,) in cursor.fetchall():
+            invalidate_organization(organization_id)
+
+class OverallocationError(ValueError):
+    """An assignment would book a person over MAX_ALLOCATION on some days"""
 
-def add_assignment(data):
-    """Add a new assignment to the database"""
+    def __init__(self, peak, overloaded, conflicts):
+        first, last = overloaded[0]
+        super().__init__(
+            f"Person would be allocated {peak}% (over {MAX_ALLOCATION}%) "
+            f"between {first.isoformat()} and {last.isoformat()}"
+        )
+        self.peak = peak
+        self.overloaded = overloaded  # [(first_day, last_day)] over the limit
+        self.conflicts = conflicts  # Overlapping assignments that add to it, as dicts
+
+OVERLAP_COLUMNS = ['id', 'project_id', 'project_name', 'allocation', 'start_date', 'end_date']
+
+def check_overallocation(overlapping, allocation, start_date, end_date):
+    """Raise OverallocationError if `allocation` on top of `overlapping` goes over the limit.
+
+    `overlapping` are the person's other assignments that intersect
+    [start_date, end_date] (dicts with OVERLAP_COLUMNS); a sweep over their
+    start and end days finds the busiest days in one pass.
+    """
+    changes = {start_date: 0}
+    for other in overlapping:
+        first = max(other['start_date'], start_date)
+        after = min(other['end_date'], end_date) + timedelta(days=1)
+        changes[first] = changes.get(first, 0) + other['allocation']
+        changes[after] = changes.get(after, 0) - other['allocation']
+
+    days = sorted(day for day in changes if day <= end_date)
+    peak = 0
+    overloaded = []
+    running = allocation
+    for day, next_day in zip(days, days[1:] + [end_date + timedelta(days=1)]):
+        running += changes[day]
+        peak = max(peak, running)
+        if running > MAX_ALLOCATION:
+            last = next_day - timedelta(days=1)
+            if overloaded and overloaded[-1][1] == day - timedelta(days=1):
+                overloaded[-1] = (overloaded[-1][0], last)
+            else:
+                overloaded.append((day, last))
+
+    if overloaded:
+        conflicts = [
+            other for other in overlapping
+            if any(other['start_date'] <= last and other['end_date'] >= first
+                   for first, last in overloaded)
+        ]
+        raise OverallocationError(peak, overloaded, conflicts)
+
+def _find_overlapping(cursor, person_id, start_date, end_date, exclude_id=None):
+    """The person's assignments on live projects that overlap the range.
+
+    Locks the person first, so concurrent bookings of one person are checked
+    one after the other. Completed and Cancelled projects book nobody.
+    """
+    cursor.execute("SELECT 1 FROM people WHERE id = %s FOR NO KEY UPDATE", (person_id,))
+    cursor.execute("""
+        SELECT a.id, a.project_id, p.name, a.allocation, a.start_date, a.end_date
+        FROM assignments a
+        JOIN projects p ON a.project_id = p.id
+        WHERE a.person_id = %s
+        AND a.period && daterange(%s, %s, '[]')
+        AND a.id IS DISTINCT FROM %s
+        AND p.status NOT IN ('Completed', 'Cancelled')
+    """, (person_id, start_date, end_date, exclude_id))
+    return [dict(zip(OVERLAP_COLUMNS, row)) for row in cursor.fetchall()]
+
+def add_assignment(data, allow_overallocation=False):
+    """Add a new assignment to the database.
+
+    Raises OverallocationError when it would book the person over
+    MAX_ALLOCATION on any day, unless allow_overallocation is set.
+    """
+    start_date = _parse_date(data['start_date'])
+    end_date = _parse_date(data['end_date'])
     try:
+        if not allow_overallocation:
+            with get_db_cursor() as cursor:
+                overlapping = _find_overlapping(cursor, data['person_id'], start_date, end_date)
+            check_overallocation(overlapping, int(data['allocation']), start_date, end_date)
         with get_db_cursor() as cursor:
             cursor.execute("""
                 INSERT INTO assignments (project_id, person_id, allocation, start_date, end_date)
                 VALUES (%s, %s, %s, %s, %s)
-                RETURNING id
+                RETURNING id, (SELECT organization_id FROM projects WHERE id = project_id)
             """, (data['project_id'], data['person_id'], data['allocation'],
-                data['start_date'], data['end_date']))
-            return cursor.fetchone()[0]
+                start_date, end_date))
+            assignment_id, organization_id = cursor.fetchone()
+            invalidate_organization(organization_id)
+            return assignment_id
     except DatabaseError as e:
         if "assignments_project_id_person_id_key" in str(e):
             raise ValueError("Person already assigned to this project")
         raise
 
-def update_assignment(assignment_id, data):
-    """Update an assignment in the database"""
+def _parse_date(value):
+    """Parse a YYYY-MM-DD string (or pass a date through)"""
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), '%Y-%m-%d').date()
+
+def _validate_rows(rows, required, validate=None):
+    """Validate bulk rows in one pass.
+
+    Returns (results, valid) where results has one entry per input row (errors
+    filled in) and valid is a list of (index, row) for rows that passed.
+    """
+    results = [{'index': i} for i in range(len(rows))]
+    valid = []
+    for i, row in enumerate(rows):
+        try:
+            if not isinstance(row, dict):
+                raise ValueError("Row must be an object")
+            missing = [field for field in required if row.get(field) in (None, '')]
+            if missing:
+                raise ValueError(f"Missing required fields: {', '.join(missing)}")
+            valid.append((i, validate(row) if validate else row))
+        except (ValueError, TypeError) as e:
+            results[i]['error'] = str(e)
+    return results, valid
+
+def _validate_date_range(row):
+    row = dict(row)
+    row['start_date'] = _parse_date(row['start_date'])
+    row['end_date'] = _parse_date(row['end_date'])
+    if row['end_date'] < row['start_date']:
+        raise ValueError("End date must not be before start date")
+    return row
+
+def _validate_assignment(row):
+    row = _validate_date_range(row)
+    row['project_id'] = int(row['project_id'])
+    row['person_id'] = int(row['person_id'])
+    row['allocation'] = int(row['allocation'])
+    if not 0 < row['allocation'] <= 100:
+        raise ValueError("Allocation must be between 1 and 100")
+    return row
+
+def add_people_bulk(rows, organization_id):
+    """Add many people in one multi-row INSERT; returns one result per row"""
+    results, valid = _validate_rows(rows, ['name', 'role', 'availability'])
+    if valid:
+        with get_db_cursor() as cursor:
+            inserted = execute_values(cursor, """
+                INSERT INTO people (name, role, availability, organization_id)
+                VALUES %s
+                RETURNING id
+            """, [(row['name'], row['role'], row['availability'], organization_id)
+                  for _, row in valid], page_size=BULK_PAGE_SIZE, fetch=True)
+        for (i, _), (person_id,) in zip(valid, inserted):
+            results[i]['id'] = person_id
+        invalidate_organization(organization_id)
+    return results
+
+def add_projects_bulk(rows, organization_id):
+    """Add many projects in one multi-row INSERT; returns one result per row"""
+    results, valid = _validate_rows(
+        rows, ['name', 'project_type', 'status', 'start_date', 'end_date'], _validate_date_range)
+    if valid:
+        with get_db_cursor() as cursor:
+            inserted = execute_values(cursor, """
+                INSERT INTO projects (name, project_type, status, start_date, end_date, organization_id)
+                VALUES %s
+                RETURNING id
+            """, [(row['name'], row['project_type'], row['status'],
+                   row['start_date'], row['end_date'], organization_id)
+                  for _, row in valid], page_size=BULK_PAGE_SIZE, fetch=True)
+        for (i, _), (project_id,) in zip(valid, inserted):
+            results[i]['id'] = project_id
+        invalidate_organization(organization_id)
+    return results
+
+def _drop_overallocated(cursor, pending, results):
+    """Remove from `pending` the bulk rows that are duplicates or would overbook someone.
+
+    Locks the batch's people in id order, so concurrent bookings wait and
+    concurrent batches can't deadlock, then checks each row in payload order
+    against the person's stored assignments plus the rows accepted before it.
+    """
+    rows = list(pending.values())
+    person_ids = sorted({row['person_id'] for _, row in rows})
+    cursor.execute("SELECT id FROM people WHERE id = ANY(%s) ORDER BY id FOR NO KEY UPDATE",
+                   (person_ids,))
+    cursor.execute("""
+        SELECT project_id, person_id FROM assignments
+        WHERE person_id = ANY(%s) AND project_id = ANY(%s)
+    """, (person_ids, list({row['project_id'] for _, row in rows})))
+    for key in set(cursor.fetchall()) & set(pending):
+        i, _ = pending.pop(key)
+        results[i]['error'] = "Person already assigned to this project"
+
+    cursor.execute("""
+        SELECT a.person_id, a.id, a.project_id, p.name, a.allocation, a.start_date, a.end_date
+        FROM assignments a
+        JOIN projects p ON a.project_id = p.id
+        WHERE a.person_id = ANY(%s)
+        AND a.period && daterange(%s, %s, '[]')
+        AND p.status NOT IN ('Completed', 'Cancelled')
+    """, (person_ids, min(row['start_date'] for _, row in rows),
+          max(row['end_date'] for _, row in rows)))
+    booked = {}
+    for person_id, *overlap in cursor.fetchall():
+        booked.setdefault(person_id, []).append(dict(zip(OVERLAP_COLUMNS, overlap)))
+    cursor.execute("""
+        SELECT id FROM projects
+        WHERE id = ANY(%s) AND status IN ('Completed', 'Cancelled')
+    """, (list({row['project_id'] for _, row in rows}),))
+    closed = {row[0] for row in cursor.fetchall()}
+
+    for key, (i, row) in list(pending.items()):
+        if row['project_id'] in closed:
+            continue  # Completed and Cancelled projects book nobody
+        person_booked = booked.setdefault(row['person_id'], [])
+        overlapping = [other for other in person_booked
+                       if other['start_date'] <= row['end_date'] and other['end_date'] >= row['start_date']]
+        try:
+            check_overallocation(overlapping, row['allocation'], row['start_date'], row['end_date'])
+        except OverallocationError as e:
+            del pending[key]
+            results[i]['error'] = str(e)
+            continue
+        person_booked.append({'id': None, 'project_id': row['project_id'], 'project_name': None,
+                              'allocation': row['allocation'], 'start_date': row['start_date'],
+                              'end_date': row['end_date']})
+
+def add_assignments_bulk(rows, organization_id):
+    """Add many assignments in one multi-row INSERT; returns one result per row.
+
+    People and projects must belong to the organization. A person already on
+    the project (in the database or earlier in the batch), or a row that
+    would book its person over MAX_ALLOCATION, gets the same error
+    add_assignment raises.
+    """
+    results, valid = _validate_rows(
+        rows, ['project_id', 'person_id', 'allocation', 'start_date', 'end_date'], _validate_assignment)
+    if not valid:
+        return results
+
+    with get_db_cursor() as cursor:
+        cursor.execute("""
+            SELECT 'person', id FROM people
+            WHERE organization_id = %s AND id = ANY(%s)
+            UNION ALL
+            SELECT 'project', id FROM projects
+            WHERE organization_id = %s AND id = ANY(%s)
+        """, (organization_id, list({row['person_id'] for _, row in valid}),
+              organization_id, list({row['project_id'] for _, row in valid})))
+        known = set(cursor.fetchall())
+
+        pending = {}
+        for i, row in valid:
+            key = (row['project_id'], row['person_id'])
+            if ('person', row['person_id']) not in known or ('project', row['project_id']) not in known:
+                results[i]['error'] = "Invalid person or project for this organization"
+            elif key in pending:
+                results[i]['error'] = "Person already assigned to this project"
+            else:
+                pending[key] = (i, row)
+
+        if pending:
+            _drop_overallocated(cursor, pending, results)
+
+        if pending:
+            inserted = execute_values(cursor, """
+                INSERT INTO assignments (project_id, person_id, allocation, start_date, end_date)
+                VALUES %s
+                ON CONFLICT (project_id, person_id) DO NOTHING
+                RETURNING id, project_id, person_id
+            """, [(row['project_id'], row['person_id'], row['allocation'],
+                   row['start_date'], row['end_date'])
+                  for i, row in pending.values()], page_size=BULK_PAGE_SIZE, fetch=True)
+            for assignment_id, project_id, person_id in inserted:
+                i, _ = pending.pop((project_id, person_id))
+                results[i]['id'] = assignment_id
+            for i, _ in pending.values():
+                results[i]['error'] = "Person already assigned to this project"
+            invalidate_organization(organization_id)
+
+    return results
+
+def update_assignment(assignment_id, data, allow_overallocation=False):
+    """Update an assignment in the database.
+
+    Raises OverallocationError like add_assignment; returns None when the
+    assignment doesn't exist.
+    """
+    start_date = _parse_date(data['start_date'])
+    end_date = _parse_date(data['end_date'])
+    allocation = int(data['allocation'])
+    if not allow_overallocation:
+        with get_db_cursor() as cursor:
+            cursor.execute("SELECT person_id FROM assignments WHERE id = %s", (assignment_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            overlapping = _find_overlapping(cursor, row[0], start_date, end_date, assignment_id)
+        check_overallocation(overlapping, allocation, start_date, end_date)
+
     with get_db_cursor() as cursor:
         cursor.execute("""
             UPDATE assignments
             SET allocation = %s, start_date = %s, end_date = %s
             WHERE id = %s
-            RETURNING id, project_id, person_id, allocation, start_date, end_date
-        """, (int(data['allocation']), data['start_date'], data['end_date'], assignment_id))
+            RETURNING id, project_id, person_id, allocation, start_date, end_date,
+                      (SELECT organization_id FROM projects WHERE id = project_id)
+        """, (allocation, start_date, end_date, assignment_id))
         
         result = cursor.fetchone()
         if result:
+            invalidate_organization(result[6])
             return {
                 'id': result[0],
                 'project_id': result[1],
@@ -169,8 +590,15 @@ def update_assignment(assignment_id, data):
 def delete_assignment(assignment_id):
     """Delete an assignment from the database"""
     with get_db_cursor() as cursor:
-        cursor.execute("DELETE FROM assignments WHERE id = %s", (assignment_id,))
+        cursor.execute("""
+            DELETE FROM assignments
+            WHERE id = %s
+            RETURNING (SELECT organization_id FROM projects WHERE id = project_id)
+        """, (assignment_id,))
+        for (organization_id,) in cursor.fetchall():
+            invalidate_organization(organization_id)
 
+@read_only
 def get_current_assignments(date=None):
     """Get current assignments for the given date"""
     if date is None:
@@ -188,11 +616,81 @@ def get_current_assignments(date=None):
             WHERE %s BETWEEN a.start_date AND a.end_date
             AND p.status NOT IN ('Not Started', 'Completed', 'Cancelled')
         """, (date,))
-        
-        columns = ['id', 'project_id', 'project_name', 'person_id', 'person_name',
-                'allocation', 'start_date', 'end_date', 'project_status']
-        return pd.DataFrame(cursor.fetchall(), columns=columns)
+        return [CurrentAssignment._make(row) for row in cursor.fetchall()]
+
+def iter_allocation_report(organization_id, date=None, batch_size=EXPORT_BATCH_SIZE):
+    """Yield an AllocationReportRow per person of the organization, by name.
 
+    Each person's current assignments are summed and listed in SQL, and rows
+    are fetched from a server-side cursor `batch_size` at a time, so memory
+    stays flat however large the organization. A generator: its cursor stays
+    open until it is exhausted or closed, after the route has returned.
+    """
+    if date is None:
+        date = datetime.now().strftime('%Y-%m-%d')
+    
+    with get_db_cursor(read_only=True, name='allocation_report') as cursor:
+        cursor.itersize = batch_size
+        cursor.execute("""
+            SELECT pe.name, pe.role,
+                   COALESCE(SUM(a.allocation), 0),
+                   COALESCE(string_agg(p.name || ' (' || a.allocation || '%%)', ', ' ORDER BY p.name), '')
+            FROM people pe
+            LEFT JOIN (assignments a
+                       JOIN projects p ON a.project_id = p.id
+                       AND p.status NOT IN ('Not Started', 'Completed', 'Cancelled'))
+                ON a.person_id = pe.id
+                AND %s BETWEEN a.start_date AND a.end_date
+            WHERE pe.organization_id = %s
+            GROUP BY pe.id
+            ORDER BY pe.name, pe.id
+        """, (date, organization_id))
+        for row in cursor:
+            yield AllocationReportRow._make(row)
+
+def iter_project_roster(organization_id, batch_size=EXPORT_BATCH_SIZE):
+    """Yield a ProjectRosterRow per project member of the organization.
+
+    Projects are in start date order with their members by name; a project
+    without a team gives one row with no person. Streamed from a server-side
+    cursor like iter_allocation_report().
+    """
+    with get_db_cursor(read_only=True, name='project_roster') as cursor:
+        cursor.itersize = batch_size
+        cursor.execute("""
+            SELECT pr.name, pr.project_type, pr.automated_status, pr.start_date, pr.end_date,
+                   pe.name, pe.role, a.allocation, a.start_date, a.end_date
+            FROM projects_with_status pr
+            LEFT JOIN assignments a ON a.project_id = pr.id
+            LEFT JOIN people pe ON a.person_id = pe.id
+            WHERE pr.organization_id = %s
+            ORDER BY pr.start_date, pr.id, pe.name, a.id
+        """, (organization_id,))
+        for row in cursor:
+            yield ProjectRosterRow._make(row)
+
+@read_only
+def count_allocation_report_rows(organization_id):
+    """Rows iter_allocation_report() yields: one per person of the organization"""
+    with get_db_cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM people WHERE organization_id = %s", (organization_id,))
+        return cursor.fetchone()[0]
+
+@read_only
+def count_project_roster_rows(organization_id):
+    """Rows iter_project_roster() yields: one per member, or one for a project without a team"""
+    with get_db_cursor() as cursor:
+        cursor.execute("""
+            SELECT COALESCE(SUM(GREATEST(team.size, 1)), 0)
+            FROM projects p
+            CROSS JOIN LATERAL (
+                SELECT COUNT(*) AS size FROM assignments a WHERE a.project_id = p.id
+            ) team
+            WHERE p.organization_id = %s
+        """, (organization_id,))
+        return cursor.fetchone()[0]
+
+@read_only
 def calculate_total_allocation(person_id, date=None):
     """Calculate total allocation for a person on a given date"""
     if date is None:
@@ -216,50 +714,630 @@ def calculate_total_allocation(person_id, date=None):
         result = cursor.fetchone()
         return result[0] if result else 0
 
-def get_project_assignments(project_id):
-    """Get all assignments for a project"""
+def _daily_allocations(organization_id, start_date, days,
+                       excluded_statuses=('Not Started', 'Completed', 'Cancelled')):
+    """The organization's people and a people x days matrix of their allocation.
+
+    One fetch of the assignments overlapping the range; a difference array
+    (+allocation on the first day, -allocation after the last) and a cumsum
+    turn them into daily totals. Projects in `excluded_statuses` don't count;
+    by default the same ones as in calculate_total_allocation.
+    """
+    import numpy as np  # Only the timeline endpoints need it; keep it out of worker startup
+    end_date = start_date + timedelta(days=days - 1)
+    with get_db_cursor() as cursor:
+        cursor.execute("""
+            SELECT id, name, role, availability
+            FROM people
+            WHERE organization_id = %s
+            ORDER BY name
+        """, (organization_id,))
+        people = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT a.person_id, a.allocation,
+                   GREATEST(a.start_date, %s) - %s::date AS first_day,
+                   LEAST(a.end_date, %s) - %s::date AS last_day
+            FROM assignments a
+            JOIN projects p ON a.project_id = p.id
+            WHERE p.organization_id = %s
+            AND a.start_date <= %s AND a.end_date >= %s
+            AND p.status <> ALL(%s)
+        """, (start_date, start_date, end_date, start_date, organization_id, end_date, start_date,
+              list(excluded_statuses)))
+        assignments = cursor.fetchall()
+
+    row_of = {person[0]: i for i, person in enumerate(people)}
+    assignments = [a for a in assignments if a[0] in row_of]
+    daily = np.zeros((len(people), days + 1), dtype=np.int64)
+    if assignments:
+        rows = np.fromiter((row_of[a[0]] for a in assignments), dtype=np.intp, count=len(assignments))
+        allocation, first, last = (np.array(column, dtype=np.int64)
+                                   for column in list(zip(*assignments))[1:])
+        np.add.at(daily, (rows, first), allocation)
+        np.add.at(daily, (rows, last + 1), -allocation)
+    return people, np.cumsum(daily[:, :days], axis=1)
+
+def _period_starts(start_date, days, granularity):
+    """Day offsets where each period starts: every day, or the start and each Monday"""
+    import numpy as np
+    if granularity == 'day':
+        return np.arange(days)
+    first_monday = (7 - start_date.weekday()) % 7
+    return np.concatenate(([0], np.arange(first_monday or 7, days, 7)))
+
+@read_only
+def get_allocation_timeline(organization_id, start_date, end_date, granularity='day'):
+    """Allocation of every person in the organization per day or week.
+
+    Built from _daily_allocations, so the cost does not grow with one query
+    per date. Weeks start on Monday (the first and last may be partial); their
+    `allocation` is the average daily allocation and `peak` the busiest day.
+    """
+    import numpy as np
+    start_date = _parse_date(start_date)
+    end_date = _parse_date(end_date)
+    if end_date < start_date:
+        raise ValueError("End date must not be before start date")
+    days = (end_date - start_date).days + 1
+    if days > TIMELINE_MAX_DAYS:
+        raise ValueError(f"Date range is limited to {TIMELINE_MAX_DAYS} days")
+    if granularity not in TIMELINE_GRANULARITIES:
+        raise ValueError(f"Granularity must be one of: {', '.join(TIMELINE_GRANULARITIES)}")
+
+    people, daily = _daily_allocations(organization_id, start_date, days)
+
+    starts = _period_starts(start_date, days, granularity)
+    lengths = np.diff(np.append(starts, days))
+    if len(people):
+        average = np.add.reduceat(daily, starts, axis=1) / lengths
+        peak = np.maximum.reduceat(daily, starts, axis=1)
+    else:
+        average = peak = np.zeros((0, len(starts)))
+
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'granularity': granularity,
+        'periods': [start_date + timedelta(days=int(offset)) for offset in starts],
+        'people': [
+            {
+                'id': person[0],
+                'name': person[1],
+                'role': person[2],
+                'allocation': [round(float(value), 1) for value in average[i]],
+                'peak': [int(value) for value in peak[i]]
+            }
+            for i, person in enumerate(people)
+        ]
+    }
+
+@read_only
+def get_capacity_forecast(organization_id, weeks=12, start_date=None):
+    """Supply, demand and free capacity per role for each of the next `weeks` weeks.
+
+    Weeks run Monday to Sunday, starting with the week of `start_date`
+    (default today). Figures are in FTE: supply is the role's headcount
+    weighted by AVAILABILITY_WEIGHTS, demand the average daily allocation of
+    its people. Not Started projects count here, as they are the planned
+    work; Completed and Cancelled ones don't. The whole organization is
+    reduced at once with NumPy, from the matrix of _daily_allocations.
+    """
+    import numpy as np
+    if not 1 <= weeks <= FORECAST_MAX_WEEKS:
+        raise ValueError(f"Weeks must be between 1 and {FORECAST_MAX_WEEKS}")
+    start_date = _parse_date(start_date or date.today())
+    start_date -= timedelta(days=start_date.weekday())
+
+    people, daily = _daily_allocations(organization_id, start_date, weeks * 7,
+                                       excluded_statuses=('Completed', 'Cancelled'))
+    weekly = daily.reshape(len(people), weeks, 7).mean(axis=2) / 100
+
+    roles, role_index = np.unique(np.array([person[2] for person in people], dtype=object),
+                                  return_inverse=True)
+    role_index = role_index.reshape(-1)
+    weights = np.fromiter(
+        (AVAILABILITY_WEIGHTS.get(str(person[3]).lower(), 1.0) for person in people),
+        dtype=np.float64, count=len(people))
+    headcount = np.bincount(role_index, minlength=len(roles))
+    supply = np.bincount(role_index, weights=weights, minlength=len(roles))
+    demand = np.zeros((len(roles), weeks))
+    np.add.at(demand, role_index, weekly)
+    free = supply[:, None] - demand
+
+    return {
+        'weeks': [start_date + timedelta(weeks=week) for week in range(weeks)],
+        'roles': [
+            {
+                'role': role,
+                'headcount': int(headcount[i]),
+                'supply': [round(float(supply[i]), 2)] * weeks,
+                'demand': [round(float(value), 2) for value in demand[i]],
+                'free': [round(float(value), 2) for value in free[i]]
+            }
+            for i, role in enumerate(roles)
+        ]
+    }
+
+def roll_over_allocations():
+    """Recompute the maintained current allocations that predate today; returns the count"""
+    with get_db_cursor(write=True) as cursor:
+        cursor.execute("SELECT roll_over_person_allocations()")
+        return cursor.fetchone()[0]
+
+@organization_cached
+@read_only
+def get_dashboard(organization_id):
+    """Everything the dashboard shows for an organization, from one query.
+
+    Returns {'projects', 'people', 'active_projects', 'total_people',
+    'available_count'}: projects (by start date) each carry their `team`
+    already grouped by project id, and people (by name) their current
+    allocation and `projects`, so rendering is linear in the rows. Dates
+    inside the lists are ISO strings.
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute(f"""
+            WITH org_people AS (
+                SELECT p.id, p.name, p.role, p.availability,
+                       {CURRENT_ALLOCATION_SQL} AS current_allocation
+                FROM people p
+                LEFT JOIN person_allocations al ON al.person_id = p.id
+                WHERE p.organization_id = %s
+            ),
+            org_projects AS (
+                SELECT id, name, project_type, status, start_date, end_date, automated_status
+                FROM projects_with_status
+                WHERE organization_id = %s
+            ),
+            org_assignments AS (
+                SELECT a.project_id, a.person_id, a.allocation, a.start_date, a.end_date,
+                       pe.name AS person_name, pe.role AS person_role,
+                       pr.name AS project_name, pr.status AS project_status
+                FROM assignments a
+                JOIN org_projects pr ON pr.id = a.project_id
+                JOIN org_people pe ON pe.id = a.person_id
+            ),
+            teams AS (
+                SELECT project_id,
+                       COUNT(DISTINCT person_id) AS team_count,
+                       json_agg(json_build_object(
+                           'person_id', person_id, 'name', person_name, 'role', person_role,
+                           'allocation', allocation
+                       ) ORDER BY person_name) AS team
+                FROM org_assignments
+                GROUP BY project_id
+            ),
+            person_projects AS (
+                SELECT person_id,
+                       json_agg(json_build_object(
+                           'project_id', project_id, 'name', project_name,
+                           'allocation', CASE WHEN project_status IN ('Not Started', 'Completed')
+                                              THEN 0 ELSE allocation END,
+                           'status', project_status, 'start_date', start_date,
+                           'assignment_end_date', end_date
+                       ) ORDER BY project_name) AS projects
+                FROM org_assignments
+                GROUP BY person_id
+            )
+            SELECT
+                (SELECT COALESCE(json_agg(json_build_object(
+                            'id', pr.id, 'name', pr.name, 'project_type', pr.project_type,
+                            'status', pr.status, 'start_date', pr.start_date, 'end_date', pr.end_date,
+                            'automated_status', pr.automated_status,
+                            'team_count', COALESCE(t.team_count, 0),
+                            'team', COALESCE(t.team, '[]'::json)
+                        ) ORDER BY pr.start_date, pr.id), '[]'::json)
+                 FROM org_projects pr
+                 LEFT JOIN teams t ON t.project_id = pr.id),
+                (SELECT COALESCE(json_agg(json_build_object(
+                            'id', pe.id, 'name', pe.name, 'role', pe.role,
+                            'availability', pe.availability,
+                            'current_allocation', pe.current_allocation,
+                            'projects', COALESCE(pp.projects, '[]'::json)
+                        ) ORDER BY pe.name, pe.id), '[]'::json)
+                 FROM org_people pe
+                 LEFT JOIN person_projects pp ON pp.person_id = pe.id),
+                (SELECT COUNT(*) FROM org_projects WHERE automated_status = 'Active'),
+                (SELECT COUNT(*) FROM org_people),
+                (SELECT COUNT(*) FROM org_people WHERE current_allocation < 50)
+        """, (organization_id, organization_id))
+        projects, people, active_projects, total_people, available_count = cursor.fetchone()
+    return {
+        'projects': projects,
+        'people': people,
+        'active_projects': active_projects,
+        'total_people': total_people,
+        'available_count': available_count
+    }
+
+def get_organization_version(organization_id):
+    """(version, modified_at) of the organization's people, projects and assignments.
+
+    Bumped in the database once by every transaction that writes them
+    (migrations 13 and 15); (0, None) for an organization that has never
+    changed. Always read from the primary: ETags validated against a lagging
+    replica would answer 304 for pages that have since changed.
+    """
+    with get_db_cursor(read_only=False) as cursor:
+        cursor.execute("""
+            SELECT version, modified_at
+            FROM organization_versions
+            WHERE organization_id = %s
+        """, (organization_id,))
+        row = cursor.fetchone()
+        return tuple(row) if row else (0, None)
+
+@read_only
+def get_organization_ids():
+    """Ids of every organization"""
+    with get_db_cursor() as cursor:
+        cursor.execute("SELECT id FROM organizations ORDER BY id")
+        return [row[0] for row in cursor.fetchall()]
+
+def sweep_project_statuses(organization_id):
+    """Persist today's date-driven status transitions of one organization's projects.
+
+    A single UPDATE moves every project in SWEPT_STATUSES to the status its
+    dates give (Not Started -> Active -> Overdue). The day is claimed in
+    status_sweeps first, so each organization is swept once a day however
+    many schedulers run. Returns (changed, duration_ms), or None when today's
+    sweep already happened.
+    """
+    started = time.monotonic()
+    with get_db_cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO status_sweeps (organization_id, swept_on)
+            VALUES (%s, CURRENT_DATE)
+            ON CONFLICT (organization_id, swept_on) DO NOTHING
+            RETURNING id
+        """, (organization_id,))
+        sweep = cursor.fetchone()
+        if sweep is None:
+            return None
+
+        cursor.execute("""
+            UPDATE projects
+            SET status = project_automated_status(status, start_date, end_date, CURRENT_DATE)
+            WHERE organization_id = %s
+            AND status IN %s
+            AND status <> project_automated_status(status, start_date, end_date, CURRENT_DATE)
+        """, (organization_id, SWEPT_STATUSES))
+        changed = cursor.rowcount
+        duration_ms = (time.monotonic() - started) * 1000
+
+        cursor.execute("""
+            UPDATE status_sweeps
+            SET changed = %s, duration_ms = %s, finished_at = NOW()
+            WHERE id = %s
+        """, (changed, duration_ms, sweep[0]))
+    if changed:
+        invalidate_organization(organization_id)
+    return changed, duration_ms
+
+def enqueue_export_job(organization_id, report_type, report_date, requested_by=None):
+    """Queue a report of the organization for the given day, or find the one already queued.
+
+    Returns (ExportJob, created). A job that is queued, running or done is
+    reused (see migration 14) unless its file has expired; failed jobs are
+    not, so asking again retries.
+    """
+    key = (organization_id, report_type, report_date)
+    with get_db_cursor() as cursor:
+        cursor.execute("""
+            DELETE FROM export_jobs
+            WHERE organization_id = %s AND report_type = %s AND report_date = %s
+            AND status = 'done' AND expires_at <= NOW()
+        """, key)
+        cursor.execute(f"""
+            INSERT INTO export_jobs (organization_id, report_type, report_date, requested_by)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (organization_id, report_type, report_date) WHERE status <> 'failed'
+            DO NOTHING
+            RETURNING {EXPORT_JOB_COLUMNS}
+        """, key + (requested_by,))
+        row = cursor.fetchone()
+        if row is not None:
+            return ExportJob._make(row), True
+
+        cursor.execute(f"""
+            SELECT {EXPORT_JOB_COLUMNS}
+            FROM export_jobs
+            WHERE organization_id = %s AND report_type = %s AND report_date = %s
+            AND status <> 'failed'
+        """, key)
+        return ExportJob._make(cursor.fetchone()), False
+
+def get_export_job(organization_id, job_id):
+    """One export job of the organization, or None.
+
+    Read from the primary: a replica could lag behind the job's progress.
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute(f"""
+            SELECT {EXPORT_JOB_COLUMNS}
+            FROM export_jobs
+            WHERE id = %s AND organization_id = %s
+        """, (job_id, organization_id))
+        row = cursor.fetchone()
+        return ExportJob._make(row) if row else None
+
+def get_export_file(organization_id, job_id):
+    """(filename, content bytes) of a finished, unexpired export of the organization, or None"""
     with get_db_cursor() as cursor:
         cursor.execute("""
-            SELECT a.id, a.project_id, a.person_id, p.name as person_name,
+            SELECT filename, content
+            FROM export_jobs
+            WHERE id = %s AND organization_id = %s
+            AND status = 'done' AND expires_at > NOW()
+        """, (job_id, organization_id))
+        row = cursor.fetchone()
+        return (row[0], bytes(row[1])) if row else None
+
+def claim_export_job(job_id):
+    """Move a queued job to running; returns it, or None if it was claimed or removed"""
+    with get_db_cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE export_jobs
+            SET status = 'running', updated_at = NOW()
+            WHERE id = %s AND status = 'queued'
+            RETURNING {EXPORT_JOB_COLUMNS}
+        """, (job_id,))
+        row = cursor.fetchone()
+        return ExportJob._make(row) if row else None
+
+def record_export_progress(job_id, rows_done, rows_total=None):
+    """Store a running job's progress, which also serves as its heartbeat"""
+    with get_db_cursor() as cursor:
+        cursor.execute("""
+            UPDATE export_jobs
+            SET rows_done = %s, rows_total = COALESCE(%s, rows_total), updated_at = NOW()
+            WHERE id = %s AND status = 'running'
+        """, (rows_done, rows_total, job_id))
+
+def finish_export_job(job_id, filename, content, rows_done, retention_hours):
+    """Store a job's file, downloadable for `retention_hours`"""
+    with get_db_cursor() as cursor:
+        cursor.execute("""
+            UPDATE export_jobs
+            SET status = 'done', filename = %s, content = %s, rows_done = %s,
+                updated_at = NOW(), finished_at = NOW(),
+                expires_at = NOW() + %s * INTERVAL '1 hour'
+            WHERE id = %s AND status = 'running'
+        """, (filename, psycopg2.Binary(content), rows_done, retention_hours, job_id))
+
+def fail_export_job(job_id, error):
+    """Mark a job failed, so the next request for its report builds it again"""
+    with get_db_cursor() as cursor:
+        cursor.execute("""
+            UPDATE export_jobs
+            SET status = 'failed', error = %s, updated_at = NOW(), finished_at = NOW()
+            WHERE id = %s AND status IN ('queued', 'running')
+        """, (error, job_id))
+
+def expire_export_jobs(retention_hours, stale_minutes):
+    """Retention sweep of export_jobs. Returns (abandoned, deleted).
+
+    Jobs queued or running without a heartbeat for `stale_minutes` (their
+    worker process died) are failed, so they stop blocking a rebuild; expired
+    files, and failed jobs older than the retention period, are deleted.
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute("""
+            UPDATE export_jobs
+            SET status = 'failed', error = 'Abandoned by its worker', finished_at = NOW()
+            WHERE status IN ('queued', 'running')
+            AND updated_at < NOW() - %s * INTERVAL '1 minute'
+        """, (stale_minutes,))
+        abandoned = cursor.rowcount
+        cursor.execute("""
+            DELETE FROM export_jobs
+            WHERE (status = 'done' AND expires_at <= NOW())
+            OR (status = 'failed' AND updated_at < NOW() - %s * INTERVAL '1 hour')
+        """, (retention_hours,))
+        return abandoned, cursor.rowcount
+
+@organization_cached
+@read_only
+def get_project_teams(organization_id=None, project_ids=None):
+    """Team of each project, with every member's total current allocation.
+
+    Covers the given projects, or every project of the organization, in one
+    query: totals come pre-aggregated from person_allocations (recomputed only
+    for stale rows) instead of joining each member's other assignments.
+    Returns {project_id: [ProjectAssignment]} ordered by name; projects
+    without a team are absent.
+    """
+    if project_ids is not None:
+        project_ids = [int(project_id) for project_id in project_ids]
+        if not project_ids:
+            return {}
+    with get_db_cursor() as cursor:
+        cursor.execute("""
+            SELECT a.id, a.project_id, a.person_id, pe.name as person_name,
                    a.allocation, a.start_date, a.end_date,
-                   COALESCE(SUM(
-                       CASE 
-                           WHEN CURRENT_DATE BETWEEN a2.start_date AND a2.end_date 
-                           AND p2.status NOT IN ('Not Started', 'Completed', 'Cancelled')
-                           THEN a2.allocation 
-                           ELSE 0 
-                       END
-                   ), 0) as total_allocation
+                   CASE WHEN al.as_of = CURRENT_DATE THEN al.current_allocation
+                        ELSE person_current_allocation(pe.id)
+                   END as total_allocation,
+                   pe.role as person_role
             FROM assignments a
-            JOIN people p ON a.person_id = p.id
-            LEFT JOIN assignments a2 ON p.id = a2.person_id
-            LEFT JOIN projects p2 ON a2.project_id = p2.id
-            WHERE a.project_id = %s
-            GROUP BY a.id, a.project_id, a.person_id, p.name,
-                     a.allocation, a.start_date, a.end_date
-        """, (project_id,))
-        
-        columns = ['id', 'project_id', 'person_id', 'person_name',
-                'allocation', 'start_date', 'end_date', 'total_allocation']
-        return pd.DataFrame(cursor.fetchall(), columns=columns)
+            JOIN projects pr ON a.project_id = pr.id
+            JOIN people pe ON a.person_id = pe.id
+            LEFT JOIN person_allocations al ON al.person_id = pe.id
+            WHERE (%s::integer IS NULL OR pr.organization_id = %s)
+            AND (%s::integer[] IS NULL OR a.project_id = ANY(%s))
+            ORDER BY a.project_id, pe.name
+        """, (organization_id, organization_id, project_ids, project_ids))
+        teams = {}
+        for row in cursor.fetchall():
+            member = ProjectAssignment._make(row)
+            teams.setdefault(member.project_id, []).append(member)
+        return teams
+
+def get_project_assignments(project_id):
+    """Get all assignments for a project"""
+    return get_project_teams(project_ids=[project_id]).get(int(project_id), [])
 
+@organization_cached
+@read_only
+def get_project_detail(organization_id, project_id):
+    """A project of the organization with its team and the people who could join it.
+
+    One statement lists the organization's people against the project, so
+    its cost depends on the organization's size rather than the platform's.
+    Returns {'project': Project, 'team': [ProjectAssignment], 'people':
+    [Person], 'available': [Person]}, or None when the organization has no
+    such project.
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute(f"""
+            SELECT pr.id, pr.name, pr.project_type, pr.status, pr.start_date, pr.end_date,
+                   pr.automated_status,
+                   p.id, p.name, p.role, p.availability,
+                   a.id, a.allocation, a.start_date, a.end_date,
+                   CASE WHEN a.id IS NOT NULL THEN {CURRENT_ALLOCATION_SQL} END
+            FROM projects_with_status pr
+            LEFT JOIN people p ON p.organization_id = pr.organization_id
+            LEFT JOIN assignments a ON a.project_id = pr.id AND a.person_id = p.id
+            LEFT JOIN person_allocations al ON al.person_id = p.id
+            WHERE pr.id = %s AND pr.organization_id = %s
+            ORDER BY p.name, p.id
+        """, (project_id, organization_id))
+        rows = cursor.fetchall()
+    if not rows:
+        return None
+
+    detail = {'project': Project._make(rows[0][:7]), 'team': [], 'people': [], 'available': []}
+    for row in rows:
+        if row[7] is None:  # The organization has no people yet
+            continue
+        person = Person._make(row[7:11])
+        detail['people'].append(person)
+        if row[11] is None:
+            detail['available'].append(person)
+        else:
+            detail['team'].append(ProjectAssignment(
+                row[11], row[0], person.id, person.name, row[12], row[13], row[14],
+                row[15], person.role))
+    return detail
+
+@read_only
 def get_available_people(project_id):
-    """Get people not assigned to the project"""
+    """Get people of the project's organization who are not assigned to it"""
     with get_db_cursor() as cursor:
         cursor.execute("""
             SELECT p.id, p.name, p.role, p.availability
-            FROM people p
-            WHERE p.id NOT IN (
-                SELECT person_id
-                FROM assignments
-                WHERE project_id = %s
+            FROM projects pr
+            JOIN people p ON p.organization_id = pr.organization_id
+            WHERE pr.id = %s
+            AND NOT EXISTS (
+                SELECT 1
+                FROM assignments a
+                WHERE a.project_id = pr.id AND a.person_id = p.id
             )
             ORDER BY p.name
         """, (project_id,))
-        
-        columns = ['id', 'name', 'role', 'availability']
-        return pd.DataFrame(cursor.fetchall(), columns=columns)
+        return [Person._make(row) for row in cursor.fetchall()]
+
+def _like_pattern(text):
+    """ILIKE pattern matching `text` anywhere, with its wildcards escaped"""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+@read_only
+def search_candidates(organization_id, project_id, query='', after=None, limit=CANDIDATES_PAGE_SIZE):
+    """People of the organization who could join the project, least booked first.
+
+    Each candidate gets `free_capacity`: MAX_ALLOCATION minus their peak
+    allocation on live projects during the project's dates (the peak falls
+    on the first day of one of their overlapping assignments, which is all
+    that is compared). `query` matches name or role anywhere, or names by
+    trigram word similarity. Pages are keyset-paginated on
+    (peak, name, id); pass the `next` key of one page as `after` for the
+    following one. Returns None when the project isn't in the organization.
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute("""
+            SELECT start_date, end_date
+            FROM projects
+            WHERE id = %s AND organization_id = %s
+        """, (project_id, organization_id))
+        project = cursor.fetchone()
+        if project is None:
+            return None
 
+        query = (query or '').strip()
+        after_peak, after_name, after_id = after if after else (None, None, None)
+        cursor.execute("""
+            WITH overlapping AS (
+                SELECT a.id, a.person_id, a.allocation,
+                       GREATEST(a.start_date, %(start)s) AS first_day,
+                       LEAST(a.end_date, %(end)s) AS last_day
+                FROM assignments a
+                JOIN people pe ON a.person_id = pe.id
+                JOIN projects pr ON a.project_id = pr.id
+                WHERE pe.organization_id = %(org)s
+                AND a.period && daterange(%(start)s, %(end)s, '[]')
+                AND pr.status NOT IN ('Completed', 'Cancelled')
+            ),
+            peaks AS (
+                SELECT person_id, MAX(load) AS peak
+                FROM (
+                    SELECT o1.person_id, SUM(o2.allocation) AS load
+                    FROM overlapping o1
+                    JOIN overlapping o2 ON o2.person_id = o1.person_id
+                         AND o2.first_day <= o1.first_day AND o2.last_day >= o1.first_day
+                    GROUP BY o1.person_id, o1.id  -- One load per assignment, even if days coincide
+                ) loads
+                GROUP BY person_id
+            ),
+            candidates AS (
+                SELECT pe.id, pe.name, pe.role, pe.availability,
+                       COALESCE(pk.peak, 0)::integer AS peak
+                FROM people pe
+                LEFT JOIN peaks pk ON pk.person_id = pe.id
+                WHERE pe.organization_id = %(org)s
+                AND NOT EXISTS (
+                    SELECT 1 FROM assignments x
+                    WHERE x.project_id = %(project)s AND x.person_id = pe.id
+                )
+                AND (%(query)s = ''
+                     OR pe.name ILIKE %(pattern)s
+                     OR pe.role ILIKE %(pattern)s
+                     OR %(query)s <%% pe.name)
+            )
+            SELECT id, name, role, availability, peak
+            FROM candidates
+            WHERE %(after_id)s::integer IS NULL
+               OR (peak, name, id) > (%(after_peak)s, %(after_name)s, %(after_id)s)
+            ORDER BY peak, name, id
+            LIMIT %(limit)s
+        """, {
+            'org': organization_id, 'project': project_id,
+            'start': project[0], 'end': project[1],
+            'query': query, 'pattern': _like_pattern(query),
+            'after_peak': after_peak, 'after_name': after_name, 'after_id': after_id,
+            'limit': limit + 1
+        })
+        rows = cursor.fetchall()
+
+    candidates = [
+        {
+            'id': row[0],
+            'name': row[1],
+            'role': row[2],
+            'availability': row[3],
+            'free_capacity': MAX_ALLOCATION - row[4]
+        }
+        for row in rows[:limit]
+    ]
+    next_key = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_key = (last[4], last[1], last[0])
+    return {'candidates': candidates, 'next': next_key}
+
+@read_only
 def get_all_assignments(organization_id=None):
     """Get all assignments from the database"""
     with get_db_cursor() as cursor:
@@ -282,7 +1360,166 @@ def get_all_assignments(organization_id=None):
                 JOIN people pe ON a.person_id = pe.id
                 ORDER BY a.start_date DESC
             """)
-        
-        columns = ['id', 'project_id', 'person_id', 'allocation', 'start_date', 'end_date', 
-                  'project_name', 'person_name']
-        return pd.DataFrame(cursor.fetchall(), columns=columns) 
\ No newline at end of file
+        return [Assignment._make(row) for row in cursor.fetchall()] 
+
+def _keyset_page(columns, from_sql, conditions, params, sort_sql, id_sql,
+                 descending=False, after=None, limit=LISTING_PAGE_SIZE, with_total=False):
+    """One page of rows ordered by (sort_sql, id_sql), continuing after the key `after`.
+
+    The row-value comparison on the sort column plus id lets an index on
+    (organization, sort column) seek straight to the page instead of
+    skipping OFFSET rows. Returns (rows, next key or None, total or None);
+    the total is only counted when asked for, typically on the first page.
+    """
+    if not 1 <= limit <= LISTING_MAX_PAGE_SIZE:
+        raise ValueError(f"Limit must be between 1 and {LISTING_MAX_PAGE_SIZE}")
+    where = ' AND '.join(conditions)
+    direction = 'DESC' if descending else 'ASC'
+    page_conditions = list(conditions)
+    page_params = list(params)
+    if after is not None:
+        if len(after) != 2:
+            raise ValueError("Invalid cursor")
+        page_conditions.append(f"({sort_sql}, {id_sql}) {'<' if descending else '>'} (%s, %s)")
+        page_params.extend(after)
+
+    with get_db_cursor() as cursor:
+        cursor.execute(f"""
+            SELECT {columns}, {sort_sql}
+            FROM {from_sql}
+            WHERE {' AND '.join(page_conditions)}
+            ORDER BY {sort_sql} {direction}, {id_sql} {direction}
+            LIMIT %s
+        """, page_params + [limit + 1])
+        rows = cursor.fetchall()
+
+        total = None
+        if with_total:
+            cursor.execute(f"SELECT COUNT(*) FROM {from_sql} WHERE {where}", params)
+            total = cursor.fetchone()[0]
+
+    next_key = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_key = (last[-1], last[0])
+    return [row[:-1] for row in rows[:limit]], next_key, total
+
+PEOPLE_SORTS = {
+    'name': 'p.name',
+    'role': 'p.role',
+    'availability': 'p.availability',
+    'allocation': CURRENT_ALLOCATION_SQL
+}
+
+@organization_cached
+@read_only
+def list_people(organization_id, sort='name', descending=False, role=None, availability=None,
+                band=None, search=None, after=None, limit=LISTING_PAGE_SIZE, with_total=False):
+    """A page of the organization's people with their current allocation.
+
+    Sorted by one of PEOPLE_SORTS and filtered by role, availability, allocation
+    band (ALLOCATION_BANDS) and a name/role search. Returns
+    {'items': [PersonListing], 'next': key or None, 'total': int or None}.
+    """
+    if sort not in PEOPLE_SORTS:
+        raise ValueError(f"Sort must be one of: {', '.join(PEOPLE_SORTS)}")
+    if band and band not in ALLOCATION_BANDS:
+        raise ValueError(f"Band must be one of: {', '.join(ALLOCATION_BANDS)}")
+    conditions = ['p.organization_id = %s']
+    params = [organization_id]
+    if role:
+        conditions.append('p.role = %s')
+        params.append(role)
+    if availability:
+        conditions.append('p.availability = %s')
+        params.append(availability)
+    if band:
+        conditions.append(ALLOCATION_BANDS[band])
+    if search:
+        conditions.append('(p.name ILIKE %s OR p.role ILIKE %s)')
+        params.extend([_like_pattern(search)] * 2)
+
+    rows, next_key, total = _keyset_page(
+        f"p.id, p.name, p.role, p.availability, {CURRENT_ALLOCATION_SQL}",
+        "people p LEFT JOIN person_allocations al ON al.person_id = p.id",
+        conditions, params, PEOPLE_SORTS[sort], 'p.id',
+        descending, after, limit, with_total)
+    return {'items': [PersonListing._make(row) for row in rows], 'next': next_key, 'total': total}
+
+PROJECT_SORTS = {
+    'name': 'name',
+    'type': 'project_type',
+    'status': 'automated_status',
+    'start_date': 'start_date',
+    'end_date': 'end_date'
+}
+
+@organization_cached
+@read_only
+def list_projects(organization_id, sort='start_date', descending=False, status=None,
+                  project_type=None, search=None, after=None, limit=LISTING_PAGE_SIZE, with_total=False):
+    """A page of the organization's projects.
+
+    Sorted by one of PROJECT_SORTS and filtered by automated status, type and
+    a name search. Returns {'items': [Project], 'next': key or None, 'total': int or None}.
+    """
+    if sort not in PROJECT_SORTS:
+        raise ValueError(f"Sort must be one of: {', '.join(PROJECT_SORTS)}")
+    if status and status not in AUTOMATED_STATUS_CONDITIONS:
+        raise ValueError(f"Status must be one of: {', '.join(AUTOMATED_STATUS_CONDITIONS)}")
+    conditions = ['organization_id = %s']
+    params = [organization_id]
+    if status:
+        conditions.append(AUTOMATED_STATUS_CONDITIONS[status])
+    if project_type:
+        conditions.append('project_type = %s')
+        params.append(project_type)
+    if search:
+        conditions.append('name ILIKE %s')
+        params.append(_like_pattern(search))
+
+    rows, next_key, total = _keyset_page(
+        "id, name, project_type, status, start_date, end_date, automated_status",
+        "projects_with_status",
+        conditions, params, PROJECT_SORTS[sort], 'id',
+        descending, after, limit, with_total)
+    return {'items': [Project._make(row) for row in rows], 'next': next_key, 'total': total}
+
+ASSIGNMENT_SORTS = {
+    'start_date': 'a.start_date',
+    'end_date': 'a.end_date',
+    'allocation': 'a.allocation',
+    'project_name': 'p.name',
+    'person_name': 'pe.name'
+}
+
+@organization_cached
+@read_only
+def list_assignments(organization_id, sort='start_date', descending=True, project_id=None,
+                     person_id=None, status=None, after=None, limit=LISTING_PAGE_SIZE, with_total=False):
+    """A page of the organization's assignments.
+
+    Sorted by one of ASSIGNMENT_SORTS (newest first by default) and filtered
+    by project, person and project status. Returns
+    {'items': [Assignment], 'next': key or None, 'total': int or None}.
+    """
+    if sort not in ASSIGNMENT_SORTS:
+        raise ValueError(f"Sort must be one of: {', '.join(ASSIGNMENT_SORTS)}")
+    conditions = ['p.organization_id = %s']
+    params = [organization_id]
+    if project_id:
+        conditions.append('a.project_id = %s')
+        params.append(int(project_id))
+    if person_id:
+        conditions.append('a.person_id = %s')
+        params.append(int(person_id))
+    if status:
+        conditions.append('p.status = %s')
+        params.append(status)
+
+    rows, next_key, total = _keyset_page(
+        "a.id, a.project_id, a.person_id, a.allocation, a.start_date, a.end_date, p.name, pe.name",
+        "assignments a JOIN projects p ON a.project_id = p.id JOIN people pe ON a.person_id = pe.id",
+        conditions, params, ASSIGNMENT_SORTS[sort], 'a.id',
+        descending, after, limit, with_total)
+    return {'items': [Assignment._make(row) for row in rows], 'next': next_key, 'total': total}
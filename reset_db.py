@@ -2,6 +2,7 @@ import os
 from dotenv import load_dotenv
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from database import run_migrations
 
 # Load environment variables
 load_dotenv()
@@ -35,6 +36,9 @@ def reset_database():
             sql = f.read()
             cur.execute(sql)
 
+        # Stamp the baseline and apply the newer migrations on top of it
+        run_migrations(conn)
+
         # Create default organization and superuser
         cur.execute("""
             INSERT INTO users (email, name, role, is_active)
@@ -1,22 +1,40 @@
-from flask import Blueprint, request, jsonify, render_template, send_file, current_app, session, redirect, url_for
+from flask import (
+    Blueprint, Response, request, jsonify, render_template, send_file, current_app, session, redirect,
+    stream_with_context, url_for
+)
 from models.core import (
-    get_all_people, get_all_projects, get_current_assignments, get_project_assignments, get_available_people,
+    get_project, get_project_teams,
+    count_projects_by_status, get_dashboard, get_organization_version, get_project_detail,
     add_person, add_project, add_assignment,
+    add_people_bulk, add_projects_bulk, add_assignments_bulk,
     update_person, update_project, update_assignment,
     delete_person, delete_project, delete_assignment,
-    get_all_assignments
+    get_all_assignments, get_allocation_timeline, get_capacity_forecast, search_candidates,
+    enqueue_export_job, get_export_job, get_export_file,
+    list_people, list_projects, list_assignments,
+    OverallocationError, CANDIDATES_PAGE_SIZE, LISTING_PAGE_SIZE
 )
 from routes.auth import org_access_required, login_required
-from database import DatabaseError, get_db_cursor
+from database import (
+    DatabaseError, PoolTimeoutError, QueryTimeoutError, async_db_enabled, get_async_pool_stats,
+    get_db_cursor, get_pool_stats, get_replica_pool_stats, get_timeout_stats, primary_queries,
+    query_timeout, read_only, run_async_transaction
+)
 from functools import wraps
+from cache import get_cache_stats, invalidate_organization
+from exports import REPORTS as EXPORT_REPORTS, export_filename, submit_export_job
+from models import aio
 from models.auth import (
     get_user_organizations, get_organization_users, update_user_status,
-    can_access_users_page, can_manage_users, get_user_role
+    can_access_users_page, can_manage_users, get_user_role, is_platform_admin
 )
-import pandas as pd
-from datetime import datetime
+from datetime import date, datetime, time, timedelta
+import hashlib
 import io
+import os
 import csv
+import base64
+import json
 import psycopg2
 
 # Constants
@@ -48,56 +66,158 @@ AVAILABILITY_TYPES = [
     'Part-Time'
 ]
 
+# Maximum rows per array accepted by the bulk endpoint
+BULK_MAX_ROWS = 5000
+
+# Characters of CSV buffered before each chunk of a streamed export is sent
+EXPORT_CHUNK_SIZE = 64 * 1024
+
 bp = Blueprint('main', __name__)
 
-def sort_dataframe(df, sort_by, sort_order='asc'):
-    """Helper function to sort dataframes"""
-    if sort_by in df.columns:
-        return df.sort_values(by=sort_by, ascending=(sort_order == 'asc'))
-    return df
+def async_variant(async_view):
+    """Serve a route with `async_view` instead when ASYNC_DB is enabled.
 
-def get_project_status(project):
-    """Determine project status based on dates and current status"""
-    try:
-        today = datetime.now().date()
-        
-        # Handle both string dates (from CSV) and datetime.date objects (from PostgreSQL)
-        if isinstance(project['start_date'], str):
-            start_date = datetime.strptime(project['start_date'], '%Y-%m-%d').date()
-        else:
-            start_date = project['start_date']
-            
-        if isinstance(project['end_date'], str):
-            end_date = datetime.strptime(project['end_date'], '%Y-%m-%d').date()
-        else:
-            end_date = project['end_date']
+    Both views take the same arguments and return the same JSON; the sync one
+    stays the default. Under WSGI, ensure_sync() runs the async view to
+    completion on the request's thread, so the thread is held for the whole
+    database round trip: the async path saves connections, not threads.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if async_db_enabled():
+                return current_app.ensure_sync(async_view)(*args, **kwargs)
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+_fingerprint = None
+
+def _deploy_fingerprint():
+    """Sizes and mtimes of the templates and static files, so a deploy retires old ETags"""
+    global _fingerprint
+    if _fingerprint is None:
+        digest = hashlib.sha1()
+        for folder in (current_app.template_folder, current_app.static_folder):
+            folder = os.path.join(current_app.root_path, folder)
+            for root, _, files in sorted(os.walk(folder)):
+                for name in sorted(files):
+                    stat = os.stat(os.path.join(root, name))
+                    digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        _fingerprint = digest.hexdigest()
+    return _fingerprint
+
+def conditional_get(f):
+    """Answer a GET with 304 Not Modified while the organization's data is unchanged.
+
+    The strong ETag hashes the organization's version (bumped in the database
+    by every transaction writing its people, projects and assignments, and
+    read from the primary) with everything
+    else the response depends on: the URL, the user, the language, today's
+    date and the deployed templates. It is checked before the view runs, so
+    an unchanged page costs one primary-key lookup.
+
+    The view then renders inside primary_queries(): from the primary and not
+    from the per-process cache, so the body is never older than the version
+    its ETag was built from.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        org_id = session.get('organization_id')
+        if request.method != 'GET' or not org_id:
+            return f(*args, **kwargs)
         
-        # First check manual statuses that override automatic ones
-        if project['status'] == 'Cancelled':
-            return 'Cancelled'
-        elif project['status'] == 'Completed':
-            return 'Completed'
+        version, modified_at = get_organization_version(org_id)
+        today = date.today()
+        etag = hashlib.sha1("|".join(str(part) for part in (
+            org_id, version, today, request.full_path, session.get('user_id'),
+            session.get('lang'), request.headers.get('Accept-Language'), _deploy_fingerprint()
+        )).encode()).hexdigest()
+        # Pages also change when the date does (statuses, current allocations)
+        last_modified = datetime.combine(today, time.min).astimezone()
+        if modified_at is not None:
+            last_modified = max(last_modified, modified_at)
         
-        # Then check date-based statuses
-        if start_date > today:
-            return 'Not Started'
-        elif end_date < today:
-            return 'Overdue'
-        elif project['status'] == 'On Hold':
-            return 'On Hold'
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains(etag)
+        else:
+            since = request.if_modified_since
+            not_modified = since is not None and last_modified.replace(microsecond=0) <= since
+        if not_modified:
+            response = current_app.response_class(status=304)
         else:
-            # If project was On Hold and is being changed to Active,
-            # recalculate based on dates
-            if project['status'] == 'Active':
-                if start_date <= today and end_date >= today:
-                    return 'Active'
-                elif start_date > today:
-                    return 'Not Started'
-                elif end_date < today:
-                    return 'Overdue'
-            return 'Active'
-    except (ValueError, KeyError):
-        return 'Active'  # Default fallback
+            with primary_queries():
+                response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    return decorated_function
+
+def encode_page_key(key):
+    """Opaque cursor for the keyset key of a page's last row"""
+    if key is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(list(key), default=str).encode()).decode()
+
+def decode_page_key(cursor):
+    """Keyset key from a cursor made by encode_page_key; raises ValueError when malformed"""
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, list):
+        raise ValueError("Invalid cursor")
+    return tuple(key)
+
+def listing_args():
+    """Order, cursor and limit of a listing request; raises ValueError when malformed.
+
+    Shared by the listing pages and /api/people, /api/projects and
+    /api/assignments: sort_order (asc or desc), cursor (the next cursor of the
+    previous page) and limit. Totals are only counted for the first page.
+    """
+    order = request.args.get('sort_order')
+    if order not in (None, 'asc', 'desc'):
+        raise ValueError("Sort order must be asc or desc")
+    cursor = request.args.get('cursor')
+    return {
+        'after': decode_page_key(cursor),
+        'limit': int(request.args.get('limit', LISTING_PAGE_SIZE)),
+        'with_total': not cursor,
+        **({'descending': order == 'desc'} if order else {})
+    }
+
+def next_page_url(endpoint, page):
+    """URL of the page after `page` with the current filters and sort, or None"""
+    if page['next'] is None:
+        return None
+    args = request.args.to_dict()
+    args['cursor'] = encode_page_key(page['next'])
+    return url_for(endpoint, **args)
+
+def listing_response(page):
+    """JSON body of a listing page"""
+    return jsonify({
+        'items': [
+            {field: value.isoformat() if hasattr(value, 'isoformat') else value
+             for field, value in record._asdict().items()}
+            for record in page['items']
+        ],
+        'next_cursor': encode_page_key(page['next']),
+        'total': page['total']
+    })
+
+async def run_async_write(fn, *args):
+    """run_async_transaction for a write to the current organization's data"""
+    result = await run_async_transaction(fn, *args)
+    invalidate_organization(session.get('organization_id'))
+    return result
 
 def get_current_organization():
     """Get current organization ID and name from session"""
@@ -113,6 +233,8 @@ def load_organization():
 
 @bp.route('/')
 @login_required
+@read_only
+@conditional_get
 def dashboard():
     """Dashboard view with organization context"""
     # Debug logging
@@ -124,109 +246,25 @@ def dashboard():
         return redirect(url_for('auth.login'))
     
     try:
-        with get_db_cursor() as cur:
-            # Get projects for current organization
-            cur.execute("""
-                SELECT p.id, p.name, p.project_type, p.status,
-                       p.start_date, p.end_date,
-                       COUNT(DISTINCT a.person_id) as team_count
-                FROM projects p
-                LEFT JOIN assignments a ON p.id = a.project_id
-                WHERE p.organization_id = %s
-                GROUP BY p.id, p.name, p.project_type, p.status, p.start_date, p.end_date
-                ORDER BY p.start_date ASC
-            """, (org_id,))
-            projects = [
-                {
-                    'id': row[0],
-                    'name': row[1],
-                    'project_type': row[2],
-                    'status': row[3],
-                    'start_date': row[4],
-                    'end_date': row[5],
-                    'team_count': row[6],
-                    'automated_status': get_project_status({
-                        'status': row[3],
-                        'start_date': row[4],
-                        'end_date': row[5]
-                    })
-                }
-                for row in cur.fetchall()
-            ]
-            
-            # Get people with their current allocations and project assignments
-            cur.execute("""
-                WITH person_allocations AS (
-                    SELECT p.id, p.name, p.role, p.availability,
-                           COALESCE(SUM(
-                               CASE 
-                                   WHEN CURRENT_DATE BETWEEN a.start_date AND a.end_date 
-                                   AND pr.status NOT IN ('Not Started', 'Completed', 'Cancelled')
-                                   THEN a.allocation 
-                                   ELSE 0 
-                               END
-                           ), 0) as current_allocation
-                    FROM people p
-                    LEFT JOIN assignments a ON p.id = a.person_id
-                    LEFT JOIN projects pr ON a.project_id = pr.id
-                    WHERE p.organization_id = %s
-                    GROUP BY p.id, p.name, p.role, p.availability
-                )
-                SELECT pa.id, pa.name, pa.role, pa.availability, pa.current_allocation,
-                       a.project_id, a.allocation, pr.name as project_name, pr.status as project_status,
-                       a.start_date, a.end_date as assignment_end_date
-                FROM person_allocations pa
-                LEFT JOIN assignments a ON pa.id = a.person_id
-                LEFT JOIN projects pr ON a.project_id = pr.id
-                ORDER BY pa.name ASC
-            """, (org_id,))
-            
-            # Structure the data with projects for each person
-            people_dict = {}
-            for row in cur.fetchall():
-                person_id = row[0]
-                if person_id not in people_dict:
-                    people_dict[person_id] = {
-                        'id': person_id,
-                        'name': row[1],
-                        'role': row[2],
-                        'availability': row[3],
-                        'current_allocation': row[4],
-                        'projects': []
-                    }
-                if row[5]:  # if there's a project assignment
-                    allocation = row[6] if row[8] not in ['Not Started', 'Completed'] else 0
-                    people_dict[person_id]['projects'].append({
-                        'project_id': row[5],
-                        'name': row[7],
-                        'allocation': allocation,
-                        'status': row[8],
-                        'start_date': row[9],
-                        'assignment_end_date': row[10]
-                    })
-            
-            people = list(people_dict.values())
-            
-            # Calculate dashboard metrics
-            active_project_count = sum(1 for p in projects if p['status'] == 'Active')
-            total_people = len(people)
-            available_count = sum(1 for p in people if p['current_allocation'] < 50)
-    
+        dashboard_data = get_dashboard(org_id)
+    except (PoolTimeoutError, QueryTimeoutError):
+        raise  # Answered with 503/504 by the app's error handlers
     except Exception as e:
         current_app.logger.error(f"Error in dashboard: {str(e)}")
         return redirect(url_for('auth.login'))
         
     return render_template('dashboard.html',
-                         projects=projects,
-                         people=people,
+                         projects=dashboard_data['projects'],
+                         people=dashboard_data['people'],
                          organization_name=org_name,
                          now=datetime.now(),
-                         active_projects=active_project_count,
-                         total_people=total_people,
-                         available_count=available_count)
+                         active_projects=dashboard_data['active_projects'],
+                         total_people=dashboard_data['total_people'],
+                         available_count=dashboard_data['available_count'])
 
 @bp.route('/projects', methods=['GET', 'POST'])
 @login_required
+@conditional_get
 def projects():
     """Projects view with organization context"""
     org_id, org_name = get_current_organization()
@@ -250,69 +288,99 @@ def projects():
                 org_id
             ))
             project_id = cur.fetchone()[0]
-            return jsonify({'id': project_id, 'message': 'Project created successfully'})
-    
-    # Fetch projects and their assignments for the current organization
-    with get_db_cursor() as cur:
-        # First get all projects
-        cur.execute("""
-            SELECT p.id, p.name, p.project_type, p.status,
-                   p.start_date, p.end_date,
-                   COUNT(DISTINCT a.person_id) as team_count
-            FROM projects p
-            LEFT JOIN assignments a ON p.id = a.project_id
-            WHERE p.organization_id = %s
-            GROUP BY p.id, p.name, p.project_type, p.status, p.start_date, p.end_date
-            ORDER BY p.start_date ASC
-        """, (org_id,))
-        projects = [
-            {
-                'id': row[0],
-                'name': row[1],
-                'project_type': row[2],
-                'status': row[3],
-                'start_date': row[4],
-                'end_date': row[5],
-                'team_count': row[6],
-                'automated_status': get_project_status({
-                    'status': row[3],
-                    'start_date': row[4],
-                    'end_date': row[5]
-                }),
-                'assignments': []  # Will be filled with assignment data
-            }
-            for row in cur.fetchall()
-        ]
-        
-        # Create a mapping of project IDs to their indices in the projects list
-        project_map = {project['id']: i for i, project in enumerate(projects)}
-        
-        # Then get all assignments with person details
-        cur.execute("""
-            SELECT a.project_id, p.name, p.role, a.allocation
-            FROM assignments a
-            JOIN people p ON a.person_id = p.id
-            WHERE a.project_id IN (SELECT id FROM projects WHERE organization_id = %s)
-            ORDER BY p.name ASC
-        """, (org_id,))
-        
-        # Add assignments to their respective projects
-        for row in cur.fetchall():
-            project_id, person_name, person_role, allocation = row
-            if project_id in project_map:
-                projects[project_map[project_id]]['assignments'].append({
-                    'name': person_name,
-                    'role': person_role,
-                    'allocation': allocation
-                })
+        invalidate_organization(org_id)
+        return jsonify({'id': project_id, 'message': 'Project created successfully'})
+    
+    # Fetch a page of projects and their teams for the current organization
+    try:
+        page = list_projects(
+            org_id,
+            sort=request.args.get('sort_by', 'start_date'),
+            status=request.args.get('status') or None,
+            project_type=request.args.get('type') or None,
+            search=request.args.get('search') or None,
+            **listing_args()
+        )
+    except ValueError:
+        return redirect(url_for('main.projects'))
+    teams = get_project_teams(organization_id=org_id,
+                              project_ids=[project.id for project in page['items']])
+    
+    projects = [
+        {
+            'id': project.id,
+            'name': project.name,
+            'project_type': project.project_type,
+            'status': project.status,
+            'start_date': project.start_date,
+            'end_date': project.end_date,
+            'team_count': len(teams.get(project.id, [])),
+            'automated_status': project.automated_status,
+            'assignments': [
+                {
+                    'name': member.person_name,
+                    'role': member.person_role,
+                    'allocation': member.allocation,
+                    'total_allocation': member.total_allocation
+                }
+                for member in teams.get(project.id, [])
+            ]
+        }
+        for project in page['items']
+    ]
     
     return render_template('projects.html', 
                          organization_name=org_name,
                          project_types=PROJECT_TYPES,
                          project_statuses=PROJECT_STATUSES,
-                         projects=projects)
+                         projects=projects,
+                         total=page['total'],
+                         next_url=next_page_url('main.projects', page))
+
+def project_update_data(data):
+    """Project fields from a PUT payload, with the status adjusted to the new dates"""
+    project_data = {
+        'name': data['name'],
+        'project_type': data['project_type'],
+        'status': data['status'],
+        'start_date': data['start_date'],
+        'end_date': data['end_date']
+    }
+    
+    # Check if dates have changed and update status accordingly
+    today = datetime.now().date()
+    start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
+    end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date()
+    
+    # If start date is today and project is not manually set to On Hold,
+    # set status to Active
+    if start_date == today and project_data['status'] != 'On Hold':
+        project_data['status'] = 'Active'
+    # If end date is yesterday and project is not manually set to On Hold,
+    # set status to Overdue
+    elif end_date < today and project_data['status'] != 'On Hold':
+        project_data['status'] = 'Overdue'
+    return project_data
+
+async def manage_project_async(project_id):
+    if request.method == 'DELETE':
+        await run_async_write(aio.delete_project, project_id)
+        return jsonify({'success': True})
+    
+    data = request.json
+    project_data = project_update_data(data)
+    
+    async def update_and_fetch(conn):
+        await aio.update_project(conn, project_id, project_data)
+        return await aio.get_project(conn, project_id)
+    
+    project = await run_async_write(update_and_fetch)
+    if project:
+        return jsonify({'success': True, 'project': project})
+    return jsonify({'success': True, 'project': data})
 
 @bp.route('/projects/<project_id>', methods=['PUT', 'DELETE'])
+@async_variant(manage_project_async)
 def manage_project(project_id):
     if request.method == 'DELETE':
         delete_project(project_id)
@@ -320,55 +388,21 @@ def manage_project(project_id):
     
     elif request.method == 'PUT':
         data = request.json
-        project_data = {
-            'name': data['name'],
-            'project_type': data['project_type'],
-            'status': data['status'],
-            'start_date': data['start_date'],
-            'end_date': data['end_date']
-        }
-        
-        # Check if dates have changed and update status accordingly
-        today = datetime.now().date()
-        start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
-        end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date()
-        
-        # If start date is today and project is not manually set to On Hold,
-        # set status to Active
-        if start_date == today and project_data['status'] != 'On Hold':
-            project_data['status'] = 'Active'
-        # If end date is yesterday and project is not manually set to On Hold,
-        # set status to Overdue
-        elif end_date < today and project_data['status'] != 'On Hold':
-            project_data['status'] = 'Overdue'
+        project_data = project_update_data(data)
         
         # Update the project
         update_project(project_id, project_data)
         
-        # Get the updated project with recalculated automated status
-        with get_db_cursor() as cur:
-            cur.execute("""
-                SELECT id, name, project_type, status, start_date, end_date
-                FROM projects
-                WHERE id = %s
-            """, (project_id,))
-            row = cur.fetchone()
-            if row:
-                project = {
-                    'id': row[0],
-                    'name': row[1],
-                    'project_type': row[2],
-                    'status': row[3],
-                    'start_date': row[4],
-                    'end_date': row[5]
-                }
-                project['automated_status'] = get_project_status(project)
-                return jsonify({'success': True, 'project': project})
+        # Get the updated project with its automated status
+        project = get_project(project_id)
+        if project:
+            return jsonify({'success': True, 'project': project._asdict()})
         
         return jsonify({'success': True, 'project': data})
 
 @bp.route('/people', methods=['GET', 'POST'])
 @login_required
+@conditional_get
 def people():
     """People view with organization context"""
     org_id, org_name = get_current_organization()
@@ -390,45 +424,47 @@ def people():
                 org_id
             ))
             person_id = cur.fetchone()[0]
-            return jsonify({'id': person_id, 'message': 'Person added successfully'})
-    
-    # Fetch people and their current allocations
-    with get_db_cursor() as cur:
-        cur.execute("""
-            SELECT p.id, p.name, p.role, p.availability,
-                   COALESCE(SUM(
-                       CASE 
-                           WHEN CURRENT_DATE BETWEEN a.start_date AND a.end_date 
-                           AND pr.status NOT IN ('Not Started', 'Completed', 'Cancelled')
-                           THEN a.allocation 
-                           ELSE 0 
-                       END
-                   ), 0) as current_allocation
-            FROM people p
-            LEFT JOIN assignments a ON p.id = a.person_id
-            LEFT JOIN projects pr ON a.project_id = pr.id
-            WHERE p.organization_id = %s
-            GROUP BY p.id, p.name, p.role, p.availability
-            ORDER BY p.name ASC
-        """, (org_id,))
-        people = [
-            {
-                'id': row[0],
-                'name': row[1],
-                'role': row[2],
-                'availability': row[3],
-                'current_allocation': row[4]
-            }
-            for row in cur.fetchall()
-        ]
+        invalidate_organization(org_id)
+        return jsonify({'id': person_id, 'message': 'Person added successfully'})
+    
+    # Fetch a page of people and their current allocations
+    try:
+        page = list_people(
+            org_id,
+            sort=request.args.get('sort_by', 'name'),
+            role=request.args.get('role') or None,
+            band=request.args.get('availability') or None,
+            search=request.args.get('search') or None,
+            **listing_args()
+        )
+    except ValueError:
+        return redirect(url_for('main.people'))
+    people = [person._asdict() for person in page['items']]
     
     return render_template('people.html', 
                          organization_name=org_name,
                          roles=ROLES,
                          availability_types=AVAILABILITY_TYPES,
-                         people=people)
+                         people=people,
+                         total=page['total'],
+                         next_url=next_page_url('main.people', page))
+
+async def manage_person_async(person_id):
+    if request.method == 'DELETE':
+        await run_async_write(aio.delete_person, person_id)
+        return jsonify({'success': True})
+    
+    data = request.json
+    person_data = {
+        'name': data['name'],
+        'role': data['role'],
+        'availability': data['availability']
+    }
+    await run_async_write(aio.update_person, person_id, person_data)
+    return jsonify({'success': True, 'person': data})
 
 @bp.route('/people/<person_id>', methods=['PUT', 'DELETE'])
+@async_variant(manage_person_async)
 def manage_person(person_id):
     if request.method == 'DELETE':
         delete_person(person_id)
@@ -444,6 +480,26 @@ def manage_person(person_id):
         update_person(person_id, person_data)
         return jsonify({'success': True, 'person': data})
 
+def overallocation_response(e):
+    """400 response listing the overloaded days and the assignments behind them.
+
+    Resending the request with "force": true saves the assignment anyway.
+    """
+    return jsonify({
+        'error': str(e),
+        'peak_allocation': e.peak,
+        'overloaded': [
+            {'start_date': first.isoformat(), 'end_date': last.isoformat()}
+            for first, last in e.overloaded
+        ],
+        'conflicts': [
+            dict(conflict,
+                 start_date=conflict['start_date'].isoformat(),
+                 end_date=conflict['end_date'].isoformat())
+            for conflict in e.conflicts
+        ]
+    }), 400
+
 @bp.route('/assignments/<project_id>', methods=['GET', 'POST'])
 def project_assignments(project_id):
     try:
@@ -462,53 +518,67 @@ def project_assignments(project_id):
         }
         
         try:
-            assignment_id = add_assignment(assignment_data)
+            assignment_id = add_assignment(assignment_data, allow_overallocation=bool(data.get('force')))
             assignment_data['id'] = assignment_id
             return jsonify({'success': True, 'assignment': assignment_data})
+        except OverallocationError as e:
+            return overallocation_response(e)
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
         except psycopg2.IntegrityError:
             return jsonify({'error': 'Database integrity error'}), 400
     
-    # GET request - return project details with assignments
-    projects_df = get_all_projects()
-    project = projects_df[projects_df['id'] == project_id].to_dict('records')[0]
-    project['automated_status'] = get_project_status(project)
-    
-    # Get assignments for this project with total allocations
-    project_assignments_df = get_project_assignments(project_id)
-    project_assignments = project_assignments_df.to_dict('records')
-    
-    # Convert IDs to integers
-    for assignment in project_assignments:
-        assignment['id'] = int(assignment['id'])
-        assignment['person_id'] = int(assignment['person_id'])
-        assignment['project_id'] = int(assignment['project_id'])
-        assignment['total_allocation'] = int(assignment['total_allocation'])
+    # GET request - the project, its team with total allocations and the
+    # organization's people, scoped to the current organization
+    org_id, _ = get_current_organization()
+    detail = get_project_detail(org_id, project_id) if org_id else None
+    if detail is None:
+        return render_template('error.html', error_code=404, error_traceback=None), 404
     
-    # Set team count on project
+    project = detail['project']._asdict()
+    project_assignments = [a._asdict() for a in detail['team']]
     project['team_count'] = len(project_assignments)
     
-    # Get all people and available people
-    all_people = get_all_people().to_dict('records')
-    available_people = get_available_people(project_id).to_dict('records')
-    
-    # Convert IDs to integers
-    for person in all_people:
-        person['id'] = int(person['id'])
-    for person in available_people:
-        person['id'] = int(person['id'])
-    
-    available_people_ids = [p['id'] for p in available_people]
-    
     return render_template('assignments.html', 
                          project=project, 
                          assignments=project_assignments,
-                         all_people=all_people,
-                         available_people=available_people,
-                         available_people_ids=available_people_ids)
+                         all_people=detail['people'],
+                         available_people=detail['available'],
+                         available_people_ids=[p.id for p in detail['available']])
+
+async def manage_assignment_async(project_id, assignment_id):
+    try:
+        assignment_id_int = int(assignment_id)
+    except ValueError:
+        return jsonify({
+            'error': 'The application has been updated to use new ID formats. Please refresh the page to get the new IDs.'
+        }), 400
+    
+    try:
+        if request.method == 'DELETE':
+            await run_async_write(aio.delete_assignment, assignment_id_int)
+            return jsonify({'success': True})
+        
+        data = request.json
+        assignment_data = {
+            'allocation': int(data['allocation']),
+            'start_date': data['start_date'],
+            'end_date': data['end_date']
+        }
+        result = await run_async_write(
+            aio.update_assignment, assignment_id_int, assignment_data, bool(data.get('force')))
+        if result:
+            return jsonify({'success': True, 'assignment': result})
+        return jsonify({'error': 'Assignment not found'}), 404
+    except OverallocationError as e:
+        return overallocation_response(e)
+    except (PoolTimeoutError, QueryTimeoutError):
+        raise  # Answered with 503/504 by the app's error handlers
+    except DatabaseError as e:
+        return jsonify({'error': str(e)}), 500
 
 @bp.route('/assignments/<project_id>/<assignment_id>', methods=['PUT', 'DELETE'])
+@async_variant(manage_assignment_async)
 def manage_assignment(project_id, assignment_id):
     try:
         project_id_int = int(project_id)
@@ -534,14 +604,86 @@ def manage_assignment(project_id, assignment_id):
                 'end_date': data['end_date']
             }
             
-            result = update_assignment(assignment_id_int, assignment_data)
+            result = update_assignment(assignment_id_int, assignment_data,
+                                       allow_overallocation=bool(data.get('force')))
             if result:
                 return jsonify({'success': True, 'assignment': result})
             return jsonify({'error': 'Assignment not found'}), 404
             
+        except OverallocationError as e:
+            return overallocation_response(e)
         except DatabaseError as e:
             return jsonify({'error': str(e)}), 500
 
+@bp.route('/bulk', methods=['POST'])
+@login_required
+def bulk_import():
+    """Create people, projects and assignments from arrays in one request.
+
+    Assignments may point at rows of the same payload with person_index /
+    project_index instead of person_id / project_id. Every row gets a result
+    with either its new id or an error; valid rows are saved even when others
+    fail.
+    """
+    org_id, _ = get_current_organization()
+    if not org_id:
+        return jsonify({'error': 'Organization not found'}), 404
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    
+    batches = {}
+    for key in ('people', 'projects', 'assignments'):
+        rows = data.get(key, [])
+        if not isinstance(rows, list):
+            return jsonify({'error': f'{key} must be an array'}), 400
+        if len(rows) > BULK_MAX_ROWS:
+            return jsonify({'error': f'At most {BULK_MAX_ROWS} {key} per request'}), 400
+        batches[key] = rows
+    
+    people_results = add_people_bulk(batches['people'], org_id)
+    project_results = add_projects_bulk(batches['projects'], org_id)
+    
+    # Resolve references to rows created above
+    assignments = []
+    unresolved = {}
+    for i, row in enumerate(batches['assignments']):
+        if not isinstance(row, dict):
+            assignments.append(row)
+            continue
+        row = dict(row)
+        for ref, id_key, results in (('person_index', 'person_id', people_results),
+                                     ('project_index', 'project_id', project_results)):
+            if ref not in row:
+                continue
+            index = row.pop(ref)
+            if not isinstance(index, int) or not 0 <= index < len(results):
+                unresolved[i] = f'Invalid {ref}'
+            elif 'id' not in results[index]:
+                unresolved[i] = f'Referenced row {ref}={index} was not created'
+            else:
+                row[id_key] = results[index]['id']
+        assignments.append(row)
+    
+    assignment_results = add_assignments_bulk(
+        [row for i, row in enumerate(assignments) if i not in unresolved], org_id)
+    results_iter = iter(assignment_results)
+    merged = []
+    for i in range(len(assignments)):
+        if i in unresolved:
+            merged.append({'index': i, 'error': unresolved[i]})
+        else:
+            result = next(results_iter)
+            result['index'] = i
+            merged.append(result)
+    
+    return jsonify({
+        'people': people_results,
+        'projects': project_results,
+        'assignments': merged
+    })
+
 @bp.route('/faqs')
 def faqs():
     return render_template('faqs.html')
@@ -555,47 +697,98 @@ def set_language(lang):
     return jsonify({'message': 'Language updated successfully'})
 
 @bp.route('/export/<report_type>')
+@read_only
+@query_timeout(statement_ms=120000, deadline_ms=180000)
 def export_data(report_type):
-    if report_type == 'allocations':
-        # Get current allocations data
-        current_assignments = get_current_assignments()
-        people_df = get_all_people()
-        
-        # Create report data
-        report_data = []
-        for _, person in people_df.iterrows():
-            person_assignments = current_assignments[current_assignments['person_id'] == person['id']]
-            total_allocation = person_assignments['allocation'].sum()
-            
-            projects = []
-            for _, assignment in person_assignments.iterrows():
-                projects.append(f"{assignment['project_name']} ({assignment['allocation']}%)")
-            
-            report_data.append({
-                'Name': person['name'],
-                'Role': person['role'],
-                'Total Allocation': f"{total_allocation}%",
-                'Projects': ', '.join(projects)
-            })
-        
-        # Create CSV in memory
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=['Name', 'Role', 'Total Allocation', 'Projects'])
-        writer.writeheader()
-        writer.writerows(report_data)
-        
-        # Create the response
-        mem_file = io.BytesIO()
-        mem_file.write(output.getvalue().encode('utf-8'))
-        mem_file.seek(0)
-        output.close()
-        
-        return send_file(
-            mem_file,
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'resource_allocation_{datetime.now().strftime("%Y-%m-%d")}.csv'
-        )
+    """Stream a report of the current organization as CSV (see /exports for large ones)"""
+    report = EXPORT_REPORTS.get(report_type)
+    if report is None:
+        return render_template('error.html', error_code=404, error_traceback=None), 404
+    
+    org_id, _ = get_current_organization()
+    if not org_id:
+        return redirect(url_for('auth.login'))
+    report_date = date.today()
+    
+    def generate():
+        # Rows are written to a small buffer that is flushed every EXPORT_CHUNK_SIZE
+        # characters, so neither the rows nor the CSV are ever held in full
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(report.columns)
+        for values in report.rows(org_id, report_date):
+            writer.writerow(values)
+            if buffer.tell() >= EXPORT_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    
+    filename = export_filename(report_type, report_date)
+    return Response(stream_with_context(generate()), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+def export_job_response(job):
+    """JSON description of an export job, with its progress and download link"""
+    progress = None
+    if job.status == 'done':
+        progress = 100
+    elif job.rows_total:
+        progress = min(99, int(job.rows_done * 100 / job.rows_total))
+    return {
+        'id': job.id,
+        'report_type': job.report_type,
+        'report_date': job.report_date.isoformat(),
+        'status': job.status,
+        'rows_done': job.rows_done,
+        'rows_total': job.rows_total,
+        'progress': progress,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'expires_at': job.expires_at.isoformat() if job.expires_at else None,
+        'status_url': url_for('main.export_job_status', job_id=job.id),
+        'download_url': url_for('main.download_export', job_id=job.id) if job.status == 'done' else None
+    }
+
+@bp.route('/exports/<report_type>', methods=['POST'])
+@login_required
+def create_export(report_type):
+    """Queue a report of the current organization, or reuse today's"""
+    if report_type not in EXPORT_REPORTS:
+        return jsonify({'error': 'Unknown report type'}), 404
+    org_id, _ = get_current_organization()
+    if not org_id:
+        return jsonify({'error': 'Organization not found'}), 404
+    
+    job, created = enqueue_export_job(org_id, report_type, date.today(), session['user_id'])
+    if created:
+        submit_export_job(job.id)
+    response = jsonify(export_job_response(job))
+    response.status_code = 202 if created else 200
+    response.headers['Location'] = url_for('main.export_job_status', job_id=job.id)
+    return response
+
+@bp.route('/exports/<int:job_id>')
+@login_required
+def export_job_status(job_id):
+    """Poll an export job of the current organization"""
+    org_id, _ = get_current_organization()
+    job = get_export_job(org_id, job_id) if org_id else None
+    if job is None:
+        return jsonify({'error': 'Export not found'}), 404
+    return jsonify(export_job_response(job))
+
+@bp.route('/exports/<int:job_id>/download')
+@login_required
+def download_export(job_id):
+    """The file of a finished export of the current organization"""
+    org_id, _ = get_current_organization()
+    export = get_export_file(org_id, job_id) if org_id else None
+    if export is None:
+        return jsonify({'error': 'Export not found or expired'}), 404
+    filename, content = export
+    return send_file(io.BytesIO(content), mimetype='text/csv', as_attachment=True,
+                     download_name=filename)
 
 @bp.route('/users')
 @login_required
@@ -617,8 +810,27 @@ def users():
                          organization_name=org_name,
                          current_user_id=session['user_id'])
 
+async def update_user_async(user_id):
+    org_id, _ = get_current_organization()
+    if not org_id:
+        return jsonify({'error': 'Organization not found'}), 404
+    
+    data = request.get_json()
+    is_active = data.get('is_active')
+    if is_active is None:
+        return jsonify({'error': 'Missing is_active parameter'}), 400
+    
+    # Permissions are checked in the write's transaction, on its connection
+    allowed = await run_async_transaction(aio.set_user_active, session['user_id'], user_id,
+                                          org_id, is_active)
+    if not allowed:
+        return jsonify({'error': 'Permission denied'}), 403
+    
+    return jsonify({'message': 'User status updated successfully'})
+
 @bp.route('/api/users/<int:user_id>/status', methods=['POST'])
 @login_required
+@async_variant(update_user_async)
 def update_user(user_id):
     """Update user status with role-based permission check"""
     org_id, _ = get_current_organization()
@@ -639,6 +851,241 @@ def update_user(user_id):
     
     return jsonify({'message': 'User status updated successfully'})
 
+@bp.route('/api/allocations/timeline')
+@login_required
+@read_only
+def allocation_timeline():
+    """Allocation per person and day (or week) for the current organization.
+
+    Query parameters: start and end (YYYY-MM-DD, default: the next 12 weeks)
+    and granularity (day or week, default week).
+    """
+    org_id, _ = get_current_organization()
+    if not org_id:
+        return jsonify({'error': 'Organization not found'}), 404
+    
+    today = datetime.now().date()
+    try:
+        timeline = get_allocation_timeline(
+            org_id,
+            request.args.get('start', today),
+            request.args.get('end', today + timedelta(weeks=12) - timedelta(days=1)),
+            request.args.get('granularity', 'week')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    timeline['start_date'] = timeline['start_date'].isoformat()
+    timeline['end_date'] = timeline['end_date'].isoformat()
+    timeline['periods'] = [period.isoformat() for period in timeline['periods']]
+    return jsonify(timeline)
+
+@bp.route('/api/capacity/forecast')
+@login_required
+@read_only
+def capacity_forecast():
+    """Supply, demand and free capacity (FTE) per role per week for the current organization.
+
+    Query parameters: weeks (default 12) and start (YYYY-MM-DD, default today;
+    weeks start on the Monday of its week).
+    """
+    org_id, _ = get_current_organization()
+    if not org_id:
+        return jsonify({'error': 'Organization not found'}), 404
+    
+    try:
+        forecast = get_capacity_forecast(
+            org_id,
+            weeks=int(request.args.get('weeks', 12)),
+            start_date=request.args.get('start')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    forecast['weeks'] = [week.isoformat() for week in forecast['weeks']]
+    return jsonify(forecast)
+
+@bp.route('/api/projects/teams')
+@login_required
+@read_only
+@conditional_get
+def project_teams():
+    """Teams of the current organization's projects, with each member's total current allocation.
+
+    Query parameter ids: comma-separated project ids (default: every project).
+    """
+    org_id, _ = get_current_organization()
+    if not org_id:
+        return jsonify({'error': 'Organization not found'}), 404
+    
+    project_ids = None
+    if request.args.get('ids'):
+        try:
+            project_ids = [int(project_id) for project_id in request.args['ids'].split(',')]
+        except ValueError:
+            return jsonify({'error': 'Invalid project ID format'}), 400
+    
+    teams = get_project_teams(organization_id=org_id, project_ids=project_ids)
+    return jsonify({
+        str(project_id): [
+            dict(member._asdict(),
+                 start_date=member.start_date.isoformat(),
+                 end_date=member.end_date.isoformat())
+            for member in members
+        ]
+        for project_id, members in teams.items()
+    })
+
+@bp.route('/api/projects/statuses')
+@login_required
+@read_only
+@conditional_get
+def project_status_counts():
+    """Number of the current organization's projects per automated status"""
+    org_id, _ = get_current_organization()
+    if not org_id:
+        return jsonify({'error': 'Organization not found'}), 404
+    return jsonify(count_projects_by_status(org_id))
+
+@bp.route('/api/projects/<int:project_id>/candidates')
+@login_required
+@read_only
+def project_candidates(project_id):
+    """People of the current organization who could join the project, least booked first.
+
+    Query parameters: q (matches name or role), cursor (the next_cursor of the
+    previous page) and limit (default 25, at most 100).
+    """
+    org_id, _ = get_current_organization()
+    if not org_id:
+        return jsonify({'error': 'Organization not found'}), 404
+    
+    try:
+        after = decode_page_key(request.args.get('cursor'))
+        if after is not None and len(after) != 3:
+            raise ValueError("Invalid cursor")
+        limit = min(int(request.args.get('limit', CANDIDATES_PAGE_SIZE)), 100)
+        if limit < 1:
+            raise ValueError("Limit must be positive")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    page = search_candidates(org_id, project_id, request.args.get('q', ''), after, limit)
+    if page is None:
+        return jsonify({'error': 'Project not found'}), 404
+    return jsonify({
+        'candidates': page['candidates'],
+        'next_cursor': encode_page_key(page['next'])
+    })
+
+@bp.route('/api/dashboard')
+@login_required
+@read_only
+@conditional_get
+def api_dashboard():
+    """The dashboard's data as JSON: projects with their teams, people and summary counts"""
+    org_id, _ = get_current_organization()
+    if not org_id:
+        return jsonify({'error': 'Organization not found'}), 404
+    return jsonify(get_dashboard(org_id))
+
+@bp.route('/api/people')
+@login_required
+@read_only
+@conditional_get
+def api_people():
+    """A page of the current organization's people with their current allocation.
+
+    Query parameters: sort_by (name, role, availability, allocation),
+    sort_order, role, availability (full-time / part-time), band (available,
+    partial, full), search, cursor and limit (default 100, at most 500).
+    """
+    org_id, _ = get_current_organization()
+    if not org_id:
+        return jsonify({'error': 'Organization not found'}), 404
+    
+    try:
+        page = list_people(
+            org_id,
+            sort=request.args.get('sort_by', 'name'),
+            role=request.args.get('role') or None,
+            availability=request.args.get('availability') or None,
+            band=request.args.get('band') or None,
+            search=request.args.get('search') or None,
+            **listing_args()
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return listing_response(page)
+
+@bp.route('/api/projects')
+@login_required
+@read_only
+@conditional_get
+def api_projects():
+    """A page of the current organization's projects.
+
+    Query parameters: sort_by (name, type, status, start_date, end_date),
+    sort_order, status, type, search, cursor and limit (default 100, at most 500).
+    """
+    org_id, _ = get_current_organization()
+    if not org_id:
+        return jsonify({'error': 'Organization not found'}), 404
+    
+    try:
+        page = list_projects(
+            org_id,
+            sort=request.args.get('sort_by', 'start_date'),
+            status=request.args.get('status') or None,
+            project_type=request.args.get('type') or None,
+            search=request.args.get('search') or None,
+            **listing_args()
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return listing_response(page)
+
+@bp.route('/api/assignments')
+@login_required
+@read_only
+def api_assignments():
+    """A page of the current organization's assignments, newest first by default.
+
+    Query parameters: sort_by (start_date, end_date, allocation, project_name,
+    person_name), sort_order, project_id, person_id, status (of the project),
+    cursor and limit (default 100, at most 500).
+    """
+    org_id, _ = get_current_organization()
+    if not org_id:
+        return jsonify({'error': 'Organization not found'}), 404
+    
+    try:
+        page = list_assignments(
+            org_id,
+            sort=request.args.get('sort_by', 'start_date'),
+            project_id=request.args.get('project_id') or None,
+            person_id=request.args.get('person_id') or None,
+            status=request.args.get('status') or None,
+            **listing_args()
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return listing_response(page)
+
+@bp.route('/api/db/pool')
+@login_required
+def db_pool_stats():
+    """Connection pool statistics for platform admins"""
+    if not is_platform_admin(session['user_id']):
+        return jsonify({'error': 'Permission denied'}), 403
+    return jsonify({
+        'primary': get_pool_stats(),
+        'replica': get_replica_pool_stats(),
+        'async': get_async_pool_stats(),
+        'cache': get_cache_stats(),
+        'timeouts': get_timeout_stats()
+    })
+
 @bp.route('/switch-organization/<int:org_id>')
 @login_required
 def switch_organization(org_id):
@@ -2,6 +2,7 @@ import logging
 import os
 import json
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from flask import current_app
 import atexit
@@ -127,6 +128,64 @@ def fetch_holidays_from_zenhr():
     except Exception as e:
         logger.error(f"Error in automated holidays fetch: {str(e)}", exc_info=True)
 
+def roll_over_allocations_job(app):
+    """
+    Daily job: recompute the maintained current allocations once the date changes,
+    so assignments starting or ending today are counted.
+    """
+    from models.core import roll_over_allocations
+    
+    try:
+        with app.app_context():
+            refreshed = roll_over_allocations()
+        logger.info(f"Allocation roll-over completed: {refreshed} people recomputed.")
+    except Exception as e:
+        logger.error(f"Error in allocation roll-over: {str(e)}", exc_info=True)
+
+def sweep_project_statuses_job(app):
+    """
+    Daily job: persist each organization's date-driven project status transitions,
+    one organization (and transaction) at a time.
+    """
+    from models.core import get_organization_ids, sweep_project_statuses
+    
+    try:
+        with app.app_context():
+            organization_ids = get_organization_ids()
+    except Exception as e:
+        logger.error(f"Error listing organizations for the status sweep: {str(e)}", exc_info=True)
+        return
+    
+    for organization_id in organization_ids:
+        try:
+            with app.app_context():
+                result = sweep_project_statuses(organization_id)
+            if result is None:
+                logger.info(f"Status sweep for organization {organization_id} already ran today.")
+            else:
+                changed, duration_ms = result
+                logger.info(f"Status sweep for organization {organization_id}: "
+                            f"{changed} projects updated in {duration_ms:.1f} ms.")
+        except Exception as e:
+            logger.error(f"Error in status sweep for organization {organization_id}: {str(e)}",
+                         exc_info=True)
+
+def expire_export_jobs_job(app):
+    """
+    Hourly job: delete expired export files and old failed jobs, and fail jobs
+    whose worker stopped reporting progress so they can be requested again.
+    """
+    from exports import get_export_config
+    from models.core import expire_export_jobs
+    
+    try:
+        with app.app_context():
+            config = get_export_config()
+            abandoned, deleted = expire_export_jobs(config['retention_hours'], config['stale_minutes'])
+        logger.info(f"Export retention sweep: {abandoned} abandoned jobs failed, {deleted} jobs deleted.")
+    except Exception as e:
+        logger.error(f"Error in export retention sweep: {str(e)}", exc_info=True)
+
 def start_scheduler(app):
     """
     Initialize and start the background scheduler for automated tasks.
@@ -147,6 +206,39 @@ def start_scheduler(app):
         max_instances=1  # Prevent overlapping executions
     )
     
+    # Roll the maintained allocations over to the new day just after midnight
+    scheduler.add_job(
+        func=roll_over_allocations_job,
+        args=[app],
+        trigger=CronTrigger(hour=0, minute=1),
+        id='roll_over_allocations_job',
+        name='Recompute current allocations after midnight',
+        replace_existing=True,
+        max_instances=1
+    )
+    
+    # Persist the day's project status transitions after the allocation roll-over
+    scheduler.add_job(
+        func=sweep_project_statuses_job,
+        args=[app],
+        trigger=CronTrigger(hour=0, minute=5),
+        id='sweep_project_statuses_job',
+        name='Persist date-driven project status transitions',
+        replace_existing=True,
+        max_instances=1
+    )
+    
+    # Drop expired export files and fail abandoned export jobs
+    scheduler.add_job(
+        func=expire_export_jobs_job,
+        args=[app],
+        trigger=IntervalTrigger(hours=1),
+        id='expire_export_jobs_job',
+        name='Expire export files and abandoned export jobs',
+        replace_existing=True,
+        max_instances=1
+    )
+    
     # Start the scheduler
     scheduler.start()
     logger.info("Background scheduler started - holidays will be fetched every hour")
@@ -22,6 +22,7 @@ def app():
         'DATABASE_URL': 'postgresql://localhost/prptest',
         'SERVER_NAME': 'test.local',
         'WTF_CSRF_ENABLED': False,
+        'QUERY_REPEAT_RAISE': True,  # Fail tests on N+1 query regressions
     })
 
     # Create tables and test data
@@ -1,7 +1,20 @@
 import pytest
-from flask import session, url_for
+from flask import session, url_for, g
 from datetime import datetime, timedelta
+import csv
+import io
 import json
+import time
+import psycopg2
+import cache
+import database
+import exports
+from database import (
+    BASELINE_VERSION, ConnectionPool, PoolTimeoutError, RepeatedQueryError, QueryTimeoutError, DeadlineExceededError,
+    get_db_config, get_db_cursor, get_query_stats, get_replica_pool, is_write_sql, list_migrations,
+    normalize_sql, read_only_queries, run_migrations
+)
+from models.core import enqueue_export_job, get_all_people, get_dashboard, get_export_job
 
 @pytest.fixture
 def auth_client(client):
@@ -253,4 +266,1091 @@ def test_duplicate_assignment_prevention(auth_client):
     # Second assignment should fail
     response = auth_client.post(f'/assignments/{project_id}', json=assignment_data)
     assert response.status_code == 400
-    assert b'Person already assigned to this project' in response.data 
\ No newline at end of file
+    assert b'Person already assigned to this project' in response.data 
+
+def test_request_uses_single_connection(auth_client):
+    """Test that all queries in a request share one pooled connection."""
+    auth_client.post('/projects', json={
+        'name': 'Unit Of Work Project',
+        'project_type': 'Internal',
+        'status': 'Active',
+        'start_date': datetime.now().strftime('%Y-%m-%d'),
+        'end_date': (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    })
+    
+    with auth_client:
+        response = auth_client.get('/')
+        assert response.status_code == 200
+        assert g.db_connections_opened == 1
+
+def test_repeated_query_detection(app):
+    """Test that running the same statement too often in one request is flagged."""
+    with app.test_request_context('/people'):
+        with pytest.raises(RepeatedQueryError):
+            for _ in range(app.config.get('QUERY_REPEAT_THRESHOLD', 10) + 1):
+                get_all_people(1)
+
+def test_statement_timeout(app):
+    """Test that a statement running past its timeout is cancelled."""
+    with app.test_request_context('/people'):
+        g.db_statement_timeout_ms = 50
+        with pytest.raises(QueryTimeoutError):
+            with get_db_cursor() as cur:
+                cur.execute("SELECT pg_sleep(1)")
+
+def test_request_deadline(app):
+    """Test that no statement runs once the request deadline has passed."""
+    with app.test_request_context('/people'):
+        g.db_deadline = 0
+        with pytest.raises(DeadlineExceededError):
+            get_all_people(1)
+
+def test_bulk_import(auth_client):
+    """Test creating people, projects and assignments in one bulk request."""
+    start = datetime.now().strftime('%Y-%m-%d')
+    end = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    response = auth_client.post('/bulk', json={
+        'people': [
+            {'name': 'Bulk Person A', 'role': 'Project Manager', 'availability': 'Full-Time'},
+            {'name': 'Bulk Person B', 'role': 'Project Associate'}
+        ],
+        'projects': [
+            {'name': 'Bulk Project', 'project_type': 'Internal', 'status': 'Active',
+             'start_date': start, 'end_date': end}
+        ],
+        'assignments': [
+            {'person_index': 0, 'project_index': 0, 'allocation': 50,
+             'start_date': start, 'end_date': end},
+            {'person_index': 0, 'project_index': 0, 'allocation': 25,
+             'start_date': start, 'end_date': end},
+            {'person_index': 1, 'project_index': 0, 'allocation': 50,
+             'start_date': start, 'end_date': end}
+        ]
+    })
+    assert response.status_code == 200
+    data = response.get_json()
+    
+    assert 'id' in data['people'][0]
+    assert 'error' in data['people'][1]
+    assert 'id' in data['projects'][0]
+    assert 'id' in data['assignments'][0]
+    assert data['assignments'][1]['error'] == 'Person already assigned to this project'
+    assert 'error' in data['assignments'][2]
+
+def test_bulk_import_overallocation(app, auth_client):
+    """Bulk assignments are checked against stored bookings and earlier rows of the batch"""
+    start = datetime.now().strftime('%Y-%m-%d')
+    end = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    project_ids = [
+        auth_client.post('/projects', json={
+            'name': f'Bulk Busy Project {n}', 'project_type': 'Internal', 'status': 'Active',
+            'start_date': start, 'end_date': end
+        }).get_json()['id']
+        for n in range(4)
+    ]
+    person_id = auth_client.post('/people', json={
+        'name': 'Bulk Busy Person', 'role': 'Project Manager', 'availability': 'Full-Time'
+    }).get_json()['id']
+    auth_client.post(f'/assignments/{project_ids[0]}', json={
+        'person_id': person_id, 'allocation': 60, 'start_date': start, 'end_date': end
+    })
+    
+    response = auth_client.post('/bulk', json={'assignments': [
+        {'person_id': person_id, 'project_id': project_ids[1], 'allocation': 50,
+         'start_date': start, 'end_date': end},
+        {'person_id': person_id, 'project_id': project_ids[2], 'allocation': 30,
+         'start_date': start, 'end_date': end},
+        {'person_id': person_id, 'project_id': project_ids[3], 'allocation': 20,
+         'start_date': start, 'end_date': end}
+    ]})
+    assert response.status_code == 200
+    results = response.get_json()['assignments']
+    # 60% stored + 50% goes over; 60% + 30% fits; a further 20% overbooks with the batch's 30%
+    assert 'over 100%' in results[0]['error']
+    assert 'id' in results[1]
+    assert 'over 100%' in results[2]['error']
+    
+    with app.app_context():
+        with get_db_cursor() as cur:
+            cur.execute("SELECT SUM(allocation) FROM assignments WHERE person_id = %s", (person_id,))
+            assert cur.fetchone()[0] == 90
+
+def test_async_json_endpoints(app, auth_client):
+    """Test that the JSON edit endpoints behave the same in async mode."""
+    pytest.importorskip('asyncpg')
+    pytest.importorskip('asgiref')
+    start = datetime.now().strftime('%Y-%m-%d')
+    end = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    project_data = {
+        'name': 'Async Project',
+        'project_type': 'Internal',
+        'status': 'Active',
+        'start_date': start,
+        'end_date': end
+    }
+    project_id = auth_client.post('/projects', json=project_data).get_json()['id']
+    person_id = auth_client.post('/people', json={
+        'name': 'Async Person',
+        'role': 'Project Manager',
+        'availability': 'Full-Time'
+    }).get_json()['id']
+    response = auth_client.post(f'/assignments/{project_id}', json={
+        'person_id': person_id, 'allocation': 50, 'start_date': start, 'end_date': end
+    })
+    assignment_id = response.get_json()['assignment']['id']
+    
+    app.config['ASYNC_DB'] = True
+    
+    response = auth_client.put(f'/projects/{project_id}', json=dict(project_data, name='Async Edited'))
+    assert response.status_code == 200
+    assert response.get_json()['project']['name'] == 'Async Edited'
+    
+    response = auth_client.put(f'/assignments/{project_id}/{assignment_id}', json={
+        'allocation': 75, 'start_date': start, 'end_date': end
+    })
+    assert response.status_code == 200
+    assert response.get_json()['assignment']['allocation'] == 75
+    
+    response = auth_client.put(f'/assignments/{project_id}/999999', json={
+        'allocation': 75, 'start_date': start, 'end_date': end
+    })
+    assert response.status_code == 404
+    
+    assert auth_client.delete(f'/people/{person_id}').status_code == 200
+    assert auth_client.delete(f'/projects/{project_id}').status_code == 200
+    
+    app.config['ASYNC_DB'] = False
+    response = auth_client.get('/projects')
+    assert b'Async Edited' not in response.data
+
+def test_async_user_status(app, auth_client):
+    """The async user status update checks permissions in its own transaction."""
+    pytest.importorskip('asyncpg')
+    pytest.importorskip('asgiref')
+    with auth_client.session_transaction() as sess:
+        organization_id = sess['organization_id']
+    with app.app_context():
+        with get_db_cursor() as cur:
+            cur.execute("""
+                INSERT INTO users (email, name, role, is_active)
+                VALUES ('member@example.com', 'Member User', 'Normal', true),
+                       ('outsider@example.com', 'Outsider User', 'Normal', true)
+                RETURNING id
+            """)
+            member_id, outsider_id = [row[0] for row in cur.fetchall()]
+            cur.execute("INSERT INTO organization_users (organization_id, user_id) VALUES (%s, %s)",
+                        (organization_id, member_id))
+    
+    app.config['ASYNC_DB'] = True
+    response = auth_client.post(f'/api/users/{member_id}/status', json={'is_active': False})
+    assert response.status_code == 200
+    # Not a member of the organization: nothing to manage
+    response = auth_client.post(f'/api/users/{outsider_id}/status', json={'is_active': False})
+    assert response.status_code == 403
+    app.config['ASYNC_DB'] = False
+    
+    with app.app_context():
+        with get_db_cursor() as cur:
+            cur.execute("SELECT id, is_active FROM users WHERE id IN (%s, %s)", (member_id, outsider_id))
+            assert dict(cur.fetchall()) == {member_id: False, outsider_id: True}
+
+def test_allocation_timeline(auth_client):
+    """Test the per-person allocation matrix over a date range."""
+    today = datetime.now().date()
+    project_id = auth_client.post('/projects', json={
+        'name': 'Timeline Project',
+        'project_type': 'Internal',
+        'status': 'Active',
+        'start_date': (today - timedelta(days=10)).strftime('%Y-%m-%d'),
+        'end_date': (today + timedelta(days=30)).strftime('%Y-%m-%d')
+    }).get_json()['id']
+    person_id = auth_client.post('/people', json={
+        'name': 'Timeline Person',
+        'role': 'Project Manager',
+        'availability': 'Full-Time'
+    }).get_json()['id']
+    auth_client.post(f'/assignments/{project_id}', json={
+        'person_id': person_id,
+        'allocation': 60,
+        'start_date': (today + timedelta(days=2)).strftime('%Y-%m-%d'),
+        'end_date': (today + timedelta(days=4)).strftime('%Y-%m-%d')
+    })
+    
+    response = auth_client.get('/api/allocations/timeline', query_string={
+        'start': today.strftime('%Y-%m-%d'),
+        'end': (today + timedelta(days=6)).strftime('%Y-%m-%d'),
+        'granularity': 'day'
+    })
+    assert response.status_code == 200
+    data = response.get_json()
+    assert len(data['periods']) == 7
+    person = next(p for p in data['people'] if p['id'] == person_id)
+    assert person['peak'] == [0, 0, 60, 60, 60, 0, 0]
+    
+    response = auth_client.get('/api/allocations/timeline', query_string={
+        'start': today.strftime('%Y-%m-%d'), 'end': today.strftime('%Y-%m-%d'), 'granularity': 'month'
+    })
+    assert response.status_code == 400
+
+def test_current_allocation_maintained(app, auth_client):
+    """Test that assignment and project status changes update person_allocations."""
+    start = datetime.now().strftime('%Y-%m-%d')
+    end = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    project_data = {
+        'name': 'Allocation Project',
+        'project_type': 'Internal',
+        'status': 'Active',
+        'start_date': (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d'),
+        'end_date': end
+    }
+    project_id = auth_client.post('/projects', json=project_data).get_json()['id']
+    person_id = auth_client.post('/people', json={
+        'name': 'Allocation Person',
+        'role': 'Project Manager',
+        'availability': 'Full-Time'
+    }).get_json()['id']
+    
+    def current_allocation():
+        with app.app_context():
+            with get_db_cursor() as cur:
+                cur.execute("""
+                    SELECT current_allocation, as_of = CURRENT_DATE
+                    FROM person_allocations
+                    WHERE person_id = %s
+                """, (person_id,))
+                return cur.fetchone()
+    
+    assert current_allocation() == (0, True)
+    auth_client.post(f'/assignments/{project_id}', json={
+        'person_id': person_id, 'allocation': 40, 'start_date': start, 'end_date': end
+    })
+    assert current_allocation() == (40, True)
+    
+    auth_client.put(f'/projects/{project_id}', json=dict(project_data, status='Completed'))
+    assert current_allocation() == (0, True)
+
+def test_overallocation_rejected(auth_client):
+    """Test that booking a person over 100% on overlapping days is refused."""
+    today = datetime.now().date()
+    day = lambda offset: (today + timedelta(days=offset)).strftime('%Y-%m-%d')
+    person_id = auth_client.post('/people', json={
+        'name': 'Busy Person',
+        'role': 'Project Manager',
+        'availability': 'Full-Time'
+    }).get_json()['id']
+    project_ids = [
+        auth_client.post('/projects', json={
+            'name': f'Overlap Project {i}',
+            'project_type': 'Internal',
+            'status': 'Active',
+            'start_date': day(-1),
+            'end_date': day(60)
+        }).get_json()['id']
+        for i in range(3)
+    ]
+    
+    response = auth_client.post(f'/assignments/{project_ids[0]}', json={
+        'person_id': person_id, 'allocation': 70, 'start_date': day(0), 'end_date': day(10)
+    })
+    assert response.status_code == 200
+    first_id = response.get_json()['assignment']['id']
+    
+    # Overlaps days 5-10 at 70% + 40%
+    response = auth_client.post(f'/assignments/{project_ids[1]}', json={
+        'person_id': person_id, 'allocation': 40, 'start_date': day(5), 'end_date': day(20)
+    })
+    assert response.status_code == 400
+    data = response.get_json()
+    assert data['peak_allocation'] == 110
+    assert data['overloaded'] == [{'start_date': day(5), 'end_date': day(10)}]
+    assert [c['id'] for c in data['conflicts']] == [first_id]
+    
+    # Starting after the first one ends is fine
+    response = auth_client.post(f'/assignments/{project_ids[1]}', json={
+        'person_id': person_id, 'allocation': 40, 'start_date': day(11), 'end_date': day(20)
+    })
+    assert response.status_code == 200
+    
+    # Stretching the first one into the second is not
+    response = auth_client.put(f'/assignments/{project_ids[0]}/{first_id}', json={
+        'allocation': 70, 'start_date': day(0), 'end_date': day(15)
+    })
+    assert response.status_code == 400
+    
+    response = auth_client.post(f'/assignments/{project_ids[2]}', json={
+        'person_id': person_id, 'allocation': 50, 'start_date': day(0), 'end_date': day(2),
+        'force': True
+    })
+    assert response.status_code == 200
+
+def test_capacity_forecast(auth_client):
+    """Test weekly supply, demand and free capacity per role."""
+    today = datetime.now().date()
+    monday = today - timedelta(days=today.weekday())
+    person_id = auth_client.post('/people', json={
+        'name': 'Forecast Person',
+        'role': 'Forecast Role',
+        'availability': 'Part-Time'
+    }).get_json()['id']
+    auth_client.post('/people', json={
+        'name': 'Forecast Colleague',
+        'role': 'Forecast Role',
+        'availability': 'Full-Time'
+    })
+    project_id = auth_client.post('/projects', json={
+        'name': 'Forecast Project',
+        'project_type': 'Internal',
+        'status': 'Not Started',
+        'start_date': (monday + timedelta(weeks=1)).strftime('%Y-%m-%d'),
+        'end_date': (monday + timedelta(weeks=3)).strftime('%Y-%m-%d')
+    }).get_json()['id']
+    auth_client.post(f'/assignments/{project_id}', json={
+        'person_id': person_id,
+        'allocation': 50,
+        'start_date': (monday + timedelta(weeks=1)).strftime('%Y-%m-%d'),
+        'end_date': (monday + timedelta(weeks=2, days=6)).strftime('%Y-%m-%d')
+    })
+    
+    response = auth_client.get('/api/capacity/forecast', query_string={'weeks': 4})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['weeks'][0] == monday.strftime('%Y-%m-%d')
+    role = next(r for r in data['roles'] if r['role'] == 'Forecast Role')
+    assert role['headcount'] == 2
+    assert role['supply'] == [1.5] * 4
+    assert role['demand'] == [0, 0.5, 0.5, 0]
+    assert role['free'] == [1.5, 1.0, 1.0, 1.5]
+    
+    assert auth_client.get('/api/capacity/forecast', query_string={'weeks': 0}).status_code == 400
+
+def test_project_teams(auth_client):
+    """Test fetching several project teams with total allocations in one call."""
+    start = datetime.now().strftime('%Y-%m-%d')
+    end = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    project_ids = [
+        auth_client.post('/projects', json={
+            'name': f'Team Project {i}',
+            'project_type': 'Internal',
+            'status': 'Active',
+            'start_date': (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d'),
+            'end_date': end
+        }).get_json()['id']
+        for i in range(3)
+    ]
+    person_id = auth_client.post('/people', json={
+        'name': 'Team Member',
+        'role': 'Project Associate',
+        'availability': 'Full-Time'
+    }).get_json()['id']
+    for project_id, allocation in zip(project_ids[:2], (30, 20)):
+        auth_client.post(f'/assignments/{project_id}', json={
+            'person_id': person_id, 'allocation': allocation, 'start_date': start, 'end_date': end
+        })
+    
+    ids = ','.join(str(project_id) for project_id in project_ids)
+    response = auth_client.get(f'/api/projects/teams?ids={ids}')
+    assert response.status_code == 200
+    teams = response.get_json()
+    assert set(teams) == {str(project_ids[0]), str(project_ids[1])}
+    member = teams[str(project_ids[0])][0]
+    assert member['person_id'] == person_id
+    assert member['allocation'] == 30
+    assert member['total_allocation'] == 50
+    assert member['person_role'] == 'Project Associate'
+
+def test_project_candidates(auth_client):
+    """Test searching and paging assignment candidates ranked by free capacity."""
+    start = datetime.now().strftime('%Y-%m-%d')
+    end = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    project_ids = [
+        auth_client.post('/projects', json={
+            'name': f'Candidate Project {i}',
+            'project_type': 'Internal',
+            'status': 'Active',
+            'start_date': start,
+            'end_date': end
+        }).get_json()['id']
+        for i in range(2)
+    ]
+    person_ids = [
+        auth_client.post('/people', json={
+            'name': f'Candidate {name}',
+            'role': 'Project Associate',
+            'availability': 'Full-Time'
+        }).get_json()['id']
+        for name in ('Alpha', 'Bravo', 'Charlie')
+    ]
+    auth_client.post(f'/assignments/{project_ids[1]}', json={
+        'person_id': person_ids[0], 'allocation': 60, 'start_date': start, 'end_date': end
+    })
+    
+    response = auth_client.get(f'/api/projects/{project_ids[0]}/candidates?q=candidate&limit=2')
+    assert response.status_code == 200
+    page = response.get_json()
+    assert [c['id'] for c in page['candidates']] == person_ids[1:]
+    assert all(c['free_capacity'] == 100 for c in page['candidates'])
+    
+    response = auth_client.get(f'/api/projects/{project_ids[0]}/candidates',
+                               query_string={'q': 'candidate', 'limit': 2, 'cursor': page['next_cursor']})
+    page = response.get_json()
+    assert [c['id'] for c in page['candidates']] == person_ids[:1]
+    assert page['candidates'][0]['free_capacity'] == 40
+    assert page['next_cursor'] is None
+    
+    response = auth_client.get(f'/api/projects/{project_ids[0]}/candidates?cursor=garbage')
+    assert response.status_code == 400
+
+def test_candidates_same_day_bookings(auth_client):
+    """Overlapping bookings that start on the same day are each counted once."""
+    start = datetime.now().strftime('%Y-%m-%d')
+    end = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    project_ids = [
+        auth_client.post('/projects', json={
+            'name': f'Same Day Project {i}',
+            'project_type': 'Internal',
+            'status': 'Active',
+            'start_date': start,
+            'end_date': end
+        }).get_json()['id']
+        for i in range(3)
+    ]
+    person_id = auth_client.post('/people', json={
+        'name': 'Same Day Booked',
+        'role': 'Project Associate',
+        'availability': 'Full-Time'
+    }).get_json()['id']
+    for project_id in project_ids[1:]:
+        response = auth_client.post(f'/assignments/{project_id}', json={
+            'person_id': person_id, 'allocation': 50, 'start_date': start, 'end_date': end
+        })
+        assert response.status_code < 400
+    
+    response = auth_client.get(f'/api/projects/{project_ids[0]}/candidates?q=same day booked')
+    assert response.status_code == 200
+    candidates = response.get_json()['candidates']
+    assert [c['id'] for c in candidates] == [person_id]
+    assert candidates[0]['free_capacity'] == 0  # Peak of 100, not 200
+
+def test_listing_pagination(auth_client):
+    """Listings page by keyset cursor in the requested order and count the total once"""
+    person_ids = [
+        auth_client.post('/people', json={
+            'name': f'Listed {name}',
+            'role': 'Project Associate',
+            'availability': 'Full-Time'
+        }).get_json()['id']
+        for name in ('Alpha', 'Bravo', 'Charlie')
+    ]
+    
+    response = auth_client.get('/api/people?search=listed&sort_order=desc&limit=2')
+    assert response.status_code == 200
+    page = response.get_json()
+    assert [p['id'] for p in page['items']] == person_ids[:0:-1]
+    assert page['total'] == 3
+    
+    response = auth_client.get('/api/people', query_string={
+        'search': 'listed', 'sort_order': 'desc', 'limit': 2, 'cursor': page['next_cursor']
+    })
+    page = response.get_json()
+    assert [p['id'] for p in page['items']] == person_ids[:1]
+    assert page['next_cursor'] is None
+    assert page['total'] is None
+    
+    response = auth_client.get('/api/people?search=listed&band=available')
+    assert len(response.get_json()['items']) == 3
+    
+    assert auth_client.get('/api/people?sort_by=salary').status_code == 400
+    assert auth_client.get('/api/projects?limit=0').status_code == 400
+
+def test_organization_cache(app, auth_client):
+    """Cached org lists are reused until a write to the organization commits"""
+    from cache import get_cache
+    app.config['ORG_CACHE'] = True
+    with app.app_context():
+        cache = get_cache()
+        cache.clear()
+        hits = cache.stats()['hits']
+    
+    auth_client.get('/api/people')
+    first = auth_client.get('/api/people').get_json()
+    assert cache.stats()['hits'] == hits + 1
+    
+    auth_client.post('/people', json={
+        'name': 'Cached Person',
+        'role': 'Project Associate',
+        'availability': 'Full-Time'
+    })
+    after_write = auth_client.get('/api/people').get_json()
+    assert len(after_write['items']) == len(first['items']) + 1
+    assert cache.stats()['invalidations'] >= 1
+
+def test_project_automated_status(auth_client):
+    """Automated statuses come from the database and can be filtered and counted"""
+    today = datetime.now().date()
+    projects = {
+        'Overdue': (today - timedelta(days=30), today - timedelta(days=1), 'Active'),
+        'Not Started': (today + timedelta(days=5), today + timedelta(days=30), 'Active'),
+        'Active': (today - timedelta(days=5), today + timedelta(days=30), 'Not Started'),
+        'Completed': (today - timedelta(days=30), today - timedelta(days=1), 'Completed')
+    }
+    ids = {}
+    for expected, (start, end, status) in projects.items():
+        ids[expected] = auth_client.post('/projects', json={
+            'name': f'Status {expected}',
+            'project_type': 'Internal',
+            'status': status,
+            'start_date': start.strftime('%Y-%m-%d'),
+            'end_date': end.strftime('%Y-%m-%d')
+        }).get_json()['id']
+    
+    for expected, project_id in ids.items():
+        page = auth_client.get('/api/projects', query_string={'status': expected}).get_json()
+        assert project_id in [p['id'] for p in page['items']]
+        assert all(p['automated_status'] == expected for p in page['items'])
+    
+    counts = auth_client.get('/api/projects/statuses').get_json()
+    assert all(counts.get(expected, 0) >= 1 for expected in projects)
+    assert auth_client.get('/api/projects?status=Late').status_code == 400
+
+def test_status_sweep(app, auth_client):
+    """The daily sweep persists date-driven transitions once per organization and day"""
+    from models.core import get_project, sweep_project_statuses
+    today = datetime.now().date()
+    project_id = auth_client.post('/projects', json={
+        'name': 'Sweep Project',
+        'project_type': 'Internal',
+        'status': 'Not Started',
+        'start_date': (today - timedelta(days=1)).strftime('%Y-%m-%d'),
+        'end_date': (today + timedelta(days=30)).strftime('%Y-%m-%d')
+    }).get_json()['id']
+    
+    with auth_client.session_transaction() as sess:
+        organization_id = sess['organization_id']
+    with app.app_context():
+        changed, duration_ms = sweep_project_statuses(organization_id)
+        assert changed >= 1
+        assert duration_ms >= 0
+    with app.app_context():
+        assert get_project(project_id).status == 'Active'
+        assert sweep_project_statuses(organization_id) is None
+        with get_db_cursor() as cur:
+            cur.execute("SELECT changed FROM status_sweeps WHERE organization_id = %s", (organization_id,))
+            assert cur.fetchone()[0] == changed
+
+def test_dashboard_teams(app, auth_client):
+    """The dashboard data groups each project's team by project id"""
+    from models.core import get_dashboard
+    start = datetime.now().strftime('%Y-%m-%d')
+    end = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    project_ids = [
+        auth_client.post('/projects', json={
+            'name': 'Same Name Project', 'project_type': 'External', 'status': 'Active',
+            'start_date': start, 'end_date': end
+        }).get_json()['id']
+        for _ in range(2)
+    ]
+    person_id = auth_client.post('/people', json={
+        'name': 'Dashboard Member', 'role': 'Project Manager', 'availability': 'Full-Time'
+    }).get_json()['id']
+    auth_client.post(f'/assignments/{project_ids[0]}', json={
+        'person_id': person_id, 'allocation': 40, 'start_date': start, 'end_date': end
+    })
+    
+    with auth_client.session_transaction() as sess:
+        organization_id = sess['organization_id']
+    with app.app_context():
+        data = get_dashboard(organization_id)
+    teams = {p['id']: p['team'] for p in data['projects']}
+    # Teams are matched by id, not by the (shared) project name
+    assert [m['person_id'] for m in teams[project_ids[0]]] == [person_id]
+    assert teams[project_ids[1]] == []
+    person = next(p for p in data['people'] if p['id'] == person_id)
+    assert person['current_allocation'] == 40
+    assert data['total_people'] == len(data['people'])
+    
+    response = auth_client.get('/')
+    assert response.status_code == 200
+    assert b'Dashboard Member' in response.data
+
+def test_conditional_get(auth_client):
+    """Unchanged pages are answered with 304 until the organization's data changes"""
+    for path in ('/', '/people', '/projects', '/api/dashboard', '/api/people'):
+        response = auth_client.get(path)
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+        assert response.headers['Last-Modified']
+        
+        response = auth_client.get(path, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+    
+    auth_client.post('/people', json={
+        'name': 'Version Bump', 'role': 'Project Manager', 'availability': 'Full-Time'
+    })
+    response = auth_client.get('/api/people', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert b'Version Bump' in response.data
+
+def test_project_detail(app, auth_client):
+    """The assignments page reads one project of the current organization with its team and candidates"""
+    from models.core import get_project_detail
+    start = datetime.now().strftime('%Y-%m-%d')
+    end = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    project_id = auth_client.post('/projects', json={
+        'name': 'Detail Project', 'project_type': 'Internal', 'status': 'Active',
+        'start_date': start, 'end_date': end
+    }).get_json()['id']
+    member_id, candidate_id = [
+        auth_client.post('/people', json={
+            'name': name, 'role': 'Project Associate', 'availability': 'Full-Time'
+        }).get_json()['id']
+        for name in ('Detail Member', 'Detail Candidate')
+    ]
+    auth_client.post(f'/assignments/{project_id}', json={
+        'person_id': member_id, 'allocation': 30, 'start_date': start, 'end_date': end
+    })
+    
+    with auth_client.session_transaction() as sess:
+        organization_id = sess['organization_id']
+    with app.app_context():
+        detail = get_project_detail(organization_id, project_id)
+        assert detail['project'].name == 'Detail Project'
+        assert [(a.person_id, a.allocation, a.total_allocation) for a in detail['team']] == [(member_id, 30, 30)]
+        assert candidate_id in [p.id for p in detail['available']]
+        assert member_id not in [p.id for p in detail['available']]
+        assert get_project_detail(organization_id + 1, project_id) is None
+    
+    response = auth_client.get(f'/assignments/{project_id}')
+    assert response.status_code == 200
+    assert b'Detail Member' in response.data
+    assert b'Detail Candidate' in response.data
+    assert auth_client.get('/assignments/999999').status_code == 404
+
+def test_allocation_export(auth_client):
+    """The allocation export streams one CSV row per person with their current projects"""
+    start = datetime.now().strftime('%Y-%m-%d')
+    end = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    project_id = auth_client.post('/projects', json={
+        'name': 'Export Project', 'project_type': 'External', 'status': 'Active',
+        'start_date': start, 'end_date': end
+    }).get_json()['id']
+    member_id, _ = [
+        auth_client.post('/people', json={
+            'name': name, 'role': 'Project Associate', 'availability': 'Full-Time'
+        }).get_json()['id']
+        for name in ('Export Member', 'Export Bench')
+    ]
+    auth_client.post(f'/assignments/{project_id}', json={
+        'person_id': member_id, 'allocation': 60, 'start_date': start, 'end_date': end
+    })
+    
+    response = auth_client.get('/export/allocations')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert 'attachment' in response.headers['Content-Disposition']
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == ['Name', 'Role', 'Total Allocation', 'Projects']
+    assert ['Export Member', 'Project Associate', '60%', 'Export Project (60%)'] in rows
+    assert ['Export Bench', 'Project Associate', '0%', ''] in rows
+    assert auth_client.get('/export/unknown').status_code == 404
+
+def test_export_jobs(auth_client):
+    """Reports are built in the background, polled, downloaded and reused for the day"""
+    import time
+    start = datetime.now().strftime('%Y-%m-%d')
+    end = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    project_id = auth_client.post('/projects', json={
+        'name': 'Roster Project', 'project_type': 'Internal', 'status': 'Active',
+        'start_date': start, 'end_date': end
+    }).get_json()['id']
+    person_id = auth_client.post('/people', json={
+        'name': 'Roster Member', 'role': 'Project Manager', 'availability': 'Full-Time'
+    }).get_json()['id']
+    auth_client.post(f'/assignments/{project_id}', json={
+        'person_id': person_id, 'allocation': 25, 'start_date': start, 'end_date': end
+    })
+    
+    response = auth_client.post('/exports/project_roster')
+    assert response.status_code == 202
+    job = response.get_json()
+    assert response.headers['Location'] == job['status_url']
+    
+    deadline = time.monotonic() + 10
+    while job['status'] in ('queued', 'running') and time.monotonic() < deadline:
+        time.sleep(0.1)
+        job = auth_client.get(job['status_url']).get_json()
+    assert job['status'] == 'done', job
+    assert job['progress'] == 100
+    assert job['rows_done'] == job['rows_total'] >= 1
+    
+    response = auth_client.get(job['download_url'])
+    assert response.status_code == 200
+    assert 'attachment' in response.headers['Content-Disposition']
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0][:2] == ['Project', 'Type']
+    assert any(row[0] == 'Roster Project' and row[5] == 'Roster Member' and row[7] == '25%'
+               for row in rows[1:])
+    
+    # Same organization, report and day: the finished job is reused
+    response = auth_client.post('/exports/project_roster')
+    assert response.status_code == 200
+    assert response.get_json()['id'] == job['id']
+    
+    assert auth_client.post('/exports/payroll').status_code == 404
+    assert auth_client.get('/exports/999999').status_code == 404
+    assert auth_client.get('/exports/999999/download').status_code == 404
+
+def test_write_detection(app):
+    """Writes count wherever their keyword is, and when a cursor is marked as writing"""
+    writes = [
+        "WITH moved AS (UPDATE projects SET status = 'Active' RETURNING id) SELECT COUNT(*) FROM moved",
+        "SELECT 1 FROM people WHERE id = 1 FOR NO KEY UPDATE",
+        "SELECT id FROM people FOR SHARE",
+        "INSERT INTO people (name) VALUES ('x')"
+    ]
+    reads = [
+        "SELECT updated_at, 'delete me' FROM projects -- update later",
+        'SELECT "update" FROM projects',
+        "SELECT id FROM people"
+    ]
+    assert all(is_write_sql(normalize_sql(sql)) for sql in writes)
+    assert not any(is_write_sql(normalize_sql(sql)) for sql in reads)
+    
+    with app.test_request_context('/'):
+        with get_db_cursor() as cur:
+            cur.execute("SELECT 1")
+        assert get_query_stats().writes == 0
+        with get_db_cursor(write=True) as cur:
+            cur.execute("SELECT 1")
+        assert get_query_stats().writes == 1
+
+def test_organization_version_bump(app, auth_client):
+    """A transaction bumps its organization's version once, however many rows it writes"""
+    from models.core import get_organization_version
+    with auth_client.session_transaction() as sess:
+        organization_id = sess['organization_id']
+    with app.app_context():
+        version, _ = get_organization_version(organization_id)
+    
+    response = auth_client.post('/bulk', json={'people': [
+        {'name': f'Version Person {n}', 'role': 'Project Associate', 'availability': 'Full-Time'}
+        for n in range(3)
+    ]})
+    assert response.status_code == 200
+    with app.app_context():
+        bumped, modified_at = get_organization_version(organization_id)
+    assert bumped == version + 1
+    assert modified_at is not None
+
+def _schema_state(conn):
+    """(recorded migration versions, audit columns of projects and people)"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT version FROM schema_version ORDER BY version")
+        versions = [row[0] for row in cur.fetchall()]
+        cur.execute("""
+            SELECT table_name, column_name FROM information_schema.columns
+            WHERE table_name IN ('projects', 'people')
+              AND column_name IN ('created_by', 'updated_by', 'updated_at')
+        """)
+        columns = set(cur.fetchall())
+    conn.commit()
+    return versions, columns
+
+def test_migrations(app):
+    """The runner creates, stamps and upgrades the schema"""
+    all_versions = [version for version, _ in list_migrations()]
+    audit_columns = {(table, column) for table in ('projects', 'people')
+                     for column in ('created_by', 'updated_by', 'updated_at')}
+
+    with app.app_context():
+        conn = psycopg2.connect(**get_db_config())
+    try:
+        # Already migrated by init_db: nothing to do
+        assert run_migrations(conn) == []
+        assert _schema_state(conn) == (all_versions, audit_columns)
+
+        # A pending migration is applied and recorded
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM schema_version WHERE version = %s", (all_versions[-1],))
+        conn.commit()
+        assert run_migrations(conn) == [all_versions[-1]]
+        assert _schema_state(conn) == (all_versions, audit_columns)
+
+        # A fresh database gets the baseline, stamped, then every later migration
+        with conn.cursor() as cur:
+            cur.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public;")
+        conn.commit()
+        assert run_migrations(conn) == [v for v in all_versions if v > BASELINE_VERSION]
+        assert _schema_state(conn) == (all_versions, audit_columns)
+
+        # The baseline has 02's updated_at triggers
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT tgname FROM pg_trigger
+                WHERE tgname IN ('update_projects_updated_at', 'update_people_updated_at')
+            """)
+            assert len(cur.fetchall()) == 2
+        conn.commit()
+    finally:
+        conn.close()
+
+def test_pool_checkout_timeout(app, auth_client, monkeypatch):
+    """An exhausted pool times out the checkout and the request gets a 503"""
+    with app.app_context():
+        pool = ConnectionPool(0, 1, timeout=0.1, **database.get_db_config())
+    try:
+        held = pool.getconn()
+        with pytest.raises(PoolTimeoutError):
+            pool.getconn()
+        stats = pool.stats()
+        assert stats['timeouts'] == 1
+        assert stats['size'] == 1 and stats['checked_out'] == 1 and stats['idle'] == 0
+
+        monkeypatch.setattr(database, 'test_pool', pool)
+        response = auth_client.get('/api/people')
+        assert response.status_code == 503
+        assert pool.stats()['timeouts'] == 2
+
+        pool.putconn(held)
+        stats = pool.stats()
+        assert stats['checked_out'] == 0 and stats['idle'] == 1
+        assert stats['checkouts'] == 1 and stats['connections_opened'] == 1
+    finally:
+        pool.closeall()
+
+def test_pool_discards_broken_connections(app):
+    """Closed and terminated connections are recycled instead of reused"""
+    with app.app_context():
+        pool = ConnectionPool(0, 2, timeout=1, ping_after=0, **database.get_db_config())
+        try:
+            # Open work is rolled back and the connection kept
+            conn = pool.getconn()
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            pool.putconn(conn)
+            assert pool.stats()['idle'] == 1
+            assert conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+            # A connection closed while checked out is discarded on return
+            conn = pool.getconn()
+            conn.close()
+            pool.putconn(conn)
+            stats = pool.stats()
+            assert stats['recycles'] == 1 and stats['size'] == 0 and stats['idle'] == 0
+
+            # An idle connection whose backend went away fails its ping and is replaced
+            conn = pool.getconn()
+            pid = conn.get_backend_pid()
+            pool.putconn(conn)
+            with get_db_cursor() as cur:
+                cur.execute("SELECT pg_terminate_backend(%s, 5000)", (pid,))  # Waits for it to exit
+            query_count = get_query_stats().count
+            conn = pool.getconn()
+            assert conn.get_backend_pid() != pid
+            assert get_query_stats().count == query_count  # The ping is not a request query
+            pool.putconn(conn)
+            stats = pool.stats()
+            assert stats['recycles'] == 2 and stats['size'] == 1
+            assert stats['connections_opened'] == 3 and stats['checkouts'] == 4
+        finally:
+            pool.closeall()
+
+@pytest.fixture
+def replica_app(app, monkeypatch):
+    """The app with a read replica: a second, read-only pool on the test database"""
+    with app.app_context():
+        app.config['DATABASE_REPLICA_URL'] = psycopg2.extensions.make_dsn(**get_db_config())
+    monkeypatch.setattr(database, 'replica_pool', None)
+    yield app
+    if database.replica_pool is not None:
+        database.replica_pool.closeall()
+
+def test_reads_go_to_replica(replica_app):
+    """Read-only cursors use the replica until the request writes"""
+    with replica_app.test_request_context('/'):
+        with get_db_cursor(read_only=True) as cur:
+            cur.execute("SELECT count(*) FROM people")
+        with read_only_queries():
+            with get_db_cursor() as cur:
+                cur.execute("SELECT count(*) FROM projects")
+        assert 'db_replica' in g and 'db' not in g
+
+        # The replica connection refuses writes
+        with pytest.raises(psycopg2.errors.ReadOnlySqlTransaction):
+            with g.db_replica.cursor() as cur:
+                cur.execute("INSERT INTO organizations (name) VALUES ('Replica Write')")
+        g.db_replica.rollback()
+
+        with get_db_cursor() as cur:
+            cur.execute("INSERT INTO organizations (name) VALUES ('Primary Write')")
+        # The write is uncommitted, so only the primary connection can see it
+        with get_db_cursor(read_only=True) as cur:
+            cur.execute("SELECT count(*) FROM organizations WHERE name = 'Primary Write'")
+            assert cur.fetchone()[0] == 1
+
+def test_primary_pin_after_write(replica_app, auth_client):
+    """A client that wrote reads from the primary until the pin expires"""
+    response = auth_client.post('/projects', json={
+        'name': 'Pinned Project',
+        'project_type': 'Internal',
+        'status': 'Active',
+        'start_date': datetime.now().strftime('%Y-%m-%d'),
+        'end_date': (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    })
+    assert response.status_code < 400
+    with auth_client.session_transaction() as sess:
+        assert sess['db_primary_until'] > time.time()
+
+    with replica_app.test_request_context('/'):
+        session['db_primary_until'] = time.time() + 5
+        with get_db_cursor(read_only=True) as cur:
+            cur.execute("SELECT 1")
+        assert 'db' in g and 'db_replica' not in g
+
+    with replica_app.test_request_context('/'):
+        session['db_primary_until'] = time.time() - 1
+        with get_db_cursor(read_only=True) as cur:
+            cur.execute("SELECT 1")
+        assert 'db_replica' in g and 'db' not in g
+
+def test_no_replica_falls_back_to_primary(app):
+    """Without DATABASE_REPLICA_URL every cursor uses the primary"""
+    with app.test_request_context('/'):
+        assert get_replica_pool() is None
+        with get_db_cursor(read_only=True) as cur:
+            cur.execute("SELECT count(*) FROM people")
+        with read_only_queries():
+            with get_db_cursor() as cur:
+                cur.execute("SELECT count(*) FROM projects")
+        assert 'db' in g and 'db_replica' not in g
+
+def test_export_job_failed_commit(app, monkeypatch):
+    """A job whose final update fails to commit is marked failed right away"""
+    def finish_uncommittable(job_id, *args):
+        real_finish(job_id, *args)
+        with get_db_cursor() as cur:
+            # Violated at commit time, so the commit itself fails
+            cur.execute("""
+                CREATE TEMP TABLE commit_breaker (
+                    id INTEGER UNIQUE DEFERRABLE INITIALLY DEFERRED
+                ) ON COMMIT DROP;
+                INSERT INTO commit_breaker VALUES (1), (1);
+            """)
+
+    real_finish = exports.finish_export_job
+    monkeypatch.setattr(exports, 'finish_export_job', finish_uncommittable)
+    with app.app_context():
+        with get_db_cursor() as cur:
+            cur.execute("INSERT INTO organizations (name) VALUES ('Export Commit') RETURNING id")
+            org_id = cur.fetchone()[0]
+        job, created = enqueue_export_job(org_id, 'project_roster', datetime.now().date())
+        assert created
+
+    exports.run_export_job(app, job.id)
+
+    with app.app_context():
+        job = get_export_job(org_id, job.id)
+        assert job.status == 'failed'
+        assert 'commit_breaker' in job.error
+
+@pytest.fixture
+def lagging_replica(replica_app, monkeypatch):
+    """A replica stuck at the snapshot taken when the fixture is set up"""
+    with replica_app.app_context():
+        conn = psycopg2.connect(connection_factory=database.PooledConnection, **get_db_config())
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+        cur.execute("SELECT count(*) FROM people")  # Takes the snapshot
+    monkeypatch.setattr(database, 'get_replica_db', lambda: conn)
+    yield conn
+    conn.close()
+
+@pytest.fixture
+def org_cache(app, monkeypatch):
+    """The per-process org cache, on and empty, without an invalidation listener"""
+    app.config['ORG_CACHE'] = True
+    monkeypatch.setattr(cache, '_cache', None)
+    monkeypatch.setattr(cache, '_start_listener', lambda: None)
+    return app
+
+def _hire_elsewhere(app, organization_id, name):
+    """Add a person in another process's transaction, committed on the primary"""
+    with app.app_context():
+        conn = psycopg2.connect(**get_db_config())
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO people (name, role, availability, organization_id)
+                VALUES (%s, 'Project Associate', 'Full-Time', %s)
+            """, (name, organization_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+def test_cache_filled_from_primary(auth_client, lagging_replica, org_cache):
+    """A cache miss is computed on the primary, not on a replica that lags behind"""
+    with auth_client.session_transaction() as sess:
+        organization_id = sess['organization_id']
+    _hire_elsewhere(org_cache, organization_id, 'Fresh Hire')
+
+    with org_cache.test_request_context('/'):
+        with get_db_cursor(read_only=True) as cur:
+            cur.execute("SELECT count(*) FROM people WHERE name = 'Fresh Hire'")
+            assert cur.fetchone()[0] == 0  # The replica hasn't caught up
+        assert 'Fresh Hire' in [person.name for person in get_all_people(organization_id)]
+
+    with org_cache.test_request_context('/'):
+        assert 'Fresh Hire' in [person.name for person in get_all_people(organization_id)]
+        assert cache.get_cache_stats()['hits'] == 1
+
+def test_conditional_get_renders_current_data(auth_client, lagging_replica, org_cache):
+    """Pages sent with an ETag are rendered on the primary, not a lagging replica or stale cache"""
+    with auth_client.session_transaction() as sess:
+        organization_id = sess['organization_id']
+        sess.pop('db_primary_until', None)  # Unpinned, so read-only queries may use the replica
+    with org_cache.test_request_context('/'):
+        total_people = get_dashboard(organization_id)['total_people']
+    first = auth_client.get('/api/dashboard')
+    assert first.get_json()['total_people'] == total_people
+
+    # Committed on the primary, but neither the replica nor this process's cache has it
+    _hire_elsewhere(org_cache, organization_id, 'Fresh Hire')
+    with org_cache.test_request_context('/'):
+        assert get_dashboard(organization_id)['total_people'] == total_people
+        with get_db_cursor(read_only=True) as cur:
+            cur.execute("SELECT count(*) FROM people WHERE name = 'Fresh Hire'")
+            assert cur.fetchone()[0] == 0
+
+    response = auth_client.get('/api/dashboard', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != first.headers['ETag']
+    assert response.get_json()['total_people'] == total_people + 1
+
+    response = auth_client.get('/api/people', query_string={'search': 'Fresh Hire'})
+    assert response.status_code == 200
+    assert [item['name'] for item in response.get_json()['items']] == ['Fresh Hire']
+
+def test_async_repeats_keep_the_original_error(app):
+    """Repeated async statements don't mask the error their transaction ended with"""
+    pytest.importorskip('asyncpg')
+    import asyncio
+    app.config['ASYNC_DB'] = True
+    repeats = app.config.get('QUERY_REPEAT_THRESHOLD', 10) + 1
+
+    async def repeat_then_sleep(conn, sleep):
+        for _ in range(repeats):
+            await conn.fetchval("SELECT 1")
+        if sleep:
+            await conn.execute("SELECT pg_sleep(1)")
+
+    with app.test_request_context('/people'):
+        g.db_statement_timeout_ms = 50
+        with pytest.raises(QueryTimeoutError):
+            asyncio.run(database.run_async_transaction(repeat_then_sleep, True))
+        assert get_query_stats().count == repeats + 1
+
+    with app.test_request_context('/people'):
+        with pytest.raises(RepeatedQueryError):
+            asyncio.run(database.run_async_transaction(repeat_then_sleep, False))
+        assert get_query_stats().count == repeats